@@ -0,0 +1,113 @@
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.decorators import sync_and_async_middleware
+
+
+# ------------------------------------------------------------------
+# ADMISSION CONTROL
+# Turns requests away with 429 + Retry-After while the process is
+# already over capacity, instead of queueing them until every
+# request is slow:
+#   - ADMISSION_MAX_IN_FLIGHT: requests this process is serving at
+#     once. This binds under uvicorn (one process serves many
+#     coroutines) and threaded workers. A sync gunicorn worker serves
+#     one request at a time and queues the rest in the socket
+#     backlog, where only the next check can see them.
+#   - ADMISSION_MAX_QUEUE_MS: how long a request may have waited
+#     before reaching Django, from the X-Request-Start header the
+#     proxy sets (nginx: `proxy_set_header X-Request-Start "t=${msec}"`).
+#     A request that queued that long is past saving; shedding it
+#     keeps the backlog from growing.
+# 0 turns a check off. Checks are a counter and a clock read; the
+# metrics endpoint is never shed.
+# ------------------------------------------------------------------
+EXEMPT_PATHS = ("/api/metrics/",)
+
+
+class InFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def enter(self, limit):
+        with self.lock:
+            if limit and self.count >= limit:
+                return False
+            self.count += 1
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.count -= 1
+
+
+in_flight = InFlight()
+
+
+def queued_ms(request, now=None):
+    """
+    Milliseconds since the proxy received the request, or None when
+    there is no (valid) X-Request-Start header.
+    """
+    header = request.headers.get("X-Request-Start", "")
+    try:
+        started = float(header.removeprefix("t="))
+    except ValueError:
+        return None
+    # Proxies send seconds (nginx), milliseconds or microseconds.
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    now = time.time() if now is None else now
+    return max(now - started, 0) * 1000
+
+
+def rejected(detail):
+    response = JsonResponse({"detail": detail}, status=429)
+    response["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+    return response
+
+
+def admit(request):
+    """
+    Returns None and counts the request in, or the 429 to send back.
+    """
+    if request.path in EXEMPT_PATHS:
+        in_flight.enter(0)  # counted, never refused
+        return None
+    limit = settings.ADMISSION_MAX_QUEUE_MS
+    if limit:
+        waited = queued_ms(request)
+        if waited is not None and waited > limit:
+            return rejected("Server busy, request queued too long.")
+    if not in_flight.enter(settings.ADMISSION_MAX_IN_FLIGHT):
+        return rejected("Server busy, too many requests in progress.")
+    return None
+
+
+@sync_and_async_middleware
+def admission_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = admit(request)
+            if response is not None:
+                return response
+            try:
+                return await get_response(request)
+            finally:
+                in_flight.leave()
+    else:
+        def middleware(request):
+            response = admit(request)
+            if response is not None:
+                return response
+            try:
+                return get_response(request)
+            finally:
+                in_flight.leave()
+    return middleware
@@ -0,0 +1,175 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import DecimalField, F, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .ledger import SALES, SETTLE
+from .models import SalesRollup, StockMovement, Sweet
+
+
+# ------------------------------------------------------------------
+# SALES ROLLUPS FOR /api/analytics/
+# Hourly (UTC) and daily (TIME_ZONE) units and revenue per sweet,
+# aggregated from the sale movements of the stock ledger by a
+# background job (manage.py rollup_sales, every few minutes), so the
+# purchase path does no extra write. Dashboards read rollup rows
+# only: their cost grows with the number of buckets, not of sales.
+#
+# Each run recomputes whole buckets from the last hour it wrote
+# onwards and upserts them, so re-running is harmless and a bucket
+# that was still filling up is completed by the next run.
+# ------------------------------------------------------------------
+REBUILD_CHUNK = timedelta(days=7)
+CENT = Decimal("0.01")
+
+
+def floor_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(moment):
+    return timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def refresh(now=None, settle=SETTLE):
+    """
+    Brings the rollups up to `now - settle`. Returns the rows written.
+    """
+    db = router.db_for_write(SalesRollup)
+    latest = (
+        SalesRollup.objects.using(db).filter(period=SalesRollup.HOUR)
+        .aggregate(latest=Max("bucket"))["latest"]
+    )
+    if latest is None:
+        return rebuild(now, settle)
+    # One more hour back picks up sales that committed late.
+    return recompute(latest - timedelta(hours=1), (now or timezone.now()) - settle)
+
+
+def rebuild(now=None, settle=SETTLE):
+    """
+    Drops every rollup and recomputes them from the whole ledger.
+    """
+    db = router.db_for_write(SalesRollup)
+    end = (now or timezone.now()) - settle
+    first = (
+        StockMovement.objects.using(db).filter(SALES)
+        .aggregate(first=Min("created_at"))["first"]
+    )
+    written = 0
+    with transaction.atomic(using=db):
+        SalesRollup.objects.using(db).all().delete()
+        start = floor_day(first) if first is not None else end
+        while start < end:
+            written += recompute(start, min(start + REBUILD_CHUNK, end))
+            start += REBUILD_CHUNK
+    return written
+
+
+def recompute(start, end):
+    """
+    Recomputes every hour and day bucket that overlaps [start, end)
+    from the ledger's sales up to `end`.
+    """
+    db = router.db_for_write(SalesRollup)
+    with transaction.atomic(using=db):
+        rows = [
+            *bucket_rows(SalesRollup.HOUR, TruncHour("created_at"), floor_hour(start), end, db),
+            *bucket_rows(
+                SalesRollup.DAY,
+                TruncDay("created_at", tzinfo=timezone.get_current_timezone()),
+                floor_day(start),
+                end,
+                db,
+            ),
+        ]
+        categories = dict(
+            Sweet.objects.using(db)
+            .filter(pk__in={row.sweet_id for row in rows})
+            .values_list("pk", "category")
+        )
+        for row in rows:
+            row.category = categories.get(row.sweet_id, "")
+        SalesRollup.objects.using(db).bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["period", "bucket", "sweet"],
+            update_fields=["category", "units", "revenue"],
+        )
+    return len(rows)
+
+
+def bucket_rows(period, trunc, start, end, db):
+    totals = (
+        StockMovement.objects.using(db)
+        .filter(SALES, created_at__gte=start, created_at__lt=end)
+        .annotate(bucket=trunc)
+        .values("bucket", "sweet_id")
+        .annotate(
+            sold=Sum("delta"),
+            takings=Sum(
+                F("delta") * F("unit_price"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        .order_by()
+    )
+    return [
+        SalesRollup(
+            period=period,
+            bucket=row["bucket"],
+            sweet_id=row["sweet_id"],
+            units=-row["sold"],
+            revenue=-(row["takings"] or 0),
+        )
+        for row in totals
+    ]
+
+
+# ------------------------------------------------------------------
+# Dashboard queries
+# Revenue is returned as a "12.50" string, like prices.
+# ------------------------------------------------------------------
+def money(value):
+    # SQLite sums decimals without their scale.
+    return str(Decimal(value or 0).quantize(CENT))
+
+
+def best_sellers(since, limit=10):
+    rows = list(
+        SalesRollup.objects.filter(period=SalesRollup.DAY, bucket__gte=floor_day(since))
+        .values("sweet_id")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("-units", "sweet_id")[:limit]
+    )
+    names = dict(Sweet.objects.filter(pk__in=[r["sweet_id"] for r in rows]).values_list("pk", "name"))
+    return [
+        {"id": r["sweet_id"], "name": names.get(r["sweet_id"]), "units": r["units"], "revenue": money(r["revenue"])}
+        for r in rows
+    ]
+
+
+def revenue_by_category(since):
+    rows = (
+        SalesRollup.objects.filter(period=SalesRollup.DAY, bucket__gte=floor_day(since))
+        .values("category")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("-revenue", "category")
+    )
+    return [{**row, "revenue": money(row["revenue"])} for row in rows]
+
+
+def hourly_sales(since, sweet_id=None, category=None):
+    rollups = SalesRollup.objects.filter(period=SalesRollup.HOUR, bucket__gte=floor_hour(since))
+    if sweet_id is not None:
+        rollups = rollups.filter(sweet_id=sweet_id)
+    if category:
+        rollups = rollups.filter(category__iexact=category)
+    return [
+        {"hour": row["bucket"], "units": row["units"], "revenue": money(row["revenue"])}
+        for row in rollups.values("bucket").annotate(units=Sum("units"), revenue=Sum("revenue")).order_by("bucket")
+    ]
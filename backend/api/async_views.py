@@ -0,0 +1,245 @@
+import json
+from functools import partial
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from . import cache as sweet_cache
+from . import conditional
+from . import idempotency
+from . import reservations
+from .models import Sweet
+from .pagination import SweetKeysetPagination
+from .renderers import FastJSONRenderer
+from .search import SweetSearchFilter
+from .throttling import PURCHASE_THROTTLES
+from .serializers import (
+    QuantitySerializer,
+    ReservationRefSerializer,
+    requested_fields,
+    sweet_rows,
+    sweet_serializer_class,
+)
+from .views import SweetViewSet, filter_sweets, sweet_pk
+
+
+# ------------------------------------------------------------------
+# ASYNC SWEET ENDPOINTS (kiosk hot paths)
+#   GET  /api/async/sweets/
+#   GET  /api/async/sweets/{id}/
+#   POST /api/async/sweets/{id}/purchase/
+#
+# Same filters, search, pagination, response cache, ETags and bodies
+# as SweetViewSet, but written as native async Django views: served
+# by uvicorn (sweetshop.asgi), a request waiting on the database or a
+# slow client holds a coroutine, not a worker. DRF views are sync-only,
+# which is why these are plain Django views.
+#
+# Under gunicorn/WSGI they still work, just without that benefit.
+# ------------------------------------------------------------------
+class AsyncSweetView(View):
+    http_method_names = ["get", "post"]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token auth only, so no CSRF check (same as DRF's APIView).
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            request.user, request.auth = await self.authenticate(request)
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+
+            handler = getattr(self, request.method.lower(), None)
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            return await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    async def check_throttles(self, request, throttle_classes):
+        # The bucket store is a cache, which may block (file, redis).
+        for throttle in throttle_classes:
+            throttle = throttle()
+            if not await sync_to_async(throttle.allow_request)(request, self):
+                raise exceptions.Throttled(throttle.wait())
+
+    def get_authenticators(self):
+        # Whatever SweetViewSet uses (JWT or stateless JWT).
+        return [auth() for auth in SweetViewSet.authentication_classes]
+
+    async def authenticate(self, request):
+        # JWTAuthentication may load the User row, so it runs on the
+        # request's database thread.
+        for authenticator in self.get_authenticators():
+            result = await sync_to_async(authenticator.authenticate)(request)
+            if result is not None:
+                return result
+        return AnonymousUser(), None
+
+    def handle_exception(self, request, exc):
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        response = self.render(detail, status=exc.status_code)
+
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            authenticators = self.get_authenticators()
+            if authenticators:
+                response.status_code = status.HTTP_401_UNAUTHORIZED
+                response["WWW-Authenticate"] = authenticators[0].authenticate_header(request)
+        if getattr(exc, "wait", None):
+            response["Retry-After"] = str(exc.wait)
+        return response
+
+    def render(self, data, status=status.HTTP_200_OK):
+        return HttpResponse(
+            FastJSONRenderer().render(data), status=status, content_type="application/json"
+        )
+
+    def get_data(self, request):
+        """
+        The JSON or form body, like request.data on a DRF view.
+        """
+        if request.content_type != "application/json":
+            return request._request.POST
+        try:
+            return json.loads(request.body) if request.body else {}
+        except ValueError:
+            raise exceptions.ParseError()
+
+    def get_queryset(self, request):
+        queryset = filter_sweets(Sweet.objects.all(), request.query_params)
+        return SweetSearchFilter().filter_queryset(request, queryset, SweetViewSet)
+
+    def read_fields(self, request):
+        allowed = sweet_serializer_class(request).Meta.fields
+        return requested_fields(request.query_params, allowed)
+
+    async def cached(self, request, action, build, pk=None):
+        """
+        Async counterpart of cache.cached_response(). Shares its entries
+        with SweetViewSet, since the bodies are identical.
+        """
+        key, data = sweet_cache.lookup(request, action, pk)
+        if data is None:
+            data = await build()
+            sweet_cache.store(key, data)
+        return self.render(data)
+
+
+# ============================================================
+# 📋 LIST
+# ============================================================
+class SweetListView(AsyncSweetView):
+    async def get(self, request):
+        fields = self.read_fields(request)
+        queryset = self.get_queryset(request)
+        validators = conditional.list_validators(request)
+
+        response = conditional.not_modified(request, validators)
+        if response is None:
+            response = await self.cached(
+                request, "list", lambda: self.build(request, queryset, fields)
+            )
+        return conditional.add_validators(response, validators)
+
+    async def build(self, request, queryset, fields):
+        paginator = SweetKeysetPagination()
+        columns = fields
+        if paginator.is_requested(request):
+            columns = (*fields, *paginator.key_fields(request))
+        rows = queryset.values(*dict.fromkeys(columns))
+
+        page = await paginator.apaginate_queryset(rows, request)
+        if page is not None:
+            return paginator.get_paginated_data(sweet_rows(page, fields))
+        return sweet_rows([row async for row in rows], fields)
+
+
+# ============================================================
+# 🔎 RETRIEVE
+# ============================================================
+class SweetDetailView(AsyncSweetView):
+    async def get(self, request, pk):
+        pk = sweet_pk(pk)
+        fields = self.read_fields(request)
+        queryset = self.get_queryset(request)
+        validators = await conditional.adetail_validators(request, queryset, pk)
+
+        response = conditional.not_modified(request, validators)
+        if response is None:
+            response = await self.cached(
+                request, "retrieve", lambda: self.build(request, queryset, pk, fields), pk=pk
+            )
+        return conditional.add_validators(response, validators)
+
+    async def build(self, request, queryset, pk, fields):
+        sweet = await queryset.filter(pk=pk).only(*fields).afirst()
+        if sweet is None:
+            raise exceptions.NotFound("No Sweet matches the given query.")
+        return sweet_serializer_class(request)(sweet, fields=fields).data
+
+
+# ============================================================
+# 🛒 PURCHASE (USER)
+# body: {"quantity": n} (default 1) or {"reservation": id};
+# honours Idempotency-Key
+# ============================================================
+class SweetPurchaseView(AsyncSweetView):
+    async def post(self, request, pk):
+        pk = sweet_pk(pk)
+        await self.check_throttles(request, PURCHASE_THROTTLES)
+        data = self.get_data(request)
+
+        if isinstance(data, dict) and "reservation" in data:
+            ref = ReservationRefSerializer(data=data)
+            if not ref.is_valid():
+                return self.render(ref.errors, status=status.HTTP_400_BAD_REQUEST)
+            work = partial(self.buy_reserved, request, pk, ref.validated_data["reservation"])
+        else:
+            body = QuantitySerializer(data=data)
+            if not body.is_valid():
+                return self.render({"detail": "Invalid quantity"}, status=status.HTTP_400_BAD_REQUEST)
+            work = partial(self.buy, request, pk, body.validated_data["quantity"])
+
+        if request.headers.get(idempotency.HEADER) is None:
+            response = await work()
+        else:
+            # The key's transaction has to span the purchase, so both run
+            # on the request's database thread; the purchase's own
+            # queries join it.
+            response = await sync_to_async(idempotency.execute_request)(
+                request, data, async_to_sync(work)
+            )
+
+        rendered = self.render(response.data, status=response.status_code)
+        if response.has_header(idempotency.REPLAYED_HEADER):
+            rendered[idempotency.REPLAYED_HEADER] = response[idempotency.REPLAYED_HEADER]
+        return rendered
+
+    async def buy(self, request, pk, quantity):
+        sweet = await Sweet.objects.atake_stock(pk, quantity, actor_id=request.user.pk)
+
+        if sweet is None:
+            if not await Sweet.objects.filter(pk=pk).aexists():
+                return Response({"detail": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response({"detail": "Out of stock"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(sweet_serializer_class(request)(sweet).data)
+
+    async def buy_reserved(self, request, pk, reservation):
+        # One transaction around the hold and the stock (api/reservations.py).
+        sweet = await sync_to_async(reservations.fulfil)(reservation, pk, request.user.pk)
+        if sweet is None:
+            return Response(
+                {"detail": "Reservation not found or expired"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(sweet_serializer_class(request)(sweet).data)
@@ -0,0 +1,95 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+# ------------------------------------------------------------------
+# STATELESS JWT AUTHENTICATION (opt-in, JWT_STATELESS_AUTH=1)
+# The stock JWTAuthentication loads the User row on every request.
+# Login tokens already carry `is_staff`, `is_superuser` and `username`
+# (see MyTokenObtainPairSerializer), which is all our permission
+# checks look at, so this class builds a TokenUser from the claims and
+# does no database query at all.
+#
+# Revocation is a single cache round trip that checks two entries:
+#   * one token, by `jti`           -> revoke_token()
+#   * every token a user holds that
+#     was issued before a moment    -> revoke_user()
+# Tokens without the role claims (e.g. issued before they were added)
+# fall back to the normal database lookup.
+# ------------------------------------------------------------------
+ROLE_CLAIMS = ("is_staff", "is_superuser", "username")
+
+
+def denylist():
+    return caches[settings.JWT_DENYLIST_CACHE_ALIAS]
+
+
+def jti_key(jti):
+    return f"jwt:deny:jti:{jti}"
+
+
+def user_key(user_id):
+    return f"jwt:deny:user:{user_id}"
+
+
+def revoke_token(token):
+    """
+    Denies one validated token until it would have expired anyway.
+    """
+    ttl = max(int(token["exp"] - time.time()), 1)
+    denylist().set(jti_key(token[api_settings.JTI_CLAIM]), 1, timeout=ttl)
+
+
+def revoke_user(user_id):
+    """
+    Denies every token issued to `user_id` up to now, e.g. after a
+    password or role change. Kept for one access-token lifetime, after
+    which those tokens have expired on their own.
+    """
+    ttl = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    denylist().set(user_key(user_id), int(time.time()), timeout=ttl)
+
+
+def is_revoked(token):
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    jti = token.get(api_settings.JTI_CLAIM)
+    keys = [jti_key(jti), user_key(user_id)]
+    found = denylist().get_many(keys)
+
+    if keys[0] in found:
+        return True
+    revoked_at = found.get(keys[1])
+    # iat has whole-second resolution, so a token issued in the same
+    # second as the revocation still passes (e.g. promote, then log in).
+    return revoked_at is not None and token.get("iat", 0) < revoked_at
+
+
+def is_admin(request):
+    """
+    The `is_staff` claim of the request's access token; this is what
+    decides between the admin and the public sweet representation.
+    Tokens without the claim fall back to the user row.
+    """
+    claims = getattr(request.auth, "payload", {})
+    if "is_staff" in claims:
+        return bool(claims["is_staff"])
+    return bool(getattr(request.user, "is_staff", False))
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if is_revoked(validated_token):
+            raise InvalidToken("Token has been revoked")
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        if all(claim in validated_token for claim in ROLE_CLAIMS):
+            return TokenUser(validated_token)
+        return super().get_user(validated_token)
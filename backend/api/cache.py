@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from . import replicas
+from .authentication import is_admin
+
+
+# ------------------------------------------------------------------
+# READ-THROUGH CACHE FOR SWEET LIST / RETRIEVE RESPONSES
+# Entries are keyed by a catalogue version number plus the request's
+# normalized query string and admin flag (the two representations, see
+# sweet_serializer_class), so one public entry serves every standard
+# user. Any write to the catalogue bumps the version, which makes
+# every older entry unreachable at once; they then age out through
+# the TTL. No key scanning needed.
+#
+# The version is bumped:
+#   * by post_save / post_delete signals (see api.signals)
+#   * by SweetQuerySet for update(), bulk_create(), bulk_update() and
+#     the raw UPDATE in take_stock(), none of which send signals
+# ------------------------------------------------------------------
+VERSION_KEY = "sweets:version"
+BUMPED_AT_KEY = "sweets:bumped_at"
+
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.SWEETS_CACHE_ALIAS]
+
+
+def count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    """
+    Hit/miss counters for this process, plus the current version.
+    """
+    with _stats_lock:
+        snapshot = dict(_stats)
+    snapshot["version"] = catalogue_version()
+    snapshot["backend"] = get_cache().__class__.__name__
+    return snapshot
+
+
+def catalogue_version():
+    return get_cache().get_or_set(VERSION_KEY, 1, timeout=None)
+
+
+def bump_catalogue_version():
+    """
+    Invalidates every cached sweet response. Inside a transaction it
+    bumps again on commit, so anything cached from the pre-commit state
+    in between is dropped as well.
+    """
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def bump():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
+    if replicas.replicas():
+        cache.set(BUMPED_AT_KEY, time.time(), timeout=settings.DATABASE_REPLICA_PIN_SECONDS)
+    count("invalidations")
+
+
+def response_key(request, action, pk=None):
+    params = sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    )
+    raw = f"{request.get_host()}|{action}|{pk}|{int(is_admin(request))}|{params}"
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"sweets:v{catalogue_version()}:{digest}"
+
+
+def cached_response(request, action, build, pk=None):
+    """
+    Returns the cached body for this request if there is one, else calls
+    `build()` and caches a successful result.
+    """
+    key, data = lookup(request, action, pk)
+    if data is not None:
+        return Response(data)
+
+    response = build()
+    if response.status_code == 200:
+        store(key, response.data)
+    return response
+
+
+# The async views (api/async_views.py) call these two directly. They
+# stay synchronous: Django's cache backends implement aget()/aset() as
+# a hop to a worker thread, which costs more than a locmem or Redis GET.
+def lookup(request, action, pk=None):
+    """
+    Returns (key, cached body or None) and counts the hit or miss.
+    Requests pinned to the primary (api.replicas) always miss.
+    """
+    key = response_key(request, action, pk)
+    data = None if replicas.is_pinned() else get_cache().get(key)
+    count("hits" if data is not None else "misses")
+    return key, data
+
+
+def store(key, data):
+    cache = get_cache()
+    timeout = settings.SWEETS_CACHE_TTL
+    # Shortly after a write a replica may still lag behind, so a body
+    # read from one is only kept until the pin window has passed.
+    if replicas.replicas() and not replicas.is_pinned() and cache.get(BUMPED_AT_KEY):
+        timeout = min(timeout, settings.DATABASE_REPLICA_PIN_SECONDS)
+    cache.set(key, data, timeout=timeout)
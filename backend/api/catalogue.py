@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from . import ledger
+from .models import Sweet
+from .serializers import HOT_QUANTITY_ERROR, MAX_ID, RESERVED_QUANTITY_ERROR, SweetSerializer
+
+
+# ------------------------------------------------------------------
+# STREAMING CATALOGUE IMPORT / EXPORT
+# Used by the /api/sweets/export/ and /api/sweets/import/ endpoints
+# and by the `export_sweets` / `import_sweets` management commands.
+# Both directions work in fixed-size chunks, so memory use does not
+# depend on the size of the table or of the file.
+# ------------------------------------------------------------------
+FIELDS = ("id", "name", "category", "price", "quantity")
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+# ------------------------------------------------------------------
+# Export
+# ------------------------------------------------------------------
+def iter_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields sweets as tuples in FIELDS order, in id order. Uses a
+    server-side cursor on PostgreSQL and fetchmany() elsewhere.
+    """
+    if queryset is None:
+        queryset = Sweet.objects.all()
+    return queryset.order_by("id").values_list(*FIELDS).iterator(chunk_size=chunk_size)
+
+
+def export_csv(queryset=None, chunk_size=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+
+    for count, row in enumerate(iter_rows(queryset, chunk_size), 1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(queryset=None, chunk_size=CHUNK_SIZE):
+    lines = []
+    for row in iter_rows(queryset, chunk_size):
+        record = dict(zip(FIELDS, row))
+        record["price"] = str(record["price"])
+        lines.append(json.dumps(record, separators=(",", ":")))
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def export(file_format, queryset=None, chunk_size=CHUNK_SIZE):
+    if file_format == "ndjson":
+        return export_ndjson(queryset, chunk_size)
+    return export_csv(queryset, chunk_size)
+
+
+# ------------------------------------------------------------------
+# Import
+# ------------------------------------------------------------------
+def decode_lines(lines, encoding="utf-8"):
+    """
+    Decodes an iterable of byte lines. A line that doesn't decode is
+    passed on as its UnicodeDecodeError, so only that line fails.
+    """
+    for line in lines:
+        try:
+            yield line.decode(encoding)
+        except UnicodeDecodeError as exc:
+            yield exc
+
+
+def read_records(lines, file_format):
+    """
+    Turns an iterable of text lines (or decode_lines() errors) into an
+    iterator of dicts.
+    """
+    if file_format == "ndjson":
+        return read_ndjson(lines)
+    return read_csv(lines)
+
+
+def read_csv(lines):
+    # csv only takes text: an undecodable line reaches it as a blank
+    # line, which DictReader skips, and its error is passed on in its
+    # place.
+    failed = []
+
+    def text():
+        for line in lines:
+            if isinstance(line, ValueError):
+                failed.append(line)
+                yield "\n"
+            else:
+                yield line
+
+    for row in csv.DictReader(text()):
+        yield from failed
+        failed.clear()
+        yield row
+    yield from failed
+
+
+def read_ndjson(lines):
+    # A bad line is passed on as its error so only that line fails.
+    for line in lines:
+        if isinstance(line, ValueError):
+            yield line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield exc
+
+
+def import_records(records, batch_size=BATCH_SIZE, actor_id=None):
+    """
+    Upserts sweets from an iterable of dicts, `batch_size` at a time.
+    Rows with an `id` update that sweet or create it with that id.
+    Rows without one are created. Invalid rows are skipped and
+    reported (only the first MAX_REPORTED_ERRORS in detail).
+
+    Quantity changes go into the stock ledger as adjustments by
+    `actor_id`.
+
+    Returns {"created", "updated", "failed", "errors"}.
+    """
+    summary = {"created": 0, "updated": 0, "failed": 0, "errors": []}
+    validator = SweetSerializer()
+    id_field = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    records = iter(records)
+    line = 0
+
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+
+        keyed, new, lines = {}, [], {}
+        for record in batch:
+            line += 1
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                if not isinstance(record, dict):
+                    raise ValueError("Expected an object")
+                attrs = validator.run_validation(record)
+                pk = record.get("id")
+                if pk in (None, ""):
+                    pk = None
+                else:
+                    # 1..MAX_ID, so a bad id fails its row, not the import
+                    # (true is rejected too: str(True) isn't a number).
+                    try:
+                        pk = id_field.run_validation(pk)
+                    except ValidationError as exc:
+                        raise ValidationError({"id": exc.detail})
+            except (ValidationError, ValueError, TypeError) as exc:
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    detail = getattr(exc, "detail", str(exc))
+                    summary["errors"].append({"line": line, "errors": detail})
+                continue
+
+            if pk is None:
+                new.append(Sweet(**attrs))
+            else:
+                keyed[pk] = Sweet(id=pk, **attrs)
+                lines[pk] = line
+
+        with transaction.atomic():
+            changes = {}
+            if keyed:
+                existing = {}
+                for pk, quantity, shards, reserved in (
+                    Sweet.objects.using(router.db_for_write(Sweet))
+                    .filter(id__in=keyed).values_list("id", "quantity", "shards", "reserved")
+                ):
+                    # Hot sweets (api.hot) keep their stock in shards, and
+                    # reserved units (api.reservations) must stay in stock.
+                    error = HOT_QUANTITY_ERROR if shards else (
+                        RESERVED_QUANTITY_ERROR if keyed[pk].quantity < reserved else None
+                    )
+                    if error:
+                        del keyed[pk]
+                        summary["failed"] += 1
+                        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                            summary["errors"].append(
+                                {"line": lines[pk], "errors": {"quantity": [error]}}
+                            )
+                    else:
+                        existing[pk] = quantity
+            if keyed:
+                changes.update(
+                    (pk, sweet.quantity - existing.get(pk, 0)) for pk, sweet in keyed.items()
+                )
+                Sweet.objects.bulk_create(
+                    keyed.values(),
+                    update_conflicts=True,
+                    unique_fields=["id"],
+                    update_fields=["name", "category", "price", "quantity", "updated_at"],
+                )
+                summary["updated"] += len(existing)
+                summary["created"] += len(keyed) - len(existing)
+                if len(keyed) > len(existing):
+                    # Before the id-less rows below take ids from it.
+                    reset_id_sequence()
+            if new:
+                Sweet.objects.bulk_create(new)
+                summary["created"] += len(new)
+                changes.update((sweet.pk, sweet.quantity) for sweet in new)
+            ledger.record(ledger.adjustments(changes, actor_id))
+
+    return summary
+
+
+def reset_id_sequence():
+    """
+    Explicit ids don't advance PostgreSQL's sequence; move it past them
+    so later inserts don't collide. A no-op on SQLite.
+    """
+    connection = connections[router.db_for_write(Sweet)]
+    statements = connection.ops.sequence_reset_sql(no_style(), [Sweet])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
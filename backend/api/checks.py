@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+
+# ------------------------------------------------------------------
+# SHARED CACHE CHECK
+# The sweets cache carries state every worker has to agree on: the
+# catalogue version, replica pins, revoked JWTs and throttle buckets.
+# With locmem each worker sees only its own writes, so under
+# WEB_CONCURRENCY > 1 a purchase leaves the other workers serving stale
+# lists and a client gets a bucket per worker. Admission control
+# (api/admission.py) is per process on purpose and is not affected.
+# ------------------------------------------------------------------
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.WEB_CONCURRENCY <= 1:
+        return []
+    aliases = {settings.SWEETS_CACHE_ALIAS, settings.JWT_DENYLIST_CACHE_ALIAS, settings.THROTTLE_CACHE_ALIAS}
+    return [
+        Error(
+            f"The {alias!r} cache is per process, but WEB_CONCURRENCY is {settings.WEB_CONCURRENCY}.",
+            hint="Set SWEETS_CACHE_BACKEND to redis (or file on a single machine).",
+            id="api.E001",
+        )
+        for alias in sorted(aliases)
+        if isinstance(caches[alias], LocMemCache)
+    ]
@@ -0,0 +1,95 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from . import cache as sweet_cache
+from .authentication import is_admin
+
+
+# ------------------------------------------------------------------
+# CONDITIONAL GET (ETag / Last-Modified) FOR SWEETS
+# Validators never come from the response body, so a matching
+# If-None-Match is answered with 304 before any row is serialized.
+#
+#   detail: the row's updated_at          (one primary-key lookup)
+#   list:   the response cache key        (no query at all)
+#
+# The list ETag is a hash of the key its body is cached under in
+# api/cache.py: catalogue version, normalized query string and admin
+# flag. Every catalogue write bumps the version, and the ETag and the
+# cached body always describe the same version, even when the cache
+# is behind the database. Lists have no Last-Modified.
+# Query string and admin flag are mixed in because they change the
+# representation.
+# ------------------------------------------------------------------
+def make_etag(request, *parts):
+    params = sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    )
+    raw = "|".join(str(p) for p in (*parts, params, int(is_admin(request))))
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def list_validators(request):
+    # A cache read, so the async list view calls it directly too.
+    key = sweet_cache.response_key(request, "list")
+    return quote_etag(hashlib.sha1(key.encode()).hexdigest()), None
+
+
+def detail_validators(request, queryset, pk):
+    try:
+        last = queryset.filter(pk=pk).values_list("updated_at", flat=True).first()
+    except (TypeError, ValueError):
+        return None, None
+    return detail_etag(request, pk, last)
+
+
+async def adetail_validators(request, queryset, pk):
+    try:
+        last = await queryset.filter(pk=pk).values_list("updated_at", flat=True).afirst()
+    except (TypeError, ValueError):
+        return None, None
+    return detail_etag(request, pk, last)
+
+
+def detail_etag(request, pk, last):
+    if last is None:
+        return None, None
+    return make_etag(request, "detail", pk, last.isoformat()), last
+
+
+def conditional_response(request, validators, build):
+    """
+    Returns 304 if the client's copy is current, otherwise `build()`
+    with ETag / Last-Modified attached.
+    """
+    response = not_modified(request, validators)
+    if response is None:
+        response = build()
+    return add_validators(response, validators)
+
+
+def not_modified(request, validators):
+    """
+    A 304 response if the client's copy is current, else None.
+    """
+    etag, last_modified = validators
+    if not etag:
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+
+
+def add_validators(response, validators):
+    etag, last_modified = validators
+    if etag and response.status_code == 200:
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(int(last_modified.timestamp()))
+
+    # Bodies differ per user role; let browsers keep a copy but always
+    # revalidate, which is where the 304s come from.
+    patch_vary_headers(response, ["Authorization"])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
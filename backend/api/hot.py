@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import StockShard, Sweet
+
+
+# ------------------------------------------------------------------
+# HOT-SKU MODE (flash sales)
+# A normal purchase is one conditional UPDATE of the sweet's row, so
+# every buyer of the same sweet waits for that row lock. In hot mode
+# the sweet's stock is split over N StockShard rows and a purchase
+# decrements any one shard that has enough (SweetQuerySet
+# take_from_shards), so up to N buyers proceed at once. Each shard
+# update is still guarded by `quantity >= amount`, so the total can
+# never go below zero.
+#
+# `Sweet.quantity` becomes write-behind: reconcile() (manage.py
+# reconcile_stock, every minute) writes the shard totals back in
+# batches. Until then the admin view of a hot sweet lags; purchases
+# never do.
+#
+# Switched per sweet with POST /api/sweets/{id}/hot/ {"shards": N};
+# 0 folds the shards back into the row. Hot sweets take no
+# reservations (api.reservations).
+# ------------------------------------------------------------------
+MAX_SHARDS = 64
+
+
+class SwitchRefused(ValueError):
+    """
+    The sweet can't change mode right now; the message says why.
+    """
+
+
+def split(total, parts):
+    """`total` units over `parts` shards, as evenly as possible."""
+    return [total // parts + (1 if n < total % parts else 0) for n in range(parts)]
+
+
+def switch(sweet_id, shards):
+    """
+    Puts a sweet in hot mode with `shards` shards, or back to normal
+    with 0, moving its stock. Returns the sweet. Raises SwitchRefused
+    for a sweet with reservations (api.reservations), whose held units
+    could not be kept apart from the shards.
+    """
+    with transaction.atomic():
+        sweet = Sweet.objects.select_for_update().get(pk=sweet_id)
+        if shards and sweet.reserved:
+            raise SwitchRefused("This sweet has reservations; wait for them to be bought or released.")
+        held = StockShard.objects.select_for_update().filter(sweet=sweet)
+        total = sum(shard.quantity for shard in held) if sweet.shards else sweet.quantity
+
+        held.delete()
+        StockShard.objects.bulk_create(
+            StockShard(sweet=sweet, shard=n, quantity=part)
+            for n, part in enumerate(split(total, shards) if shards else [])
+        )
+        Sweet.objects.filter(pk=sweet.pk).update(quantity=total, shards=shards)
+        sweet.quantity, sweet.shards = total, shards
+    return sweet
+
+
+def add_stock(totals):
+    """
+    Spreads restocked units ({sweet id: units}) over the shards of
+    the hot sweets among them. Call inside the restock's transaction.
+    """
+    hot = dict(Sweet.objects.filter(pk__in=totals, shards__gt=0).values_list("pk", "shards"))
+    if not hot:
+        return
+    parts = [
+        When(sweet_id=pk, shard=n, then=Value(part))
+        for pk, shards in hot.items()
+        for n, part in enumerate(split(totals[pk], shards))
+        if part
+    ]
+    StockShard.objects.filter(sweet_id__in=hot).update(
+        quantity=F("quantity") + Case(*parts, default=Value(0))
+    )
+
+
+def reconcile(batch_size=500):
+    """
+    Writes each hot sweet's shard total back into `Sweet.quantity`,
+    one UPDATE per `batch_size` sweets. Returns how many changed.
+    """
+    live = Coalesce(
+        Subquery(
+            StockShard.objects.filter(sweet=OuterRef("pk"))
+            .order_by()
+            .values("sweet")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        ),
+        0,
+    )
+    ids = list(Sweet.objects.filter(shards__gt=0).order_by("pk").values_list("pk", flat=True))
+    changed = 0
+    for start in range(0, len(ids), batch_size):
+        changed += (
+            Sweet.objects.filter(pk__in=ids[start:start + batch_size])
+            .alias(live=live)
+            .exclude(quantity=F("live"))
+            .update(quantity=live)
+        )
+    return changed
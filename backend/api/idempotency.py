@@ -0,0 +1,171 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+# ------------------------------------------------------------------
+# IDEMPOTENCY KEYS
+# A client that may retry a write sends the same `Idempotency-Key`
+# header on every attempt. The first attempt runs and its response is
+# stored in IdempotencyKey; later attempts get that response back,
+# marked with `Idempotent-Replayed: true`, and run nothing.
+#
+# A request with a key costs one read on the (user, key) unique index.
+# When there is no stored response, the key row is inserted in the
+# same transaction as the work. A concurrent duplicate blocks on that
+# index entry until the first attempt finishes, then replays its
+# response, so only one of them ever runs. If the first attempt
+# fails (an exception or a 5xx), nothing is stored and a retry runs
+# again.
+#
+# Keys are per user, live IDEMPOTENCY_KEY_TTL_SECONDS, and are pruned
+# by manage.py prune_idempotency_keys. A replay does no work, so the
+# purchase throttles let it through (is_replay, api/throttling.py);
+# the handler reuses the row they read (stored_row).
+# ------------------------------------------------------------------
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+
+
+def request_hash(method, path, data):
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{method} {path}\n{body}".encode()).hexdigest()
+
+
+UNREAD = object()
+
+
+def execute(user_id, key, digest, handler, now=None, stored=UNREAD):
+    """
+    Runs `handler` once per (user, key) and returns its response, or
+    the stored response of an earlier run. `handler` returns a DRF
+    Response; `digest` is the request_hash() of the request. Pass the
+    (user, key) row, or None, as `stored` if it was already read.
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {"detail": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    now = now or timezone.now()
+    if stored is UNREAD:
+        stored = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+    if stored is not None and stored.expires_at <= now:
+        # Not pruned yet; a new request may reuse the key.
+        stored.delete()
+        stored = None
+
+    if stored is None:
+        response = run(user_id, key, digest, handler, now)
+        if response is not None:
+            return response
+        # A concurrent duplicate finished first.
+        stored = IdempotencyKey.objects.get(user_id=user_id, key=key)
+
+    if stored.request_hash != digest:
+        return Response(
+            {"detail": f"This {HEADER} was already used for a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(stored.response, status=stored.status_code, headers={REPLAYED_HEADER: "true"})
+
+
+def stored_row(request):
+    """
+    The IdempotencyKey row of the request's user and key (expired or
+    not), or None. Read once per request: the purchase throttles and
+    the idempotent handler share it.
+    """
+    if not hasattr(request, "_idempotency_row"):
+        key = request.headers.get(HEADER)
+        row = None
+        if key and len(key) <= MAX_KEY_LENGTH and request.user.is_authenticated:
+            row = IdempotencyKey.objects.filter(user_id=request.user.pk, key=key).first()
+        request._idempotency_row = row
+    return request._idempotency_row
+
+
+def is_replay(request, now=None):
+    """
+    True if `request` carries a key whose response is already stored,
+    so it will be answered from IdempotencyKey without running.
+    """
+    row = stored_row(request)
+    return row is not None and row.expires_at > (now or timezone.now())
+
+
+def execute_request(request, data, handler):
+    """
+    execute() for a request with an Idempotency-Key, reusing the row
+    stored_row() read.
+    """
+    return execute(
+        request.user.pk,
+        request.headers.get(HEADER),
+        request_hash(request.method, request.path, data),
+        handler,
+        stored=stored_row(request),
+    )
+
+
+def run(user_id, key, digest, handler, now):
+    """
+    Claims the key and runs `handler` in one transaction. Returns None
+    if another request holds the key.
+    """
+    ttl = timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                entry = IdempotencyKey.objects.create(
+                    user_id=user_id, key=key, request_hash=digest, expires_at=now + ttl
+                )
+        except IntegrityError:
+            return None
+
+        response = handler()
+        if response.status_code >= 500:
+            transaction.set_rollback(True)
+            return response
+
+        entry.status_code, entry.response = response.status_code, response.data
+        entry.save(update_fields=["status_code", "response"])
+    return response
+
+
+def idempotent(view_method):
+    """
+    Makes a DRF view method honour the Idempotency-Key header.
+    Requests without the header are passed straight through.
+    """
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        if request.headers.get(HEADER) is None:
+            return view_method(view, request, *args, **kwargs)
+        return execute_request(
+            request, request.data, lambda: view_method(view, request, *args, **kwargs)
+        )
+    return wrapper
+
+
+def prune(now=None, batch_size=1000):
+    """
+    Deletes expired keys, oldest first and `batch_size` per statement,
+    along the expires_at index. Returns how many were deleted.
+    """
+    expired = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).order_by("expires_at")
+    deleted = 0
+    while batch := list(expired.values_list("pk", flat=True)[:batch_size]):
+        deleted += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
+    return deleted
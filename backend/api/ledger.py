@@ -0,0 +1,140 @@
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.db import router, transaction
+from django.db.models import Max, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import StockMovement, StockSnapshot
+
+
+# ------------------------------------------------------------------
+# STOCK HISTORY
+# Every quantity change is a StockMovement row (see SweetQuerySet
+# take_stock / take_stock_many and the viewset). Nothing replays the
+# whole ledger: `take_snapshots()` (manage.py snapshot_stock, run
+# periodically) folds the movements since the last run into one
+# StockSnapshot per SKU that moved, and history queries read the
+# latest snapshot before T plus the movements between it and T.
+#
+# Writes that bypass the API (admin site, shell) are not in the
+# ledger; the adjustment movements of the viewset and the importer
+# cover every other quantity change.
+# ------------------------------------------------------------------
+
+# Movements younger than this are left for the next snapshot run, so a
+# transaction that stamped created_at but had not committed yet cannot
+# end up behind a snapshot.
+SETTLE = timedelta(seconds=60)
+
+SALES = Q(kind=StockMovement.SALE)
+
+
+def adjustments(changes, actor_id=None):
+    """
+    Adjustment movements for {sweet id: delta}; zero deltas are skipped.
+    """
+    return [
+        StockMovement(sweet_id=pk, kind=StockMovement.ADJUSTMENT, delta=delta, actor_id=actor_id)
+        for pk, delta in changes.items()
+        if delta
+    ]
+
+
+def record(movements):
+    if movements:
+        StockMovement.objects.bulk_create(movements)
+
+
+def position(sweet_id, when):
+    """
+    (quantity, all-time units sold) of one sweet at `when`: the latest
+    snapshot at or before it plus the movements since.
+    """
+    snapshot = (
+        StockSnapshot.objects.filter(sweet_id=sweet_id, taken_at__lte=when)
+        .order_by("-taken_at")
+        .values("taken_at", "quantity", "sold")
+        .first()
+    )
+    tail = StockMovement.objects.filter(sweet_id=sweet_id, created_at__lte=when)
+    quantity = sold = 0
+    if snapshot is not None:
+        tail = tail.filter(created_at__gt=snapshot["taken_at"])
+        quantity, sold = snapshot["quantity"], snapshot["sold"]
+
+    totals = tail.aggregate(net=Sum("delta"), sales=Sum("delta", filter=SALES))
+    return quantity + (totals["net"] or 0), sold - (totals["sales"] or 0)
+
+
+def stock_at(sweet_id, when):
+    return position(sweet_id, when)[0]
+
+
+def units_sold(sweet_id, start, end):
+    """
+    Units of one sweet sold in (start, end].
+    """
+    return position(sweet_id, end)[1] - position(sweet_id, start)[1]
+
+
+def sold_per_day(sweet_id, first, last):
+    """
+    {date: units sold} for every day from `first` to `last` inclusive,
+    with days in the current time zone.
+    """
+    days = [first + timedelta(days=n) for n in range((last - first).days + 2)]
+    sold = [
+        position(sweet_id, timezone.make_aware(datetime.combine(day, time.min)))[1]
+        for day in days
+    ]
+    return {day: sold[n + 1] - sold[n] for n, day in enumerate(days[:-1])}
+
+
+def take_snapshots(now=None, settle=SETTLE, batch_size=500):
+    """
+    Snapshots every sweet with movements since the last run, up to
+    `now - settle`. Returns the number of snapshots written.
+    """
+    cutoff = (now or timezone.now()) - settle
+    db = router.db_for_write(StockSnapshot)
+    snapshots = StockSnapshot.objects.using(db)
+
+    with transaction.atomic(using=db):
+        last = snapshots.aggregate(last=Max("taken_at"))["last"]
+        if last is not None and last >= cutoff:
+            return 0
+
+        window = StockMovement.objects.using(db).filter(created_at__lte=cutoff)
+        previous = snapshots.filter(sweet_id=OuterRef("sweet_id"))
+        if last is not None:
+            window = window.filter(created_at__gt=last)
+            # A run that committed meanwhile is not ours to build on.
+            previous = previous.filter(taken_at__lte=last)
+        latest = previous.order_by("-taken_at").values("taken_at")[:1]
+
+        totals = iter(
+            window.values("sweet_id")
+            .annotate(net=Sum("delta"), sales=Sum("delta", filter=SALES))
+            .order_by("sweet_id")
+        )
+        written = 0
+        while batch := list(islice(totals, batch_size)):
+            base = {
+                snapshot.sweet_id: snapshot
+                for snapshot in snapshots.filter(
+                    sweet_id__in=[row["sweet_id"] for row in batch], taken_at=Subquery(latest)
+                )
+            }
+            new = []
+            for row in batch:
+                before = base.get(row["sweet_id"])
+                new.append(StockSnapshot(
+                    sweet_id=row["sweet_id"],
+                    taken_at=cutoff,
+                    quantity=(before.quantity if before else 0) + row["net"],
+                    sold=(before.sold if before else 0) - (row["sales"] or 0),
+                ))
+            snapshots.bulk_create(new)
+            written += len(new)
+    return written
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api import reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Releases stock held by lapsed reservations, oldest first, in "
+        "batches. Run it every minute."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        released = reservations.expire(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{released} reservation(s) released"))
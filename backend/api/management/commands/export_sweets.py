@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api import catalogue
+
+
+class Command(BaseCommand):
+    help = "Streams the sweet catalogue out as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=catalogue.FORMATS, default="csv")
+        parser.add_argument("--output", "-o", default="-", help="File to write, or - for stdout.")
+        parser.add_argument("--chunk-size", type=int, default=catalogue.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = catalogue.export(options["format"], chunk_size=options["chunk_size"])
+
+        if options["output"] == "-":
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+
+        with open(options["output"], "w", newline="", encoding="utf-8") as out:
+            for chunk in chunks:
+                out.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported to {options['output']}"))
@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api import catalogue
+
+
+class Command(BaseCommand):
+    help = "Upserts sweets from a CSV or NDJSON file in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to read, or - for stdin.")
+        parser.add_argument("--format", choices=catalogue.FORMATS, default=None,
+                            help="Defaults to the file extension, else csv.")
+        parser.add_argument("--batch-size", type=int, default=catalogue.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+
+        if path == "-":
+            summary = self.run_import(sys.stdin, file_format, options["batch_size"])
+        else:
+            with open(path, newline="", encoding="utf-8") as source:
+                summary = self.run_import(source, file_format, options["batch_size"])
+
+        for error in summary["errors"]:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"created={summary['created']} updated={summary['updated']} failed={summary['failed']}"
+        ))
+
+    def run_import(self, source, file_format, batch_size):
+        records = catalogue.read_records(source, file_format)
+        return catalogue.import_records(records, batch_size=batch_size)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api import idempotency
+
+
+class Command(BaseCommand):
+    help = "Deletes expired Idempotency-Key responses in batches. Run it hourly."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = idempotency.prune(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} key(s) pruned"))
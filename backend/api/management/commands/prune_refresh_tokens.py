@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api import tokens
+
+
+class Command(BaseCommand):
+    help = "Deletes the records of expired refresh tokens in batches. Run it hourly."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = tokens.prune(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} token record(s) pruned"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api import hot
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the shard totals of hot-mode sweets back into Sweet.quantity "
+        "in batches. Run it every minute while any sweet is in hot mode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        changed = hot.reconcile(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{changed} sweet(s) reconciled"))
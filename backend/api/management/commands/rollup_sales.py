@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api import analytics, ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Updates the hourly/daily sales rollups behind /api/analytics/ from "
+        "the stock ledger. Run it every few minutes; --rebuild recomputes "
+        "them from the whole ledger."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Drop and recompute every rollup.")
+        parser.add_argument(
+            "--settle",
+            type=float,
+            default=ledger.SETTLE.total_seconds(),
+            help="Leave sales younger than this many seconds for the next run.",
+        )
+
+    def handle(self, *args, **options):
+        settle = timedelta(seconds=options["settle"])
+        if options["rebuild"]:
+            written = analytics.rebuild(settle=settle)
+        else:
+            written = analytics.refresh(settle=settle)
+        self.stdout.write(self.style.SUCCESS(f"{written} rollup row(s) written"))
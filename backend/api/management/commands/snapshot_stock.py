@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api import ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Folds recent stock movements into per-sweet snapshots, so stock "
+        "history queries only replay the movements since. Run it "
+        "periodically (e.g. every 15 minutes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settle",
+            type=float,
+            default=ledger.SETTLE.total_seconds(),
+            help="Leave movements younger than this many seconds for the next run.",
+        )
+
+    def handle(self, *args, **options):
+        written = ledger.take_snapshots(settle=timedelta(seconds=options["settle"]))
+        self.stdout.write(self.style.SUCCESS(f"{written} snapshot(s) written"))
@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the primary SQLite database into every DB_REPLICAS file, "
+        "standing in for replication when testing replicas locally."
+    )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES["default"]
+        if not primary["ENGINE"].endswith("sqlite3"):
+            raise CommandError("Only SQLite replicas can be synced; use streaming replication for PostgreSQL.")
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured (set DB_REPLICAS).")
+
+        source = sqlite3.connect(primary["NAME"])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                path = settings.DATABASES[alias]["NAME"]
+                target = sqlite3.connect(path)
+                try:
+                    # Online backup: consistent even while the primary is in use.
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stderr.write(self.style.SUCCESS(f"{alias}: copied to {path}"))
+        finally:
+            source.close()
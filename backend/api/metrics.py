@@ -0,0 +1,268 @@
+import logging
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger("api.perf")
+
+
+# ------------------------------------------------------------------
+# REQUEST METRICS
+# perf_middleware measures every request:
+#   - wall time;
+#   - database time and query count, from an execute wrapper that
+#     install() puts on every connection as it opens;
+#   - serializer time, from the serializers' `.data` and the
+#     sweet_rows() fast path (see timed());
+#   - response bytes. Streamed responses count as 0.
+# Figures are tagged by resolved URL name ("sweet-list",
+# "sweet-purchase", "login", ...) and method.
+#
+# A request is flagged, logged on the "api.perf" logger and counted,
+# when it is slower than PERF_SLOW_REQUEST_MS, runs more than
+# PERF_MAX_QUERIES queries, or runs one statement PERF_N_PLUS_ONE
+# times or more (the N+1 pattern).
+#
+# Totals are kept in memory, per process, and served in Prometheus
+# text format at GET /api/metrics/ to METRICS_ALLOWED_IPS only. Every
+# series carries a `pid` label, so the workers behind one port never
+# mix their counters; sum over `pid` for totals.
+#
+# Cost per request: a few perf_counter() calls and one lock-protected
+# update of plain ints and floats. Per query: one dict update.
+# ------------------------------------------------------------------
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar("perf_stats", default=None)
+
+
+class RequestStats:
+    __slots__ = ("db", "queries", "serializer", "statements", "serializing")
+
+    def __init__(self):
+        self.db = 0.0
+        self.queries = 0
+        self.serializer = 0.0
+        # SQL template -> executions, for spotting N+1 loops.
+        self.statements = {}
+        self.serializing = False
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db += perf_counter() - start
+        stats.queries += 1
+        stats.statements[sql] = stats.statements.get(sql, 0) + 1
+
+
+def add_query_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    """
+    Called from ApiConfig.ready(): times the queries of every database
+    connection opened from now on.
+    """
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(add_query_wrapper, dispatch_uid="api.metrics")
+
+
+@contextmanager
+def timed():
+    """
+    Adds the time spent in the block to the request's serializer time.
+    Nested blocks count once.
+    """
+    stats = _current.get()
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer += perf_counter() - start
+        stats.serializing = False
+
+
+# ------------------------------------------------------------------
+# In-process totals
+# ------------------------------------------------------------------
+class Series:
+    __slots__ = ("buckets", "count", "wall", "db", "queries", "serializer", "bytes")
+
+    def __init__(self):
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.count = 0
+        self.wall = self.db = self.serializer = 0.0
+        self.queries = self.bytes = 0
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}    # (view, method) -> Series
+        self.statuses = {}  # (view, method, "2xx") -> requests
+        self.flags = {}     # (view, method, flag) -> requests
+
+    def observe(self, view, method, status, wall, stats, size, flags):
+        with self.lock:
+            series = self.series.get((view, method))
+            if series is None:
+                series = self.series[(view, method)] = Series()
+            series.buckets[bisect_left(DURATION_BUCKETS, wall)] += 1
+            series.count += 1
+            series.wall += wall
+            series.db += stats.db
+            series.queries += stats.queries
+            series.serializer += stats.serializer
+            series.bytes += size
+
+            key = (view, method, f"{status // 100}xx")
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            for flag in flags:
+                key = (view, method, flag)
+                self.flags[key] = self.flags.get(key, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+            self.statuses.clear()
+            self.flags.clear()
+
+    def render(self):
+        pid = os.getpid()
+
+        def labels(view, method, **extra):
+            pairs = {"view": view, "method": method, **extra, "pid": pid}
+            return ",".join(f'{name}="{escape(value)}"' for name, value in pairs.items())
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        with self.lock:
+            series = sorted(self.series.items())
+            metric("api_requests_total", "counter", "Requests served.", [
+                f"api_requests_total{{{labels(view, method, status=status)}}} {n}"
+                for (view, method, status), n in sorted(self.statuses.items())
+            ])
+            histogram = []
+            for (view, method), s in series:
+                cumulative = 0
+                for bound, n in zip((*DURATION_BUCKETS, "+Inf"), s.buckets):
+                    cumulative += n
+                    histogram.append(
+                        f"api_request_duration_seconds_bucket{{{labels(view, method, le=bound)}}} {cumulative}"
+                    )
+                histogram.append(f"api_request_duration_seconds_sum{{{labels(view, method)}}} {s.wall:.6f}")
+                histogram.append(f"api_request_duration_seconds_count{{{labels(view, method)}}} {s.count}")
+            metric("api_request_duration_seconds", "histogram", "Wall time per request.", histogram)
+            for name, attr, help_text in (
+                ("api_request_db_seconds_total", "db", "Time spent in database queries."),
+                ("api_request_queries_total", "queries", "Database queries run."),
+                ("api_request_serializer_seconds_total", "serializer", "Time spent serializing responses."),
+                ("api_response_bytes_total", "bytes", "Response body bytes (not streamed ones)."),
+            ):
+                metric(name, "counter", help_text, [
+                    f"{name}{{{labels(view, method)}}} {format_value(getattr(s, attr))}"
+                    for (view, method), s in series
+                ])
+            metric("api_request_flags_total", "counter", "Requests flagged slow, query-heavy or N+1.", [
+                f"api_request_flags_total{{{labels(view, method, flag=flag)}}} {n}"
+                for (view, method, flag), n in sorted(self.flags.items())
+            ])
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+
+# ------------------------------------------------------------------
+# Middleware
+# ------------------------------------------------------------------
+@sync_and_async_middleware
+def perf_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            stats, start = RequestStats(), perf_counter()
+            token = _current.set(stats)
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            finish(request, response, stats, perf_counter() - start)
+            return response
+    else:
+        def middleware(request):
+            stats, start = RequestStats(), perf_counter()
+            token = _current.set(stats)
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            finish(request, response, stats, perf_counter() - start)
+            return response
+    return middleware
+
+
+def finish(request, response, stats, wall):
+    match = request.resolver_match
+    view = match.view_name if match is not None else "unresolved"
+    size = 0 if response.streaming else len(response.content)
+
+    flags = []
+    if wall * 1000 > settings.PERF_SLOW_REQUEST_MS:
+        flags.append("slow")
+    if stats.queries > settings.PERF_MAX_QUERIES:
+        flags.append("queries")
+    repeated, times = max(stats.statements.items(), key=lambda item: item[1], default=(None, 0))
+    if times >= settings.PERF_N_PLUS_ONE:
+        flags.append("n_plus_one")
+
+    registry.observe(view, request.method, response.status_code, wall, stats, size, flags)
+    if flags:
+        logger.warning(
+            "%s %s [%s] %s: %.1f ms, %d queries (%.1f ms), serializer %.1f ms%s",
+            request.method, request.path, view, ",".join(flags), wall * 1000,
+            stats.queries, stats.db * 1000, stats.serializer * 1000,
+            f"; {times}x {repeated[:200]}" if "n_plus_one" in flags else "",
+        )
+
+
+# ------------------------------------------------------------------
+# GET /api/metrics/
+# ------------------------------------------------------------------
+def metrics_view(request):
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:05
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sweet',
+            index=models.Index(django.db.models.functions.text.Upper('category'), models.F('price'), name='sweet_category_ci_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sweet',
+            index=models.Index(fields=['price'], name='sweet_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sweet',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['price'], name='sweet_in_stock_price_idx'),
+        ),
+    ]
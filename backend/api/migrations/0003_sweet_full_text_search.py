@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:07
+
+import api.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_sweet_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SweetSearchEntry',
+            fields=[
+                ('sweet', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='api.sweet')),
+                ('name', models.CharField(max_length=200)),
+                ('category', models.CharField(max_length=100)),
+                ('document', api.search.SearchDocumentField(db_column='api_sweet_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'api_sweet_fts',
+                'managed': False,
+            },
+        ),
+        # FTS5 table + sync triggers on SQLite, GIN index on PostgreSQL.
+        migrations.RunPython(api.search.install_search_index, api.search.remove_search_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:18
+
+import api.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_sweet_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sweet',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        # SQLite rebuilds api_sweet to add a NOT NULL column, which drops
+        # the full-text sync triggers; put them back.
+        migrations.RunPython(api.search.install_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_stock(apps, schema_editor):
+    # The ledger starts from today's quantities, so replaying it gives
+    # the right stock level from here on.
+    Sweet = apps.get_model("api", "Sweet")
+    StockMovement = apps.get_model("api", "StockMovement")
+    db = schema_editor.connection.alias
+    rows = Sweet.objects.using(db).filter(quantity__gt=0).values_list("id", "quantity")
+    StockMovement.objects.using(db).bulk_create(
+        (StockMovement(sweet_id=pk, kind="adjustment", delta=quantity) for pk, quantity in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_sweet_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('restock', 'Restock'), ('adjustment', 'Adjustment')], max_length=10)),
+                ('delta', models.IntegerField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('sweet', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='movements', to='api.sweet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sweet', 'created_at'], name='movement_sweet_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('sold', models.PositiveIntegerField()),
+                ('sweet', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='snapshots', to='api.sweet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sweet', 'taken_at'), name='snapshot_sweet_taken_uniq')],
+            },
+        ),
+        migrations.RunPython(record_opening_stock, migrations.RunPython.noop),
+    ]
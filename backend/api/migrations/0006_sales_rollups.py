@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def price_earlier_sales(apps, schema_editor):
+    # Sales recorded before unit_price existed get the current price,
+    # the best figure left for them.
+    Sweet = apps.get_model("api", "Sweet")
+    StockMovement = apps.get_model("api", "StockMovement")
+    db = schema_editor.connection.alias
+    StockMovement.objects.using(db).filter(kind="sale", unit_price__isnull=True).update(
+        unit_price=Subquery(Sweet.objects.filter(pk=OuterRef("sweet_id")).values("price")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('category', models.CharField(max_length=100)),
+                ('units', models.PositiveIntegerField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('sweet', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.sweet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('period', 'bucket', 'sweet'), name='rollup_period_bucket_sweet_uniq')],
+            },
+        ),
+        migrations.RunPython(price_earlier_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:13
+
+import api.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sweet',
+            name='shards',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('sweet', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='api.sweet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sweet', 'shard'), name='shard_sweet_shard_uniq')],
+            },
+        ),
+        # SQLite rebuilt api_sweet for the new column, which drops the
+        # full-text sync triggers; put them back.
+        migrations.RunPython(api.search.install_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:22
+
+import api.search
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_hot_sku_shards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sweet',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RemoveIndex(
+            model_name='sweet',
+            name='sweet_in_stock_price_idx',
+        ),
+        migrations.AddIndex(
+            model_name='sweet',
+            index=models.Index(condition=models.Q(('quantity__gt', models.F('reserved'))), fields=['price'], name='sweet_in_stock_price_idx'),
+        ),
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('sweet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='api.sweet')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        # SQLite rebuilt api_sweet for the new column, which drops the
+        # full-text sync triggers; put them back.
+        migrations.RunPython(api.search.install_search_index, migrations.RunPython.noop),
+    ]
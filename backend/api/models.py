@@ -1,10 +1,509 @@
-from django.db import models
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, router, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .cache import bump_catalogue_version
+from .search import FTS_TABLE, SearchDocumentField
+
+class SweetQuerySet(models.QuerySet):
+    # Writes that bypass save()/delete() send no signals and skip
+    # auto_now, so they stamp `updated_at` and invalidate the response
+    # cache themselves.
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        updated = super().update(**kwargs)
+        if updated:
+            bump_catalogue_version()
+        return updated
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        if created:
+            bump_catalogue_version()
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = [*fields, "updated_at"] if "updated_at" not in fields else fields
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        if updated:
+            bump_catalogue_version()
+        return updated
+
+    def take_stock(self, pk, amount, actor_id=None):
+        """
+        Atomically removes `amount` units from one sweet, but only if that
+        many are available (in stock and not held by a Reservation, see
+        api.reservations), and records the sale in the StockMovement
+        ledger. Returns the updated Sweet, or None when the sweet is
+        missing or short of stock.
+
+        This is a single conditional UPDATE, so concurrent buyers can
+        never oversell or lose each other's decrements, and no row lock
+        is held across a read-modify-write. Sweets in hot mode (api.hot)
+        fail that UPDATE and are sold from their shards instead.
+        """
+        # self.db would be a read alias when replicas are configured.
+        db = self._db or router.db_for_write(self.model)
+        connection = connections[db]
+        now = timezone.now()
+        if not connection.features.can_return_columns_from_insert:
+            with transaction.atomic(using=db):
+                updated = self.using(db).filter(
+                    pk=pk, shards=0, quantity__gte=F("reserved") + amount
+                ).update(
+                    quantity=F("quantity") - amount
+                )
+                if not updated:
+                    return self.take_from_shards(pk, amount, actor_id, db)
+                sweet = self.using(db).filter(pk=pk).first()
+                StockMovement.objects.using(db).create(
+                    sweet_id=pk, kind=StockMovement.SALE, delta=-amount,
+                    actor_id=actor_id, created_at=now, unit_price=sweet.price,
+                )
+            return sweet
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        ledger = connection.ops.quote_name(StockMovement._meta.db_table)
+        update = (
+            f"UPDATE {table} SET quantity = quantity - %s, updated_at = %s "
+            f"WHERE id = %s AND shards = 0 AND quantity - reserved >= %s "
+            f"RETURNING id, name, category, price, quantity, reserved, updated_at"
+        )
+        insert = (
+            f"INSERT INTO {ledger} (sweet_id, kind, delta, actor_id, created_at, unit_price) "
+            f"SELECT id, %s, %s, %s, %s, price FROM sold"
+        )
+        sale = [StockMovement.SALE, -amount, actor_id, now]
+
+        if connection.vendor == "postgresql":
+            # One statement, so one round trip, atomic even in autocommit:
+            # the conditional UPDATE of a normal sweet or, for a hot one,
+            # of a single shard with enough stock that no other buyer is
+            # holding, plus the ledger INSERT. A normal sweet has no shard
+            # rows; a hot one fails `shards = 0`. The shard total is read
+            # from before the UPDATE, hence the `- amount`.
+            shards = connection.ops.quote_name(StockShard._meta.db_table)
+            rows = self.raw(
+                f"WITH plain AS ({update}), "
+                f"taken AS (UPDATE {shards} SET quantity = quantity - %s WHERE id = ("
+                f"SELECT id FROM {shards} WHERE sweet_id = %s AND quantity >= %s "
+                f"ORDER BY random() LIMIT 1 FOR UPDATE SKIP LOCKED) RETURNING sweet_id), "
+                f"hot AS (SELECT s.id, s.name, s.category, s.price, "
+                f"(SELECT SUM(quantity) FROM {shards} WHERE sweet_id = s.id) - %s AS quantity, "
+                f"s.reserved, s.updated_at "
+                f"FROM {table} s JOIN taken ON taken.sweet_id = s.id), "
+                f"sold AS (SELECT * FROM plain UNION ALL SELECT * FROM hot), "
+                f"logged AS ({insert}) SELECT * FROM sold",
+                [amount, now, pk, amount, amount, pk, amount, amount, *sale],
+                using=db,
+            )
+            sweet = next(iter(rows), None)
+        else:
+            # SQLite has no data-modifying CTEs, but it is in-process, so
+            # the second statement costs no network round trip.
+            with transaction.atomic(using=db):
+                sweet = next(iter(self.raw(update, [amount, now, pk, amount], using=db)), None)
+                if sweet is not None:
+                    StockMovement.objects.using(db).create(
+                        sweet_id=pk, kind=StockMovement.SALE, delta=-amount,
+                        actor_id=actor_id, created_at=now, unit_price=sweet.price,
+                    )
+
+        if sweet is None:
+            return self.take_from_shards(pk, amount, actor_id, db)
+        bump_catalogue_version()
+        return sweet
+
+    def take_from_shards(self, pk, amount, actor_id, db):
+        """
+        take_stock for a sweet in hot mode: takes the whole amount from
+        one shard that has it (on PostgreSQL take_stock's statement has
+        already tried). Only when no single shard has enough, or all
+        are busy, are they all locked and the amount gathered across
+        them. Returns None
+        for a sweet that is missing, not in hot mode or short of stock.
+        """
+        # Also turns a pk from the URL into the int the shards are keyed on.
+        pk = self.using(db).filter(pk=pk, shards__gt=0).values_list("pk", flat=True).first()
+        if pk is None:
+            return None
+
+        connection = connections[db]
+        now = timezone.now()
+        sweet = None
+        if connection.vendor != "postgresql":
+            # PostgreSQL has already tried a single shard in take_stock.
+            shards = connection.ops.quote_name(StockShard._meta.db_table)
+            with transaction.atomic(using=db):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"UPDATE {shards} SET quantity = quantity - %s WHERE id = ("
+                        f"SELECT id FROM {shards} WHERE sweet_id = %s AND quantity >= %s "
+                        f"ORDER BY random() LIMIT 1) RETURNING sweet_id",
+                        [amount, pk, amount],
+                    )
+                    taken = cursor.fetchone()
+                if taken is not None:
+                    sweet = self.using(db).get(pk=pk)
+                    sweet.quantity = StockShard.objects.using(db).total(pk)
+                    StockMovement.objects.using(db).create(
+                        sweet_id=pk, kind=StockMovement.SALE, delta=-amount,
+                        actor_id=actor_id, created_at=now, unit_price=sweet.price,
+                    )
+
+        if sweet is None:
+            # Every shard is short (or busy): gather under lock.
+            with transaction.atomic(using=db):
+                left, short = StockShard.objects.using(db).take_locked({pk: amount})
+                if short:
+                    return None
+                sweet = self.using(db).get(pk=pk)
+                sweet.quantity = left[pk]
+                StockMovement.objects.using(db).create(
+                    sweet_id=pk, kind=StockMovement.SALE, delta=-amount,
+                    actor_id=actor_id, created_at=now, unit_price=sweet.price,
+                )
+
+        bump_catalogue_version()
+        return sweet
+
+    async def atake_stock(self, pk, amount, actor_id=None):
+        # Same pattern as Django's own aget()/acount(): the database
+        # drivers are synchronous, so the query runs on the thread that
+        # owns this request's connection.
+        return await sync_to_async(self.take_stock)(pk, amount, actor_id)
+
+    def take_stock_many(self, amounts, actor_id=None):
+        """
+        All-or-nothing `take_stock` for a cart. `amounts` maps sweet id to
+        units wanted. Returns `(sweets, short)`: the sweets by id, and the
+        ids that are missing or short of stock. If `short` is not empty,
+        nothing was taken.
+        """
+        ids = sorted(amounts)
+        wanted = Case(
+            *[When(id=pk, then=Value(amounts[pk])) for pk in ids],
+            output_field=models.PositiveIntegerField(),
+        )
+
+        db = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            # Lock in ascending id order so two carts sharing SKUs queue up
+            # behind each other instead of deadlocking.
+            sweets = {
+                sweet.id: sweet
+                for sweet in self.using(db).select_for_update().filter(id__in=ids).order_by("id")
+            }
+            hot = [pk for pk in ids if pk in sweets and sweets[pk].shards]
+            plain = [pk for pk in ids if pk not in hot]
+            short = [
+                pk for pk in plain
+                if pk not in sweets or sweets[pk].quantity - sweets[pk].reserved < amounts[pk]
+            ]
+            if short:
+                return sweets, short
+
+            # Hot sweets (api.hot) are taken from their shards.
+            if hot:
+                left, short = StockShard.objects.using(db).take_locked({pk: amounts[pk] for pk in hot})
+                if short:
+                    return sweets, short
+                for pk in hot:
+                    sweets[pk].quantity = left[pk] + amounts[pk]
+
+            # One UPDATE for every other line. The WHERE guard still holds
+            # where FOR UPDATE is a no-op (SQLite), so a late writer can only
+            # make the whole cart fail, never oversell.
+            updated = self.using(db).filter(id__in=plain, quantity__gte=F("reserved") + wanted).update(
+                quantity=F("quantity") - wanted
+            ) if plain else 0
+            if updated != len(plain):
+                transaction.set_rollback(True, using=db)
+                return sweets, ids
+            if hot and not plain:
+                bump_catalogue_version()
+
+            StockMovement.objects.using(db).bulk_create([
+                StockMovement(
+                    sweet_id=pk, kind=StockMovement.SALE, delta=-amounts[pk],
+                    actor_id=actor_id, unit_price=sweets[pk].price,
+                )
+                for pk in ids
+            ])
+
+        for pk in ids:
+            sweets[pk].quantity -= amounts[pk]
+        return sweets, []
+
 
 class Sweet(models.Model):
     name = models.CharField(max_length=200)
     category = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=8, decimal_places=2)
     quantity = models.PositiveIntegerField(default=0)
+    # Drives ETag / Last-Modified on the sweets endpoints.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Hot mode (api.hot): with N > 0 the stock lives in N StockShard
+    # rows and `quantity` is their total as of the last reconcile.
+    shards = models.PositiveSmallIntegerField(default=0)
+    # Units held by unexpired Reservations (api.reservations); what can
+    # be sold is `quantity - reserved`.
+    reserved = models.PositiveIntegerField(default=0)
+
+    objects = SweetQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Case-insensitive category lookups, optionally narrowed by a
+            # price range. The leading UPPER(category) also serves
+            # category-only filters, so no separate index is needed.
+            models.Index(Upper("category"), F("price"), name="sweet_category_ci_price_idx"),
+            # min_price / max_price without a category, and ?ordering=price.
+            models.Index(fields=["price"], name="sweet_price_idx"),
+            # Partial index over sellable rows only, for storefront pages
+            # such as ?in_stock=true&ordering=price.
+            models.Index(
+                fields=["price"], condition=Q(quantity__gt=F("reserved")), name="sweet_in_stock_price_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class StockShardQuerySet(models.QuerySet):
+    def total(self, sweet_id):
+        return self.filter(sweet_id=sweet_id).aggregate(total=models.Sum("quantity"))["total"] or 0
+
+    def take_locked(self, amounts):
+        """
+        Inside a transaction: locks every shard of the sweets in
+        `amounts` ({sweet id: units}) and takes each amount across them,
+        fullest shards first. Returns `(left, short)`: units left per
+        sweet, and the sweets short of stock, in which case nothing was
+        taken.
+        """
+        held = defaultdict(list)
+        for shard in self.select_for_update().filter(sweet_id__in=amounts).order_by("sweet_id", "shard"):
+            held[shard.sweet_id].append(shard)
+
+        left = {pk: sum(s.quantity for s in held[pk]) - amount for pk, amount in amounts.items()}
+        short = [pk for pk, units in left.items() if units < 0]
+        if short:
+            return left, short
+
+        changed = []
+        for pk, wanted in amounts.items():
+            for shard in sorted(held[pk], key=lambda s: -s.quantity):
+                if not wanted:
+                    break
+                part = min(wanted, shard.quantity)
+                shard.quantity -= part
+                wanted -= part
+                changed.append(shard)
+        self.bulk_update(changed, ["quantity"])
+        return left, []
+
+
+class StockShard(models.Model):
+    """
+    One slice of a hot sweet's stock (see api.hot). Buyers decrement
+    different shards, so they don't queue on one row lock.
+    """
+    sweet = models.ForeignKey(Sweet, on_delete=models.CASCADE, db_index=False, related_name="stock_shards")
+    shard = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField()
+
+    objects = StockShardQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["sweet", "shard"], name="shard_sweet_shard_uniq"),
+        ]
+
+
+class Reservation(models.Model):
+    """
+    A customer's hold on `quantity` units of a sweet until `expires_at`
+    (see api.reservations). The held units are counted in
+    `Sweet.reserved` for as long as the row exists.
+    """
+    sweet = models.ForeignKey(Sweet, on_delete=models.CASCADE, related_name="reservations")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    # The sweeper walks lapsed holds oldest first along this index.
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.quantity} of sweet {self.sweet_id} until {self.expires_at:%H:%M:%S}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The stored outcome of a request sent with an Idempotency-Key header
+    (see api.idempotency), replayed to retries of the same request
+    until `expires_at`.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_index=False,  # covered by idempotency_user_key_uniq
+        related_name="+",
+    )
+    key = models.CharField(max_length=255)
+    # SHA-256 of method, path and body, to catch a key reused for a
+    # different request.
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_user_key_uniq"),
+        ]
+
+
+class OutstandingRefreshToken(models.Model):
+    """
+    One row per refresh token issued (see api.tokens). A token can be
+    exchanged once: `rotated_at` is set when it is, and from then on
+    the token is blacklisted.
+    """
+    jti = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    expires_at = models.DateTimeField(db_index=True)
+    rotated_at = models.DateTimeField(null=True, blank=True)
+
+
+class StockMovement(models.Model):
+    """
+    Append-only stock ledger: one row per change to `Sweet.quantity`,
+    written in the same transaction as the change. Rows are never
+    updated or deleted, and outlive the sweet they refer to.
+    See api.ledger for the queries and snapshots on top of it.
+    """
+    SALE = "sale"
+    RESTOCK = "restock"
+    ADJUSTMENT = "adjustment"
+    KIND_CHOICES = [(SALE, "Sale"), (RESTOCK, "Restock"), (ADJUSTMENT, "Adjustment")]
+
+    sweet = models.ForeignKey(
+        Sweet,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,  # covered by movement_sweet_created_idx
+        related_name="movements",
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    delta = models.IntegerField()
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # Sales only: the price paid, for revenue (api/analytics.py).
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Per-SKU tails after a snapshot ("stock at time T").
+            models.Index(fields=["sweet", "created_at"], name="movement_sweet_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.delta:+d} of sweet {self.sweet_id}"
+
+
+class StockSnapshot(models.Model):
+    """
+    Per-SKU running totals over every movement with
+    `created_at <= taken_at`, so history queries start here and only
+    replay the movements after it.
+    """
+    sweet = models.ForeignKey(
+        Sweet,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,  # covered by snapshot_sweet_taken_uniq
+        related_name="snapshots",
+    )
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+    sold = models.PositiveIntegerField()  # all-time units sold
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["sweet", "taken_at"], name="snapshot_sweet_taken_uniq"),
+        ]
+
+
+class SalesRollup(models.Model):
+    """
+    Units sold and revenue per sweet per hour or day, rebuilt from the
+    sale movements by api.analytics. Dashboards read these instead of
+    the ledger.
+    """
+    HOUR = "hour"
+    DAY = "day"
+    PERIOD_CHOICES = [(HOUR, "Hour"), (DAY, "Day")]
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField()  # start of the hour / local day
+    sweet = models.ForeignKey(
+        Sweet,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+    category = models.CharField(max_length=100)
+    units = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            # Also serves every dashboard query (period + bucket range).
+            models.UniqueConstraint(fields=["period", "bucket", "sweet"], name="rollup_period_bucket_sweet_uniq"),
+        ]
+
+
+class SweetSearchEntry(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over `Sweet.name` and
+    `Sweet.category`. The table and its sync triggers are created by
+    migration 0003 (see `api.search`); it does not exist on PostgreSQL.
+    """
+    sweet = models.OneToOneField(
+        Sweet,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_entry",
+    )
+    name = models.CharField(max_length=200)
+    category = models.CharField(max_length=100)
+    document = SearchDocumentField(db_column=FTS_TABLE)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
@@ -0,0 +1,226 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# ------------------------------------------------------------------
+# KEYSET (CURSOR) PAGINATION FOR SWEETS
+# Pagination is opt-in: plain `GET /api/sweets/` keeps returning a
+# list so the existing frontend keeps working. Passing `page_size` or
+# `cursor` switches to keyset mode, where every page is a
+# `WHERE (key) > (last key) ORDER BY key LIMIT n` query, so page N
+# costs the same as page 1.
+# ------------------------------------------------------------------
+class SweetKeysetPagination(BasePagination):
+    page_size = 50
+    max_page_size = 500
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering_query_param = "ordering"
+    count_query_param = "count"
+
+    # Every ordering ends in `id` so the key is unique and stable.
+    orderings = {
+        "id": ("id",),
+        "price": ("price", "id"),
+        "name": ("name", "id"),
+    }
+    default_ordering = "id"
+
+    invalid_cursor_message = "Invalid cursor."
+
+    # What each key column's cursor value must convert to; a cursor is
+    # client input, so anything that doesn't convert is rejected here
+    # rather than failing in the query.
+    field_types = {
+        "id": "int",
+        "price": "decimal",
+        "name": "str",
+    }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.setup(request)
+        self.count = queryset.count() if self.wants_count(request) else None
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        `paginate_queryset` for the async views (api/async_views.py).
+        """
+        if not self.is_requested(request):
+            return None
+
+        self.setup(request)
+        self.count = await queryset.acount() if self.wants_count(request) else None
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def get_paginated_data(self, data):
+        body = {"next": self.get_next_link(), "results": data}
+        if self.count is not None:
+            body = {"count": self.count, **body}
+        return body
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    # --------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def key_fields(self, request):
+        """
+        Columns the page rows must carry to build the next cursor.
+        """
+        return self.orderings[self.get_ordering(request).lstrip("-")]
+
+    def wants_count(self, request):
+        value = request.query_params.get(self.count_query_param, "")
+        return value.lower() in ("1", "true", "yes")
+
+    def setup(self, request):
+        self.request = request
+        self.ordering = self.get_ordering(request)
+        self.page_size = self.get_page_size(request)
+
+    def page_queryset(self, queryset, request):
+        """
+        The unevaluated query for one page, plus one extra row.
+        """
+        fields = self.orderings[self.ordering.lstrip("-")]
+        descending = self.ordering.startswith("-")
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(fields, cursor, descending))
+
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(*[prefix + field for field in fields])
+
+        # The extra row tells us whether there is a next page without
+        # issuing a COUNT(*).
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        if ordering.lstrip("-") not in self.orderings:
+            return self.default_ordering
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def keyset_filter(self, fields, values, descending):
+        """
+        Expands `(a, b) > (x, y)` into `a > x OR (a = x AND b > y)`,
+        which every database can answer from an index on `(a, b)`.
+        """
+        lookup = "lt" if descending else "gt"
+        condition = Q()
+        for i, field in enumerate(fields):
+            equal = {fields[j]: values[j] for j in range(i)}
+            condition |= Q(**equal, **{f"{field}__{lookup}": values[i]})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        last = self.page[-1]
+        fields = self.orderings[self.ordering.lstrip("-")]
+        values = [self.get_value(last, field) for field in fields]
+        cursor = self.encode_cursor(values)
+
+        # The total is only worked out for the first page; following
+        # pages stay a single indexed range query.
+        url = remove_query_param(self.request.build_absolute_uri(), self.count_query_param)
+        url = replace_query_param(url, self.cursor_query_param, cursor)
+        return replace_query_param(url, self.page_size_query_param, self.page_size)
+
+    def get_value(self, row, field):
+        value = row[field] if isinstance(row, dict) else getattr(row, field)
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, values):
+        payload = json.dumps({"o": self.ordering, "v": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = payload["v"]
+            ordering = payload["o"]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor is only meaningful for the ordering it was built with.
+        fields = self.orderings[self.ordering.lstrip("-")]
+        if ordering != self.ordering or not isinstance(values, list) or len(values) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            return [self.coerce(field, value) for field, value in zip(fields, values)]
+        except (InvalidOperation, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def coerce(self, field, value):
+        kind = self.field_types[field]
+        if kind == "int":
+            # bool is an int to Python, and a float would be truncated.
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                raise TypeError(value)
+            value = int(value)
+            if not 0 < value < 2 ** 63:
+                raise ValueError(value)
+            return value
+        if kind == "decimal":
+            if not isinstance(value, str):
+                raise TypeError(value)
+            value = Decimal(value)
+            if not value.is_finite():
+                raise ValueError(value)
+            return value
+        if not isinstance(value, str):
+            raise TypeError(value)
+        return value
@@ -0,0 +1,150 @@
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth import hashers
+from django.contrib.auth.backends import ModelBackend
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+# ------------------------------------------------------------------
+# PASSWORD HASHING
+# Django's default PBKDF2 (1,000,000 iterations) costs about half a
+# second of CPU per login or register. The hashers below are the same
+# Django hashers with their cost taken from settings; PASSWORD_HASHER
+# picks the one new hashes use:
+#   argon2  - argon2id, 19 MiB, 2 passes (OWASP's baseline)
+#   scrypt  - N=2**14, r=8, p=1 (16 MiB)
+#   pbkdf2  - Django's default
+# All of them stay in PASSWORD_HASHERS, so existing hashes keep
+# working. When a user logs in with a hash made by another hasher or
+# with other parameters, PasswordBackend stores a new one. That is a
+# plain UPDATE, which does not revoke the user's tokens the way a
+# password change does (see signals.py).
+#
+# Hashing is capped, not offloaded. Hashes run on a per-process pool
+# of PASSWORD_HASH_WORKERS threads, but the request's worker waits
+# for the result and stays busy for the whole hash. Under sync
+# gunicorn that is the worker process itself; under uvicorn the DRF
+# auth views already run on a worker thread, off the event loop.
+# What the pool bounds is how many requests of a process hash at once
+# (OpenSSL and argon2 release the GIL while they hash), so a login
+# storm cannot take all the CPU from purchases. Up to
+# PASSWORD_HASH_QUEUE more requests wait for a turn. Anything beyond
+# that waits PASSWORD_HASH_WAIT_MS at most, then gets a 503 with
+# Retry-After instead of piling up. PASSWORD_HASH_WORKERS=0 hashes
+# inline with no cap.
+# ------------------------------------------------------------------
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many sign-ins at the moment, please retry shortly."
+    default_code = "password_hashing_busy"
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF's exception handler turns this into Retry-After.
+        self.wait = wait
+
+
+class HashingPool:
+    def __init__(self):
+        # Set in the pool's own threads: PBKDF2 and scrypt verify() call
+        # encode(), which must then run inline, not queue behind itself.
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.pid = None
+        self.executor = None
+        self.slots = None
+
+    def start(self):
+        # Built on first use in each process: a pool created before a
+        # fork would have no threads in the child.
+        with self.lock:
+            if self.pid != os.getpid():
+                self.executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix="password-hash",
+                    initializer=self.mark_worker,
+                )
+                self.slots = threading.BoundedSemaphore(
+                    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE
+                )
+                self.pid = os.getpid()
+
+    def mark_worker(self):
+        self.local.worker = True
+
+    def run(self, fn, *args):
+        if settings.PASSWORD_HASH_WORKERS <= 0 or getattr(self.local, "worker", False):
+            return fn(*args)
+        if self.pid != os.getpid():
+            self.start()
+
+        wait = settings.PASSWORD_HASH_WAIT_MS / 1000
+        if not self.slots.acquire(timeout=wait):
+            raise PasswordHashingBusy(wait=max(math.ceil(wait), 1))
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+
+pool = HashingPool()
+
+
+class PooledHasherMixin:
+    def encode(self, password, salt, *args, **kwargs):
+        return pool.run(partial(super().encode, password, salt, *args, **kwargs))
+
+    def verify(self, password, encoded):
+        return pool.run(super().verify, password, encoded)
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    time_cost = settings.PASSWORD_ARGON2_TIME_COST
+    memory_cost = settings.PASSWORD_ARGON2_MEMORY_KIB
+    parallelism = settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(PooledHasherMixin, hashers.ScryptPasswordHasher):
+    work_factor = settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class PBKDF2SHA1PasswordHasher(PooledHasherMixin, hashers.PBKDF2SHA1PasswordHasher):
+    pass
+
+
+class PasswordBackend(ModelBackend):
+    """
+    ModelBackend, except that upgrading a user's hash on login is a
+    queryset update: no post_save, so no token revocation.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        User = get_user_model()
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway, so unknown usernames take as long as known ones.
+            hashers.make_password(password)
+            return None
+
+        def rehash(raw_password):
+            user.password = hashers.make_password(raw_password)
+            User._default_manager.filter(pk=user.pk).update(password=user.password)
+
+        if hashers.check_password(password, user.password, setter=rehash) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+# ------------------------------------------------------------------
+# FAST JSON RENDERER
+# Same output as DRF's compact JSONRenderer, produced by orjson when
+# it is installed (several times faster on large lists). Decimals are
+# written as strings, like COERCE_DECIMAL_TO_STRING, never as floats.
+# Without orjson, or when indented output is asked for, it is DRF's
+# JSONRenderer.
+# ------------------------------------------------------------------
+def default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    # Lazy translation strings, querysets, ... as DRF would.
+    return JSONEncoder().default(obj)
+
+
+def dumps(data):
+    return orjson.dumps(data, default=default)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return dumps(data)
+        except TypeError:
+            # orjson only takes str dict keys; DRF's list validation
+            # errors are keyed by row index.
+            return super().render(data, accepted_media_type, renderer_context)
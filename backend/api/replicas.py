@@ -0,0 +1,124 @@
+import random
+
+from asgiref.sync import iscoroutinefunction
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.decorators import sync_and_async_middleware
+
+
+# ------------------------------------------------------------------
+# READ REPLICAS FOR THE CATALOGUE
+# ReplicaRouter sends reads of `api` models (sweets, search) to a
+# random alias in settings.DATABASE_REPLICAS (DB_REPLICAS, see
+# sweetshop/database.py). Writes, select_for_update() and anything
+# outside `api` (users, sessions, ...) use the primary.
+#
+# Read-your-writes: after a successful POST/PUT/PATCH/DELETE, the
+# user is pinned to the primary for DATABASE_REPLICA_PIN_SECONDS. The
+# pin is keyed on the user id from the token, not a cookie, so it
+# holds for every client of that user (the frontend does not send
+# cookies cross-origin). It lives in the sweets cache, which must be
+# shared (file/redis) when several workers run. Pinned requests also
+# skip the response cache, which may hold a body built from a lagging
+# replica.
+#
+# Local testing with two SQLite files:
+#     DB_REPLICAS=/tmp/replica.sqlite3 python manage.py sync_replicas
+# copies the primary into each replica file.
+# ------------------------------------------------------------------
+PRIMARY = "default"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_current_request = ContextVar("replica_request", default=None)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def pin_cache():
+    return caches[settings.SWEETS_CACHE_ALIAS]
+
+
+def pin_key(user_id):
+    return f"replica:pin:{user_id}"
+
+
+def pin(user):
+    pin_cache().set(pin_key(user.pk), 1, timeout=settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def is_pinned():
+    """
+    Whether the current request must read from the primary.
+    """
+    request = _current_request.get()
+    if request is None:
+        return False
+    if request.method not in SAFE_METHODS:
+        return True
+
+    pinned = getattr(request, "_replica_pinned", None)
+    if pinned is None:
+        # DRF copies the authenticated user onto the Django request.
+        # Until it has, there is nothing to decide on (and nothing to
+        # remember), since catalogue queries only run after that.
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            return False
+        pinned = pin_cache().get(pin_key(user.pk)) is not None
+        request._replica_pinned = pinned
+    return pinned
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or model._meta.app_label != "api" or is_pinned():
+            return PRIMARY
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        if db in replicas():
+            return False
+        return None
+
+
+@sync_and_async_middleware
+def replica_pin_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _current_request.set(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _current_request.reset(token)
+            pin_after_write(request, response)
+            return response
+    else:
+        def middleware(request):
+            token = _current_request.set(request)
+            try:
+                response = get_response(request)
+            finally:
+                _current_request.reset(token)
+            pin_after_write(request, response)
+            return response
+    return middleware
+
+
+def pin_after_write(request, response):
+    if not replicas() or request.method in SAFE_METHODS or response.status_code >= 400:
+        return
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        pin(user)
@@ -0,0 +1,145 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Reservation, StockMovement, Sweet
+
+
+# ------------------------------------------------------------------
+# STOCK RESERVATIONS (cart holds)
+# A Reservation holds units of a sweet for one customer until
+# `expires_at`. The units stay in `Sweet.quantity`; `Sweet.reserved`
+# is the sum of the holds, changed in the same transaction as the
+# Reservation rows. Available stock is `quantity - reserved`, a
+# comparison on the row itself, so ?in_stock= on the list endpoint
+# stays one query on a partial index.
+#
+# take_stock / take_stock_many only sell available units, so held
+# units go to their holder alone, through fulfil(). Lapsed holds are
+# released by expire() (manage.py expire_reservations, every minute),
+# oldest first along the expires_at index, in batches. A reserve()
+# that finds too little stock releases that sweet's lapsed holds
+# itself, so nobody waits for the sweeper.
+#
+# Sweets in hot mode (api.hot) cannot be reserved.
+# ------------------------------------------------------------------
+
+
+def reserve(sweet_id, user_id, quantity, ttl=None, now=None):
+    """
+    Holds `quantity` units of a sweet for `ttl` (RESERVATION_TTL_SECONDS
+    by default). Returns the Reservation, or None when the sweet is
+    missing, in hot mode or short of available stock.
+    """
+    now = now or timezone.now()
+    expires_at = now + (ttl or timedelta(seconds=settings.RESERVATION_TTL_SECONDS))
+    reservation = hold(sweet_id, user_id, quantity, now, expires_at)
+    # Only the failure path looks for lapsed holds to free.
+    if reservation is None and expire(now, sweet_id=sweet_id):
+        reservation = hold(sweet_id, user_id, quantity, now, expires_at)
+    return reservation
+
+
+def hold(sweet_id, user_id, quantity, now, expires_at):
+    with transaction.atomic():
+        held = Sweet.objects.filter(
+            pk=sweet_id, shards=0, quantity__gte=F("reserved") + quantity
+        ).update(reserved=F("reserved") + quantity)
+        if not held:
+            return None
+        return Reservation.objects.create(
+            sweet_id=sweet_id, user_id=user_id, quantity=quantity,
+            created_at=now, expires_at=expires_at,
+        )
+
+
+def release(rows):
+    """
+    Deletes holds, given as (id, sweet id, quantity) rows the caller
+    has locked, and gives their units back: one DELETE and one UPDATE
+    however many sweets they cover.
+    """
+    freed = defaultdict(int)
+    for _, sweet_id, quantity in rows:
+        freed[sweet_id] += quantity
+    Reservation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    Sweet.objects.filter(pk__in=freed).update(
+        reserved=F("reserved") - Case(
+            *[When(pk=pk, then=Value(units)) for pk, units in freed.items()],
+            output_field=IntegerField(),
+        )
+    )
+
+
+def cancel(reservation_id, sweet_id, user_id):
+    """
+    Releases one of the user's holds early. Returns False if there is
+    no such hold.
+    """
+    with transaction.atomic():
+        row = (
+            Reservation.objects.select_for_update()
+            .filter(pk=reservation_id, sweet_id=sweet_id, user_id=user_id)
+            .values_list("pk", "sweet_id", "quantity")
+            .first()
+        )
+        if row is None:
+            return False
+        release([row])
+    return True
+
+
+def fulfil(reservation_id, sweet_id, user_id, now=None):
+    """
+    Buys the units of one of the user's unexpired holds. Returns the
+    updated Sweet, or None if there is no such hold. Cannot fail for
+    lack of stock: the units were set aside when the hold was made.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        reservation = (
+            Reservation.objects.select_for_update()
+            .filter(pk=reservation_id, sweet_id=sweet_id, user_id=user_id, expires_at__gt=now)
+            .first()
+        )
+        if reservation is None:
+            return None
+        reservation.delete()
+        amount = reservation.quantity
+        Sweet.objects.filter(pk=reservation.sweet_id).update(
+            quantity=F("quantity") - amount, reserved=F("reserved") - amount
+        )
+        sweet = Sweet.objects.get(pk=reservation.sweet_id)
+        StockMovement.objects.create(
+            sweet=sweet, kind=StockMovement.SALE, delta=-amount,
+            actor_id=user_id, created_at=now, unit_price=sweet.price,
+        )
+    return sweet
+
+
+def expire(now=None, sweet_id=None, batch_size=500):
+    """
+    Releases the holds that lapsed by `now` (only one sweet's, if
+    given), oldest first and `batch_size` per transaction. Returns how
+    many were released.
+    """
+    lapsed = Reservation.objects.filter(expires_at__lte=now or timezone.now())
+    if sweet_id is not None:
+        lapsed = lapsed.filter(sweet_id=sweet_id)
+    lapsed = lapsed.order_by("expires_at").values_list("pk", "sweet_id", "quantity")
+
+    released = 0
+    while True:
+        with transaction.atomic():
+            # Holds another transaction is fulfilling or cancelling are
+            # skipped (PostgreSQL); that transaction deletes them anyway.
+            batch = list(lapsed.select_for_update(skip_locked=True)[:batch_size])
+            if batch:
+                release(batch)
+        released += len(batch)
+        if len(batch) < batch_size:
+            return released
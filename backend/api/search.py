@@ -0,0 +1,184 @@
+import re
+
+from django.db import connections, models
+from rest_framework import filters
+
+
+# ------------------------------------------------------------------
+# FULL-TEXT SEARCH FOR SWEETS
+# `?search=` used to become OR-ed `LIKE '%term%'` clauses, which can
+# never use an index. It now goes through a real full-text index:
+#
+#   * SQLite     -> FTS5 table `api_sweet_fts`, kept in sync by triggers
+#   * PostgreSQL -> GIN index on a `tsvector` of name + category
+#   * others     -> DRF's SearchFilter (the old behaviour)
+#
+# Every word is prefix-matched ("choc" finds "Chocolate") and all
+# words must match. Purely numeric words such as "5" or "2.50" are
+# treated as an exact price instead. Results are ordered by relevance
+# unless the paginator applies its own ordering.
+# ------------------------------------------------------------------
+FTS_TABLE = "api_sweet_fts"
+PG_INDEX = "sweet_search_vector_idx"
+
+WORD_RE = re.compile(r"[\w.]+")
+PRICE_RE = re.compile(r"^\d{1,6}(\.\d{1,2})?$")
+
+
+class SearchDocumentField(models.TextField):
+    """
+    Maps the FTS5 hidden column that carries the table's own name.
+    Only useful for the `__match` lookup.
+    """
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+def split_terms(text):
+    """
+    Splits a search string into (words, prices).
+    """
+    words, prices = [], []
+    for token in WORD_RE.findall(text or ""):
+        if PRICE_RE.match(token):
+            prices.append(token)
+            continue
+        # Dots only matter for prices; "choco.bar" is two words.
+        words.extend(w for w in token.split(".") if w)
+    return words, prices
+
+
+class SweetSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for `filters.SearchFilter` on `SweetViewSet`.
+    Uses the same `search` query parameter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "")
+        words, prices = split_terms(text)
+        if not words and not prices:
+            return queryset
+
+        vendor = connections[queryset.db].vendor
+        if vendor not in ("sqlite", "postgresql"):
+            return super().filter_queryset(request, queryset, view)
+
+        for price in prices:
+            queryset = queryset.filter(price=price)
+        if not words:
+            return queryset
+
+        if vendor == "sqlite":
+            return self.sqlite_search(queryset, words)
+        return self.postgres_search(queryset, words)
+
+    def sqlite_search(self, queryset, words):
+        # FTS5 syntax: "choc"* "mint"*  -> both prefixes must match.
+        query = " ".join(f'"{word}"*' for word in words)
+        return queryset.filter(search_entry__document__match=query).order_by(
+            "search_entry__rank", "id"
+        )
+
+    def postgres_search(self, queryset, words):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        # to_tsquery syntax: choc:* & mint:*
+        raw = " & ".join(f"{word}:*" for word in words)
+        query = SearchQuery(raw, search_type="raw", config="simple")
+        vector = search_vector()
+        return (
+            queryset.alias(search_document=vector, search_rank=SearchRank(vector, query))
+            .filter(search_document=query)
+            .order_by("-search_rank", "id")
+        )
+
+
+def search_vector():
+    """
+    The expression the PostgreSQL GIN index is built on. Queries must
+    use exactly this expression for the planner to pick the index.
+    """
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector("name", "category", config="simple")
+
+
+# ------------------------------------------------------------------
+# INDEX MAINTENANCE
+# Called from migrations. Both functions are idempotent. Any later
+# migration that makes SQLite rebuild `api_sweet` drops the triggers,
+# so it must call `install_search_index` again.
+# ------------------------------------------------------------------
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, category,
+        content='api_sweet', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON api_sweet BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, category)
+        VALUES (new.id, new.name, new.category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON api_sweet BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+    END
+    """,
+    # Only name/category changes touch the index; stock updates don't.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, category ON api_sweet BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, name, category)
+        VALUES (new.id, new.name, new.category);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_REMOVE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sql in SQLITE_INSTALL:
+            schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+        schema_editor.add_index(apps.get_model("api", "Sweet"), postgres_index())
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sql in SQLITE_REMOVE:
+            schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+
+
+def postgres_index():
+    from django.contrib.postgres.indexes import GinIndex
+
+    return GinIndex(search_vector(), name=PG_INDEX)
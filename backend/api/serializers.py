@@ -6,7 +6,9 @@ from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from datetime import timedelta 
 
-from .models import Sweet
+from . import metrics
+from .authentication import is_admin
+from .models import Reservation, Sweet
 
 # ------------------------------------------------------------------
 # NEW CLASS: CUSTOM JWT TOKEN SERIALIZER
@@ -52,7 +54,225 @@ class RegisterSerializer(serializers.ModelSerializer):
 # ------------------------------------------------------------------
 # EXISTING: SweetSerializer
 # ------------------------------------------------------------------
-class SweetSerializer(serializers.ModelSerializer):
+class TimedDataMixin:
+    """
+    Counts building `.data` as serializer time (api/metrics.py).
+    """
+
+    @property
+    def data(self):
+        with metrics.timed():
+            return super().data
+
+
+class SweetListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """
+    `SweetSerializer(many=True)`. Writes the whole batch with
+    bulk_create / bulk_update instead of one save() per row.
+    """
+    batch_size = 500
+
+    def validate_rows(self, rows):
+        """
+        Validates every row on its own so one bad row doesn't hide the
+        rest. Returns (valid, errors): valid is a list of
+        (index, validated_data), errors a list of {"index", "errors"}.
+        """
+        valid, errors = [], []
+        for index, row in enumerate(rows):
+            try:
+                valid.append((index, self.child.run_validation(row)))
+            except serializers.ValidationError as exc:
+                errors.append({"index": index, "errors": exc.detail})
+        return valid, errors
+
+    def create(self, validated_data):
+        sweets = [Sweet(**attrs) for attrs in validated_data]
+        return Sweet.objects.bulk_create(sweets, batch_size=self.batch_size)
+
+    def update(self, instance, validated_data):
+        # `instance` is a list of sweets lined up with `validated_data`.
+        fields = set()
+        for sweet, attrs in zip(instance, validated_data):
+            for field, value in attrs.items():
+                setattr(sweet, field, value)
+                fields.add(field)
+        if fields:
+            Sweet.objects.bulk_update(instance, sorted(fields), batch_size=self.batch_size)
+        return instance
+
+
+HOT_QUANTITY_ERROR = "This sweet is in hot mode; restock it or switch hot mode off first."
+RESERVED_QUANTITY_ERROR = "Quantity cannot be less than the units held by reservations."
+
+
+class SweetSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """
+    Pass `fields=(...)` to render only those fields (?fields= on the API).
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def validate_quantity(self, value):
+        # A hot sweet's stock lives in its shards (api.hot).
+        sweet = self.instance
+        if isinstance(sweet, Sweet) and sweet.shards and value != sweet.quantity:
+            raise serializers.ValidationError(HOT_QUANTITY_ERROR)
+        if isinstance(sweet, Sweet) and value < sweet.reserved:
+            raise serializers.ValidationError(RESERVED_QUANTITY_ERROR)
+        return value
+
     class Meta:
         model = Sweet
-        fields = ("id", "name", "category", "price", "quantity")
\ No newline at end of file
+        fields = ("id", "name", "category", "price", "quantity", "reserved")
+        read_only_fields = ("reserved",)
+        list_serializer_class = SweetListSerializer
+
+
+class PublicSweetSerializer(SweetSerializer):
+    """
+    What standard users see: no stock level (the README promises
+    quantity is never shown to them).
+    """
+
+    class Meta(SweetSerializer.Meta):
+        fields = ("id", "name", "category", "price")
+
+
+def sweet_serializer_class(request):
+    """
+    SweetSerializer for admins, PublicSweetSerializer for everyone else.
+    """
+    return SweetSerializer if is_admin(request) else PublicSweetSerializer
+
+
+# ------------------------------------------------------------------
+# NEW: sparse fieldsets + fast read-only path
+# `?fields=id,name,price` picks the fields of a sweet response.
+# List responses skip SweetSerializer altogether: sweet_rows() turns
+# `.values()` dicts into the same output SweetSerializer would give.
+# ------------------------------------------------------------------
+SWEET_FIELDS = SweetSerializer.Meta.fields
+PUBLIC_SWEET_FIELDS = PublicSweetSerializer.Meta.fields
+
+
+def requested_fields(params, allowed=SWEET_FIELDS, param="fields"):
+    """
+    The fields asked for in ?fields=, in `allowed` order, or all of
+    them. Unknown names are a validation error.
+    """
+    raw = params.get(param)
+    if not raw:
+        return allowed
+
+    wanted = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = sorted(wanted - set(allowed))
+    if unknown:
+        raise serializers.ValidationError(
+            {param: [f"Unknown field(s): {', '.join(unknown)}. Choose from {', '.join(allowed)}."]}
+        )
+    return tuple(name for name in allowed if name in wanted) or allowed
+
+
+def sweet_rows(rows, fields=SWEET_FIELDS):
+    """
+    Read-only `SweetSerializer(many=True, fields=fields).data` for rows
+    from `.values()`. Rows may carry extra keys (e.g. the paginator's
+    ordering columns); only `fields` are kept.
+    """
+    # Prices come back from the database already quantized to two
+    # places, so str() gives the same "1.50" DRF's DecimalField does.
+    rows = list(rows)  # run the query outside the timed block
+    with metrics.timed():
+        if "price" in fields:
+            return [
+                {name: str(row[name]) if name == "price" else row[name] for name in fields}
+                for row in rows
+            ]
+        return [{name: row[name] for name in fields} for row in rows]
+
+
+# Largest values an id (BigAutoField) and a stock count
+# (PositiveIntegerField) can hold; bigger ones overflow in the query.
+MAX_ID = 2 ** 63 - 1
+MAX_QUANTITY = 2 ** 31 - 1
+
+
+class QuantitySerializer(serializers.Serializer):
+    """
+    Body of purchase and reserve: {"quantity": n}, default 1.
+    """
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_QUANTITY, default=1)
+
+
+# ------------------------------------------------------------------
+# NEW: CheckoutSerializer
+# Validates the cart for POST /api/sweets/checkout/
+# ------------------------------------------------------------------
+class CheckoutLineSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_QUANTITY, default=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    items = CheckoutLineSerializer(many=True, allow_empty=False, max_length=100)
+
+    def get_amounts(self):
+        """
+        Merges repeated lines for the same sweet: {id: total quantity}.
+        """
+        amounts = {}
+        for line in self.validated_data["items"]:
+            amounts[line["id"]] = amounts.get(line["id"], 0) + line["quantity"]
+        return amounts
+
+
+# ------------------------------------------------------------------
+# NEW: ReservationSerializer
+# Response of POST /api/sweets/{id}/reserve/
+# ------------------------------------------------------------------
+class ReservationSerializer(TimedDataMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Reservation
+        fields = ("id", "sweet", "quantity", "expires_at")
+
+
+class ReservationRefSerializer(serializers.Serializer):
+    """
+    Body of purchase {"reservation": id} and release.
+    """
+    reservation = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+
+
+class SweetIdSerializer(serializers.Serializer):
+    """
+    The `id` of a PATCH /api/sweets/bulk/ row (read-only on
+    SweetSerializer).
+    """
+    id = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+
+
+# ------------------------------------------------------------------
+# NEW: RestockLineSerializer
+# One line of POST /api/sweets/bulk-restock/
+# ------------------------------------------------------------------
+class RestockLineSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    amount = serializers.IntegerField(min_value=1, max_value=MAX_QUANTITY)
+
+
+# ------------------------------------------------------------------
+# NEW: AnalyticsParamsSerializer
+# Query parameters of the /api/analytics/ endpoints
+# ------------------------------------------------------------------
+class AnalyticsParamsSerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=1, max_value=366, default=30)
+    hours = serializers.IntegerField(min_value=1, max_value=24 * 31, default=24)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    sweet = serializers.IntegerField(min_value=1, max_value=MAX_ID, required=False)
+    category = serializers.CharField(max_length=100, required=False)
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import tokens
+from .authentication import revoke_user
+from .cache import bump_catalogue_version
+from .models import Sweet
+
+
+# Covers save()/delete() from the viewset, the admin site and the shell.
+@receiver(post_save, sender=Sweet)
+@receiver(post_delete, sender=Sweet)
+def invalidate_sweet_cache(sender, **kwargs):
+    bump_catalogue_version()
+
+
+# Tokens carry is_staff / is_superuser; when those (or the password)
+# change, tokens issued before the change must stop working.
+SECURITY_FIELDS = {"is_staff", "is_superuser", "is_active", "password"}
+# A refresh picks up role changes by itself; these also end the
+# user's refresh tokens.
+CREDENTIAL_FIELDS = {"is_active", "password"}
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_role_change(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or SECURITY_FIELDS & set(update_fields):
+        revoke_user(instance.pk)
+    if update_fields is None or CREDENTIAL_FIELDS & set(update_fields):
+        tokens.blacklist_user(instance.pk)
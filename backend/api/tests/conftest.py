@@ -0,0 +1,50 @@
+import pytest
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connections
+
+
+PASSWORD = "Str0ngPass!2025"
+
+
+def login(client, username, admin=False):
+    """
+    Registers `username` (staff if `admin`), logs `client` in as them
+    and returns the access token. Test modules import this with
+    `from conftest import login`.
+    """
+    client.post("/api/auth/register/", {
+        "username": username,
+        "email": f"{username}@x.com",
+        "password": PASSWORD,
+        "password2": PASSWORD,
+    }, format='json')
+    if admin:
+        User.objects.filter(username=username).update(is_staff=True)
+    login = client.post("/api/auth/login/", {"username": username, "password": PASSWORD}, format='json')
+    token = login.json()['access']
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return token
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # The test database is rebuilt for every test; cached responses
+    # from an earlier test must not survive into the next one.
+    for cache in caches.all():
+        cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def replicas_share_primary_connection():
+    # With DB_REPLICAS set, catalogue reads go to replica aliases. Their
+    # own connections could not see the test's open transaction, so
+    # they use the primary's for the duration of the test.
+    originals = {alias: connections[alias] for alias in settings.DATABASE_REPLICAS}
+    for alias in originals:
+        connections[alias] = connections["default"]
+    yield
+    for alias, connection in originals.items():
+        connections[alias] = connection
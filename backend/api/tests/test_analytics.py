@@ -0,0 +1,76 @@
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import analytics
+from api.models import SalesRollup, StockMovement, Sweet
+from conftest import login
+
+
+def sell(sweet, units, price, when):
+    StockMovement.objects.create(
+        sweet=sweet, kind="sale", delta=-units, unit_price=price, created_at=when
+    )
+
+
+@pytest.mark.django_db
+def test_dashboard_reads_rollups_refreshed_from_the_ledger():
+    admin, user = APIClient(), APIClient()
+    login(admin, "an1", admin=True)
+    login(user, "an2")
+    toffee = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=100)
+    fudge = Sweet.objects.create(name="Fudge", category="Fudge", price="3.00", quantity=100)
+
+    # Purchases through the API land in the ledger with their price.
+    admin.post(f"/api/sweets/{toffee.id}/purchase/", {"quantity": 4}, format='json')
+    admin.post("/api/sweets/checkout/", {"items": [{"id": fudge.id, "quantity": 1}]}, format='json')
+    now = timezone.now()
+    sell(toffee, 2, "1.00", now - timedelta(days=2))
+    analytics.refresh(now=now + timedelta(minutes=5))
+
+    best = admin.get("/api/analytics/best-sellers/?days=7").json()
+    assert [(r["name"], r["units"], r["revenue"]) for r in best] == [("Toffee", 6, "8.00"), ("Fudge", 1, "3.00")]
+    categories = admin.get("/api/analytics/categories/?days=1").json()
+    assert [(r["category"], r["revenue"]) for r in categories] == [("Candy", "6.00"), ("Fudge", "3.00")]
+    hourly = admin.get(f"/api/analytics/hourly/?hours=2&sweet={toffee.id}").json()
+    assert [r["units"] for r in hourly] == [4]
+
+    assert user.get("/api/analytics/best-sellers/").status_code == 403
+    assert admin.get("/api/analytics/hourly/?hours=0").status_code == 400
+    assert admin.get(f"/api/analytics/hourly/?sweet={10**20}").status_code == 400
+
+    # Only rollup rows are read, however many sales there were.
+    with CaptureQueriesContext(connection) as queries:
+        analytics.revenue_by_category(now - timedelta(days=7))
+    assert "stockmovement" not in queries.captured_queries[0]["sql"].lower()
+
+
+@pytest.mark.django_db
+def test_refresh_is_incremental_and_matches_a_rebuild():
+    sweet = Sweet.objects.create(name="Gum", category="Candy", price="1.00", quantity=0)
+    start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+
+    sell(sweet, 1, "1.00", start + timedelta(minutes=10))
+    sell(sweet, 2, "1.00", start + timedelta(hours=2, minutes=50))
+    analytics.refresh(now=start + timedelta(hours=3), settle=timedelta(0))
+    # Same hour as the last run, and a later one.
+    sell(sweet, 3, "2.00", start + timedelta(hours=2, minutes=55))
+    sell(sweet, 4, "2.00", start + timedelta(hours=4))
+    analytics.refresh(now=start + timedelta(hours=5), settle=timedelta(0))
+
+    def hours():
+        return list(
+            SalesRollup.objects.filter(period="hour").order_by("bucket").values_list("units", "revenue")
+        )
+
+    incremental = hours()
+    assert incremental == [(1, Decimal("1.00")), (5, Decimal("8.00")), (4, Decimal("8.00"))]
+    call_command("rollup_sales", "--rebuild", "--settle", "0", stdout=io.StringIO())
+    assert hours() == incremental
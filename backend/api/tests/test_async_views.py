@@ -0,0 +1,77 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+
+from api.models import Sweet
+from conftest import login
+
+
+def call(method, url, token=None, headers=None, **kwargs):
+    headers = dict(headers or {})
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return async_to_sync(getattr(AsyncClient(), method))(url, headers=headers, **kwargs)
+
+
+@pytest.mark.django_db
+def test_async_list_and_retrieve_match_sync_views():
+    client = APIClient()
+    token = login(client, "a1")
+    sweet = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=5)
+    Sweet.objects.create(name="Fudge", category="Fudge", price="3.00", quantity=0)
+
+    for url in ["/sweets/", "/sweets/?category=candy", "/sweets/?page_size=1&count=true",
+                "/sweets/?search=toff", f"/sweets/{sweet.id}/"]:
+        sync = client.get(f"/api{url}")
+        res = call("get", f"/api/async{url}", token)
+        assert res.status_code == 200
+        if "page_size" in url:
+            assert res.json()["results"] == sync.json()["results"]
+            assert res.json()["count"] == 2
+        else:
+            assert res.json() == sync.json()
+
+    # ETags are shared with the sync endpoint, so a copy from either revalidates.
+    etag = client.get(f"/api/sweets/{sweet.id}/")["ETag"]
+    res = call("get", f"/api/async/sweets/{sweet.id}/", token, {"If-None-Match": etag})
+    assert res.status_code == 304
+
+    assert call("get", "/api/async/sweets/999/", token).status_code == 404
+
+
+@pytest.mark.django_db
+def test_async_purchase():
+    client = APIClient()
+    token = login(client, "a2", admin=True)
+    sweet = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=3)
+    url = f"/api/async/sweets/{sweet.id}/purchase/"
+
+    res = call("post", url, token, data={"quantity": 2}, content_type="application/json")
+    assert res.status_code == 200
+    assert res.json()["quantity"] == 1
+
+    res = call("post", url, token, data={"quantity": 2}, content_type="application/json")
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Out of stock"
+
+    assert call("post", url, token).status_code == 200
+    assert call("post", "/api/async/sweets/999/purchase/", token).status_code == 404
+    assert call("post", f"/api/async/sweets/{10**20}/purchase/", token).status_code == 404
+    assert call("get", f"/api/async/sweets/{10**20}/", token).status_code == 404
+    for body in ({"quantity": 10**20}, {"quantity": 1.9}, [1]):
+        res = call("post", url, token, data=body, content_type="application/json")
+        assert res.status_code == 400
+        assert res.json()["detail"] == "Invalid quantity"
+
+    # The list cache was invalidated by the purchases.
+    assert client.get("/api/async/sweets/").json()[0]["quantity"] == 0
+
+
+@pytest.mark.django_db
+def test_async_views_require_authentication():
+    res = call("get", "/api/async/sweets/")
+    assert res.status_code == 401
+    assert "WWW-Authenticate" in res
+
+    assert call("post", "/api/async/sweets/1/purchase/", "nonsense").status_code == 401
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import StatelessJWTAuthentication, revoke_token, revoke_user
+from api.models import Sweet
+from api.views import SweetViewSet
+from conftest import login
+
+
+@pytest.fixture
+def stateless(monkeypatch):
+    # authentication_classes is read from settings at import time, so
+    # override_settings is too late; patch the view instead.
+    monkeypatch.setattr(SweetViewSet, "authentication_classes", [StatelessJWTAuthentication])
+
+
+@pytest.mark.django_db
+def test_stateless_auth_makes_no_user_queries(stateless):
+    client = APIClient()
+    login(client, "j1", admin=True)
+    sweet = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=5)
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get("/api/sweets/").status_code == 200
+        assert client.post(f"/api/sweets/{sweet.id}/purchase/").status_code == 200
+        # admin-only action, decided from the is_staff claim
+        assert client.post(f"/api/sweets/{sweet.id}/restock/", {"amount": 1}, format='json').status_code == 200
+
+    assert not [q for q in ctx.captured_queries if "auth_user" in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_revoked_tokens_are_rejected(stateless):
+    client = APIClient()
+    token = login(client, "j2")
+    assert client.get("/api/sweets/").status_code == 200
+
+    revoke_token(AccessToken(token))
+    assert client.get("/api/sweets/").status_code == 401
+
+    other = APIClient()
+    login(other, "j3")
+    user = User.objects.get(username="j3")
+    revoke_user(user.pk)
+    # tokens issued in an earlier second are denied
+    other_token = AccessToken()
+    other_token["user_id"] = str(user.pk)
+    other_token["iat"] = int(time.time()) - 5
+    other.credentials(HTTP_AUTHORIZATION=f"Bearer {other_token}")
+    assert other.get("/api/sweets/").status_code == 401
+
+
+@pytest.mark.django_db
+def test_tokens_without_role_claims_fall_back_to_database(stateless):
+    client = APIClient()
+    user = User.objects.create_user("j4", password="Str0ngPass!2025")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get("/api/sweets/").status_code == 200
+    assert [q for q in ctx.captured_queries if "auth_user" in q["sql"]]
@@ -0,0 +1,83 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.models import Sweet
+from conftest import login
+
+
+@pytest.mark.django_db
+def test_bulk_endpoints_require_admin():
+    client = APIClient()
+    login(client, "b0")
+
+    resp = client.post("/api/sweets/bulk/", {"items": [{"name": "X", "category": "Y", "price": "1.00"}]}, format='json')
+    assert resp.status_code == 403
+    resp = client.post("/api/sweets/bulk-restock/", {"items": [{"id": 1, "amount": 1}]}, format='json')
+    assert resp.status_code == 403
+
+
+@pytest.mark.django_db
+def test_bulk_create_reports_bad_rows_and_keeps_good_ones():
+    client = APIClient()
+    login(client, "b1", admin=True)
+
+    resp = client.post("/api/sweets/bulk/", {"items": [
+        {"name": "Toffee", "category": "Candy", "price": "1.50", "quantity": 5},
+        {"name": "Broken", "category": "Candy", "price": "not-a-price"},
+        {"name": "Fudge", "category": "Fudge", "price": "2.00"},
+    ]}, format='json')
+
+    assert resp.status_code == 201, resp.content
+    body = resp.json()
+    assert body["created"] == 2
+    assert [e["index"] for e in body["errors"]] == [1]
+    assert "price" in body["errors"][0]["errors"]
+    assert sorted(Sweet.objects.values_list("name", flat=True)) == ["Fudge", "Toffee"]
+
+
+@pytest.mark.django_db
+def test_bulk_create_strict_writes_nothing_on_error():
+    client = APIClient()
+    login(client, "b2", admin=True)
+
+    resp = client.post("/api/sweets/bulk/", {"strict": True, "items": [
+        {"name": "Toffee", "category": "Candy", "price": "1.50"},
+        {"name": "", "category": "Candy", "price": "1.00"},
+    ]}, format='json')
+
+    assert resp.status_code == 400
+    assert Sweet.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_bulk_update_and_restock():
+    client = APIClient()
+    login(client, "b3", admin=True)
+    a = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=5)
+    b = Sweet.objects.create(name="Fudge", category="Fudge", price="2.00", quantity=0)
+
+    resp = client.patch("/api/sweets/bulk/", {"items": [
+        {"id": a.id, "price": "1.75"},
+        {"id": 999999, "price": "9.00"},
+        {"id": 10**20, "price": "9.00"},
+        {"id": True, "price": "9.00"},
+    ]}, format='json')
+    assert resp.status_code == 200, resp.content
+    assert resp.json()["updated"] == 1
+    assert [e["index"] for e in resp.json()["errors"]] == [1, 2, 3]
+
+    resp = client.post("/api/sweets/bulk-restock/", {"items": [
+        {"id": a.id, "amount": 10},
+        {"id": b.id, "amount": 4},
+        {"id": b.id, "amount": 1},
+        {"id": 999999, "amount": 1},
+        {"id": a.id, "amount": -3},
+        {"id": 10**20, "amount": 1},
+    ]}, format='json')
+    assert resp.status_code == 200, resp.content
+    assert [e["index"] for e in resp.json()["errors"]] == [3, 4, 5]
+
+    a.refresh_from_db()
+    b.refresh_from_db()
+    assert (str(a.price), a.quantity) == ("1.75", 15)
+    assert b.quantity == 5
@@ -0,0 +1,65 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api import cache as sweet_cache
+from api.checks import check_shared_cache
+from api.models import Sweet
+from conftest import login
+
+
+@pytest.mark.django_db(transaction=True)
+def test_list_is_served_from_cache_until_a_write():
+    client = APIClient()
+    login(client, "k1", admin=True)
+    sweet = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=5)
+
+    before = sweet_cache.stats()
+    first = client.get("/api/sweets/?category=candy")
+    second = client.get("/api/sweets/?category=candy")
+    after = sweet_cache.stats()
+
+    assert first.json() == second.json()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+    # purchase goes through a raw UPDATE; it must still invalidate
+    client.post(f"/api/sweets/{sweet.id}/purchase/")
+    assert client.get("/api/sweets/?category=candy").json()[0]["quantity"] == 4
+
+    # so does a queryset-level update
+    Sweet.objects.filter(pk=sweet.pk).update(name="Salted Toffee")
+    assert client.get(f"/api/sweets/{sweet.id}/").json()["name"] == "Salted Toffee"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cache_key_depends_on_params_and_admin_flag():
+    user = APIClient()
+    login(user, "k2")
+    admin = APIClient()
+    login(admin, "k3", admin=True)
+    Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=5)
+
+    before = sweet_cache.stats()
+    user.get("/api/sweets/?min_price=1&category=candy")
+    user.get("/api/sweets/?category=candy&min_price=1")  # same params, other order
+    admin.get("/api/sweets/?category=candy&min_price=1")
+    after = sweet_cache.stats()
+
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 2
+
+    assert admin.get("/api/sweets/cache-stats/").status_code == 200
+    assert user.get("/api/sweets/cache-stats/").status_code == 403
+
+
+def test_several_workers_need_a_shared_cache(settings, tmp_path):
+    assert check_shared_cache(None) == []
+
+    settings.WEB_CONCURRENCY = 4
+    assert [error.id for error in check_shared_cache(None)] == ["api.E001"]
+
+    settings.CACHES = {**settings.CACHES, "sweets": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": str(tmp_path),
+    }}
+    assert check_shared_cache(None) == []
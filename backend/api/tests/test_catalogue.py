@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from rest_framework.test import APIClient
+
+from api import catalogue
+from api.models import Sweet
+from conftest import login
+
+
+@pytest.mark.django_db
+def test_export_streams_csv_and_ndjson():
+    client = APIClient()
+    login(client, "e1", admin=True)
+    Sweet.objects.create(name="Toffee, salted", category="Candy", price="1.50", quantity=5)
+    Sweet.objects.create(name="Fudge", category="Fudge", price="2.00", quantity=0)
+
+    resp = client.get("/api/sweets/export/?type=csv")
+    assert resp.status_code == 200
+    assert resp.streaming
+    lines = b"".join(resp.streaming_content).decode().splitlines()
+    assert lines[0] == "id,name,category,price,quantity"
+    assert lines[1].endswith(',"Toffee, salted",Candy,1.50,5')
+
+    resp = client.get("/api/sweets/export/?type=ndjson")
+    records = [json.loads(l) for l in b"".join(resp.streaming_content).decode().splitlines()]
+    assert [r["price"] for r in records] == ["1.50", "2.00"]
+
+
+@pytest.mark.django_db
+def test_export_requires_admin():
+    client = APIClient()
+    login(client, "e2")
+    assert client.get("/api/sweets/export/").status_code == 403
+
+
+@pytest.mark.django_db
+def test_import_upserts_and_reports_bad_lines():
+    client = APIClient()
+    login(client, "e3", admin=True)
+    existing = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=5)
+
+    body = (
+        "id,name,category,price,quantity\n"
+        f"{existing.id},Toffee,Candy,1.75,9\n"
+        ",Fudge,Fudge,2.00,3\n"
+        ",Broken,Fudge,abc,3\n"
+    )
+    resp = client.generic("POST", "/api/sweets/import/?type=csv", body, content_type="text/csv")
+
+    assert resp.status_code == 200, resp.content
+    summary = resp.json()
+    assert (summary["created"], summary["updated"], summary["failed"]) == (1, 1, 1)
+    assert summary["errors"][0]["line"] == 3
+
+    existing.refresh_from_db()
+    assert (str(existing.price), existing.quantity) == ("1.75", 9)
+    assert Sweet.objects.filter(name="Fudge").exists()
+
+    # Lines that aren't UTF-8 fail on their own, in either format.
+    body = b"id,name,category,price,quantity\n\xff\xfe,Bad,Candy,1.00,1\n,Mint,Candy,1.00,1\n"
+    resp = client.generic("POST", "/api/sweets/import/?type=csv", body, content_type="text/csv")
+    assert (resp.json()["created"], resp.json()["failed"]) == (1, 1)
+    assert resp.json()["errors"][0]["line"] == 1
+
+    body = b'\xff\xfe{}\n{"name": "Mint", "category": "Candy", "price": "1.00", "quantity": 1}\n'
+    resp = client.generic("POST", "/api/sweets/import/?type=ndjson", body, content_type="application/x-ndjson")
+    assert (resp.json()["created"], resp.json()["failed"]) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_import_rejects_bad_ids_and_keeps_the_sequence_ahead():
+    probe = Sweet.objects.create(name="Probe", category="Candy", price="1.00", quantity=1)
+    next_id = probe.pk + 1  # what the id sequence hands out next
+    probe.delete()
+
+    row = '{%s"name": "%s", "category": "Candy", "price": "1.00", "quantity": 1}'
+    lines = [
+        row % ('"id": 100000000000000000000, ', "Huge"),
+        row % ('"id": -5, ', "Negative"),
+        row % ('"id": true, ', "Bool"),
+        row % (f'"id": {next_id}, ', "Keyed"),
+        row % ("", "New 1"),
+        row % ("", "New 2"),
+        row % ("", "New 3"),
+    ]
+    summary = catalogue.import_records(catalogue.read_records(lines, "ndjson"), batch_size=3)
+
+    assert (summary["created"], summary["failed"]) == (4, 3)
+    assert [(e["line"], list(e["errors"])) for e in summary["errors"]] == [(1, ["id"]), (2, ["id"]), (3, ["id"])]
+    # Id-less rows are numbered past the explicit id, in its own batch too.
+    assert sorted(Sweet.objects.values_list("id", flat=True)) == list(range(next_id, next_id + 4))
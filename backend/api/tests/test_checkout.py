@@ -0,0 +1,63 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.models import Sweet
+from conftest import login
+
+
+@pytest.mark.django_db
+def test_checkout_takes_every_line():
+    client = APIClient()
+    login(client, "c1")
+    a = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=5)
+    b = Sweet.objects.create(name="Fudge", category="Fudge", price="2.00", quantity=3)
+
+    resp = client.post("/api/sweets/checkout/", {"items": [
+        {"id": b.id, "quantity": 3},
+        {"id": a.id, "quantity": 1},
+        {"id": a.id, "quantity": 1},
+    ]}, format='json')
+
+    assert resp.status_code == 200, resp.content
+    body = resp.json()
+    assert body["total"] == "9.00"
+    assert {i["id"]: i["quantity"] for i in body["items"]} == {a.id: 2, b.id: 3}
+
+    a.refresh_from_db()
+    b.refresh_from_db()
+    assert (a.quantity, b.quantity) == (3, 0)
+
+
+@pytest.mark.django_db
+def test_checkout_is_all_or_nothing():
+    client = APIClient()
+    login(client, "c2")
+    a = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=5)
+    b = Sweet.objects.create(name="Fudge", category="Fudge", price="2.00", quantity=1)
+
+    resp = client.post("/api/sweets/checkout/", {"items": [
+        {"id": a.id, "quantity": 2},
+        {"id": b.id, "quantity": 2},
+        {"id": 999999, "quantity": 1},
+    ]}, format='json')
+
+    assert resp.status_code == 400
+    statuses = {i["id"]: i["status"] for i in resp.json()["items"]}
+    assert statuses == {a.id: "ok", b.id: "out_of_stock", 999999: "not_found"}
+
+    a.refresh_from_db()
+    b.refresh_from_db()
+    assert (a.quantity, b.quantity) == (5, 1)
+
+
+@pytest.mark.django_db
+def test_checkout_rejects_empty_cart():
+    client = APIClient()
+    login(client, "c3")
+
+    resp = client.post("/api/sweets/checkout/", {"items": []}, format='json')
+    assert resp.status_code == 400
+
+    for line in ({"id": 10**20}, {"id": 1, "quantity": 10**20}):
+        resp = client.post("/api/sweets/checkout/", {"items": [line]}, format='json')
+        assert resp.status_code == 400
@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import Sweet
+from api.renderers import FastJSONRenderer
+from api.serializers import SweetSerializer, sweet_rows
+from conftest import login
+
+
+@pytest.mark.django_db
+def test_fields_selects_a_subset_on_list_page_and_detail():
+    client = APIClient()
+    login(client, "f1")
+    for i in range(3):
+        Sweet.objects.create(name=f"Fudge {i}", category="Fudge", price="2.50", quantity=i)
+    sweet = Sweet.objects.first()
+
+    assert client.get("/api/sweets/?fields=price,name").json()[0] == {"name": "Fudge 0", "price": "2.50"}
+
+    page = client.get("/api/sweets/?fields=name&ordering=price&page_size=2").json()
+    assert [row for row in page["results"]] == [{"name": "Fudge 0"}, {"name": "Fudge 1"}]
+    assert client.get(page["next"]).json()["results"] == [{"name": "Fudge 2"}]
+
+    assert client.get(f"/api/sweets/{sweet.pk}/?fields=id,price").json() == {"id": sweet.pk, "price": "2.50"}
+    assert client.get(f"/api/async/sweets/?fields=name").json()[0] == {"name": "Fudge 0"}
+
+
+@pytest.mark.django_db
+def test_unknown_field_is_rejected():
+    client = APIClient()
+    login(client, "f2")
+    resp = client.get("/api/sweets/?fields=name,secret")
+    assert resp.status_code == 400
+    assert "secret" in resp.json()["fields"][0]
+
+
+@pytest.mark.django_db
+def test_fast_path_matches_serializer_and_keeps_decimal_prices_exact():
+    Sweet.objects.create(name="Toffee", category="Candy", price="0.10", quantity=3)
+    Sweet.objects.create(name="Nougat", category="Nougat", price="12.00", quantity=0)
+    queryset = Sweet.objects.order_by("id")
+
+    fast = sweet_rows(queryset.values())
+    assert fast == SweetSerializer(queryset, many=True).data
+
+    body = FastJSONRenderer().render({"price": Decimal("0.10")})
+    assert body == b'{"price":"0.10"}'
+
+
+@pytest.mark.django_db
+def test_quantity_is_only_shown_to_admins_and_not_fetched_for_users():
+    user, admin = APIClient(), APIClient()
+    login(user, "f3")
+    login(admin, "f4")
+    User.objects.filter(username="f4").update(is_staff=True)
+    login(admin, "f4")
+    sweet = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=7)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert user.get("/api/sweets/").json() == [
+            {"id": sweet.pk, "name": "Toffee", "category": "Candy", "price": "1.50"}
+        ]
+        assert "quantity" not in user.get(f"/api/sweets/{sweet.pk}/").json()
+    assert not any('"quantity"' in q["sql"].split(" FROM ")[0] for q in queries.captured_queries)
+    assert user.get("/api/sweets/?fields=quantity").status_code == 400
+    assert "quantity" not in user.get(f"/api/async/sweets/{sweet.pk}/").json()
+
+    assert admin.get("/api/sweets/").json()[0]["quantity"] == 7
+    assert admin.get(f"/api/sweets/{sweet.pk}/?fields=quantity").json() == {"quantity": 7}
+
+
+@pytest.mark.django_db
+def test_write_responses_hide_quantity_from_standard_users():
+    user, admin = APIClient(), APIClient()
+    login(user, "f5")
+    login(admin, "f6")
+    User.objects.filter(username="f6").update(is_staff=True)
+    login(admin, "f6")
+
+    created = user.post("/api/sweets/", {"name": "Fudge", "category": "Fudge", "price": "2.00", "quantity": 5}, format='json')
+    assert created.status_code == 201
+    assert set(created.json()) == {"id", "name", "category", "price"}
+
+    url = f"/api/sweets/{created.json()['id']}/"
+    patched = user.patch(url, {"quantity": 6}, format='json')
+    assert patched.status_code == 200
+    assert patched.json() == {"id": created.json()["id"], "name": "Fudge", "category": "Fudge", "price": "2.00"}
+    assert "quantity" not in user.put(url, {"name": "Fudge", "category": "Fudge", "price": "2.50", "quantity": 6}, format='json').json()
+
+    assert admin.patch(url, {"quantity": 7}, format='json').json()["quantity"] == 7
+
+
+def test_fast_renderer_matches_drf_for_index_keyed_errors():
+    errors = {"items": {0: {"id": ["Ensure this value is less than or equal to 5."]}}}
+    assert FastJSONRenderer().render(errors) == b'{"items":{"0":{"id":["Ensure this value is less than or equal to 5."]}}}'
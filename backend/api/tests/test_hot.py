@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+from api import hot
+from api.models import StockMovement, StockShard, Sweet
+from conftest import login
+
+
+def shards(sweet):
+    return list(StockShard.objects.filter(sweet=sweet).order_by("shard").values_list("quantity", flat=True))
+
+
+@pytest.mark.django_db
+def test_hot_sweet_sells_from_shards_and_never_oversells():
+    client = APIClient()
+    login(client, "h1", admin=True)
+    sweet = Sweet.objects.create(name="Gum", category="Candy", price="1.00", quantity=10)
+    other = Sweet.objects.create(name="Mint", category="Candy", price="1.00", quantity=5)
+
+    resp = client.post(f"/api/sweets/{sweet.id}/hot/", {"shards": 4}, format='json')
+    assert resp.json() == {"id": sweet.id, "shards": 4, "quantity": 10}
+    assert shards(sweet) == [3, 3, 2, 2]
+
+    assert client.post(f"/api/sweets/{sweet.id}/purchase/", {"quantity": 2}, format='json').json()["quantity"] == 8
+    # More than any one shard holds: gathered across them.
+    assert client.post(f"/api/sweets/{sweet.id}/purchase/", {"quantity": 5}, format='json').json()["quantity"] == 3
+    cart = {"items": [{"id": sweet.id, "quantity": 2}, {"id": other.id, "quantity": 1}]}
+    assert client.post("/api/sweets/checkout/", cart, format='json').status_code == 200
+    resp = client.post(f"/api/sweets/{sweet.id}/purchase/", {"quantity": 2}, format='json')
+    assert resp.status_code == 400 and resp.json()["detail"] == "Out of stock"
+    assert sum(shards(sweet)) == 1
+    assert Sweet.objects.get(pk=other.pk).quantity == 4
+
+    # Sweet.quantity is write-behind until reconciled.
+    assert Sweet.objects.get(pk=sweet.pk).quantity == 10
+    assert hot.reconcile() == 1
+    assert Sweet.objects.get(pk=sweet.pk).quantity == 1
+
+    client.post(f"/api/sweets/{sweet.id}/restock/", {"amount": 7}, format='json')
+    assert sum(shards(sweet)) == 8
+    assert client.patch(f"/api/sweets/{sweet.id}/", {"quantity": 50}, format='json').status_code == 400
+
+    assert client.post(f"/api/sweets/{sweet.id}/hot/", {"shards": 0}, format='json').json()["quantity"] == 8
+    assert shards(sweet) == []
+    assert client.post(f"/api/sweets/{sweet.id}/purchase/", {"quantity": 8}, format='json').json()["quantity"] == 0
+    assert StockMovement.objects.filter(sweet=sweet, kind="sale").count() == 4
+
+    for url in ("/api/sweets/abc/hot/", f"/api/sweets/{10**20}/hot/", "/api/sweets/999999/hot/"):
+        assert client.post(url, {"shards": 4}, format='json').json() == {"detail": "Not found"}
+    assert client.post(f"/api/sweets/{sweet.id}/hot/", [4], format='json').status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_buyers_of_a_hot_sweet_take_exactly_the_stock():
+    if connection.vendor != "postgresql":
+        pytest.skip("SQLite serializes every writer")
+    sweet = Sweet.objects.create(name="Gum", category="Candy", price="1.00", quantity=60)
+    hot.switch(sweet.pk, 4)
+
+    def buy(_):
+        try:
+            return Sweet.objects.take_stock(sweet.pk, 1) is not None
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(8) as pool:
+        sold = sum(pool.map(buy, range(100)))
+
+    assert sold == 60
+    assert shards(sweet) == [0, 0, 0, 0]
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import AsyncClient
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from api import idempotency
+from api.models import IdempotencyKey, StockMovement, Sweet
+from conftest import login
+
+
+def call(method, url, token=None, headers=None, **kwargs):
+    headers = dict(headers or {})
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return async_to_sync(getattr(AsyncClient(), method))(url, headers=headers, **kwargs)
+
+
+@pytest.mark.django_db
+def test_retried_requests_are_replayed_not_rerun():
+    client = APIClient()
+    token = login(client, "i1")
+    sweet = Sweet.objects.create(name="Fudge", category="Candy", price="2.00", quantity=5)
+    url = f"/api/sweets/{sweet.id}/purchase/"
+
+    first = client.post(url, {"quantity": 2}, format='json', HTTP_IDEMPOTENCY_KEY="k1")
+    again = client.post(url, {"quantity": 2}, format='json', HTTP_IDEMPOTENCY_KEY="k1")
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    assert again["Idempotent-Replayed"] == "true" and not first.has_header("Idempotent-Replayed")
+    assert Sweet.objects.get(pk=sweet.pk).quantity == 3
+
+    # Same key, different request.
+    assert client.post(url, {"quantity": 1}, format='json', HTTP_IDEMPOTENCY_KEY="k1").status_code == 422
+
+    # The async kiosk endpoint, and a checkout.
+    headers = {"Idempotency-Key": "k2"}
+    for _ in range(2):
+        resp = call("post", f"/api/async/sweets/{sweet.id}/purchase/", token, headers,
+                    data={"quantity": 1}, content_type="application/json")
+        assert resp.status_code == 200
+    assert resp["Idempotent-Replayed"] == "true"
+    cart = {"items": [{"id": sweet.id, "quantity": 1}]}
+    for _ in range(2):
+        assert client.post("/api/sweets/checkout/", cart, format='json', HTTP_IDEMPOTENCY_KEY="k3").status_code == 200
+    assert Sweet.objects.get(pk=sweet.pk).quantity == 1
+    assert StockMovement.objects.filter(sweet=sweet, kind="sale").count() == 3
+
+    # Keys are per user, and expire.
+    other = APIClient()
+    login(other, "i2")
+    assert other.post(url, {"quantity": 1}, format='json', HTTP_IDEMPOTENCY_KEY="k1").status_code == 200
+    assert idempotency.prune(now=timezone.now() + timedelta(days=2)) == 4
+    assert not IdempotencyKey.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_duplicates_run_once():
+    if connection.vendor != "postgresql":
+        pytest.skip("SQLite serializes every writer")
+    client = APIClient()
+    login(client, "i3")
+    user_id = User.objects.get(username="i3").pk
+    sweet = Sweet.objects.create(name="Gum", category="Candy", price="1.00", quantity=10)
+
+    def buy(_):
+        try:
+            return idempotency.execute(
+                user_id, "same", "hash",
+                lambda: Response(
+                    {"quantity": Sweet.objects.take_stock(sweet.pk, 1).quantity}
+                ),
+            ).data
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(buy, range(8)))
+
+    assert results == [{"quantity": 9}] * 8
+    assert Sweet.objects.get(pk=sweet.pk).quantity == 9
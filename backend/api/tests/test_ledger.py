@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import ledger
+from api.models import StockMovement, StockSnapshot, Sweet
+from conftest import login
+
+
+@pytest.mark.django_db
+def test_every_stock_change_is_recorded_with_its_actor():
+    client = APIClient()
+    login(client, "l1", admin=True)
+    admin = User.objects.get(username="l1")
+
+    sweet = client.post("/api/sweets/", {"name": "Gum", "category": "Candy", "price": "1.00", "quantity": 5}, format='json').json()
+    client.patch(f"/api/sweets/{sweet['id']}/", {"quantity": 4}, format='json')
+    client.post(f"/api/sweets/{sweet['id']}/purchase/", {"quantity": 3}, format='json')
+    client.post(f"/api/sweets/{sweet['id']}/purchase/", {"quantity": 3}, format='json')  # out of stock
+    client.post(f"/api/sweets/{sweet['id']}/restock/", {"amount": 10}, format='json')
+    client.post("/api/sweets/checkout/", {"items": [{"id": sweet['id'], "quantity": 2}]}, format='json')
+    client.post("/api/sweets/bulk-restock/", {"items": [{"id": sweet['id'], "amount": 1}]}, format='json')
+
+    movements = list(StockMovement.objects.order_by("id").values_list("kind", "delta", "actor_id"))
+    assert movements == [
+        ("adjustment", 5, admin.pk),
+        ("adjustment", -1, admin.pk),
+        ("sale", -3, admin.pk),
+        ("restock", 10, admin.pk),
+        ("sale", -2, admin.pk),
+        ("restock", 1, admin.pk),
+    ]
+    assert sum(delta for _, delta, _ in movements) == Sweet.objects.get(pk=sweet['id']).quantity == 10
+
+
+@pytest.mark.django_db
+def test_history_reads_a_snapshot_plus_the_tail():
+    sweet = Sweet.objects.create(name="Fudge", category="Fudge", price="2.00", quantity=0)
+    start = timezone.now() - timedelta(days=3)
+
+    def move(kind, delta, days):
+        StockMovement.objects.create(sweet=sweet, kind=kind, delta=delta, created_at=start + timedelta(days=days))
+
+    move("restock", 20, 0)
+    move("sale", -5, 0.5)
+    move("sale", -3, 1.5)
+    move("restock", 4, 1.6)
+    move("sale", -6, 2.5)
+
+    def answers():
+        return (
+            [ledger.stock_at(sweet.pk, start + timedelta(days=d)) for d in (0.25, 1, 2, 3)],
+            ledger.units_sold(sweet.pk, start, start + timedelta(days=3)),
+        )
+
+    before = answers()
+    assert before == ([20, 15, 16, 10], 14)
+
+    # The first run folds everything but the last day, the second the rest.
+    assert ledger.take_snapshots(now=start + timedelta(days=2), settle=timedelta(0)) == 1
+    assert ledger.take_snapshots(now=start + timedelta(days=2), settle=timedelta(0)) == 0
+    assert ledger.take_snapshots(now=start + timedelta(days=3), settle=timedelta(0)) == 1
+    assert list(StockSnapshot.objects.order_by("taken_at").values_list("quantity", "sold")) == [(16, 8), (10, 14)]
+    assert answers() == before
+
+    with CaptureQueriesContext(connection) as queries:
+        assert ledger.stock_at(sweet.pk, start + timedelta(days=3)) == 10
+    assert len(queries) == 2
+
+
+@pytest.mark.django_db
+def test_purchase_writes_the_ledger_in_one_round_trip_on_postgresql():
+    if connection.vendor != "postgresql":
+        pytest.skip("SQLite runs the ledger insert as a second in-process statement")
+    sweet = Sweet.objects.create(name="Toffee", category="Candy", price="1.50", quantity=3)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert Sweet.objects.take_stock(sweet.pk, 2).quantity == 1
+    assert len(queries) == 1
+    assert StockMovement.objects.get().delta == -2
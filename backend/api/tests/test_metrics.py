@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+from django.http import HttpResponse
+from rest_framework.test import APIClient
+
+from api import metrics
+from api.models import Sweet
+from conftest import login
+
+
+def sample(text, name, **labels):
+    for line in text.splitlines():
+        if line.startswith(name + "{") and all(f'{k}="{v}"' in line for k, v in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+@pytest.mark.django_db
+def test_requests_are_measured_per_view():
+    metrics.registry.reset()
+    client = APIClient()
+    login(client, "m1")
+    sweet = Sweet.objects.create(name="Fudge", category="Candy", price="2.00", quantity=5)
+    client.get("/api/sweets/")
+    client.get("/api/sweets/")
+    client.post(f"/api/sweets/{sweet.id}/purchase/", {"quantity": 1}, format='json')
+
+    text = client.get("/api/metrics/").content.decode()
+    assert sample(text, "api_requests_total", view="sweet-list", method="GET", status="2xx") == 2
+    assert sample(text, "api_requests_total", view="login", method="POST", status="2xx") == 1
+    assert sample(text, "api_request_duration_seconds_count", view="sweet-purchase") == 1
+    assert sample(text, "api_request_duration_seconds_bucket", view="sweet-list", le="+Inf") == 2
+    assert sample(text, "api_request_queries_total", view="sweet-list") >= 2
+    assert sample(text, "api_request_db_seconds_total", view="sweet-purchase") > 0
+    assert sample(text, "api_request_serializer_seconds_total", view="sweet-list") > 0
+    assert sample(text, "api_response_bytes_total", view="sweet-list") > 0
+
+    # Only local addresses may scrape.
+    assert client.get("/api/metrics/", REMOTE_ADDR="10.0.0.9").status_code == 404
+
+
+@pytest.mark.django_db
+def test_n_plus_one_and_over_budget_requests_are_flagged(settings, caplog, rf):
+    metrics.registry.reset()
+    sweets = [Sweet.objects.create(name=f"S{n}", category="Candy", price="1.00", quantity=1) for n in range(6)]
+    settings.PERF_MAX_QUERIES = 5
+
+    def one_query_per_row(request):
+        return HttpResponse(",".join(Sweet.objects.get(pk=sweet.pk).name for sweet in sweets))
+
+    with caplog.at_level(logging.WARNING, logger="api.perf"):
+        metrics.perf_middleware(one_query_per_row)(rf.get("/loop/"))
+        metrics.perf_middleware(lambda request: HttpResponse("ok"))(rf.get("/cheap/"))
+
+    text = metrics.registry.render()
+    assert sample(text, "api_request_flags_total", view="unresolved", flag="n_plus_one") == 1
+    assert sample(text, "api_request_flags_total", view="unresolved", flag="queries") == 1
+    assert sample(text, "api_requests_total", view="unresolved") == 2
+    [record] = caplog.records
+    assert "/loop/" in record.getMessage() and "6x SELECT" in record.getMessage()
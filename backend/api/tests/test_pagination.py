@@ -0,0 +1,65 @@
+import base64
+import json
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.models import Sweet
+from conftest import login
+
+
+@pytest.mark.django_db
+def test_plain_list_is_not_paginated():
+    client = APIClient()
+    login(client, "p0")
+    Sweet.objects.create(name="Toffee", category="Candy", price="1.00", quantity=1)
+
+    resp = client.get("/api/sweets/")
+    assert resp.status_code == 200
+    assert isinstance(resp.json(), list)
+
+
+@pytest.mark.django_db
+def test_keyset_pages_walk_the_whole_filtered_set():
+    client = APIClient()
+    login(client, "p1")
+    for i in range(7):
+        Sweet.objects.create(name=f"Choco {i}", category="Chocolate", price="5.00", quantity=1)
+    Sweet.objects.create(name="Sour", category="Candy", price="5.00", quantity=1)
+
+    seen = []
+    url = "/api/sweets/?category=Chocolate&ordering=price&page_size=3&count=true"
+    first = client.get(url).json()
+    assert first["count"] == 7
+
+    body = first
+    while True:
+        seen += [i["name"] for i in body["results"]]
+        if not body["next"]:
+            break
+        body = client.get(body["next"]).json()
+        assert "count" not in body
+
+    # Equal prices must not cause rows to be skipped or repeated.
+    assert sorted(seen) == [f"Choco {i}" for i in range(7)]
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_rejected():
+    client = APIClient()
+    login(client, "p2")
+
+    resp = client.get("/api/sweets/?cursor=not-a-cursor")
+    assert resp.status_code == 404
+
+    # Well-formed cursors whose values don't fit their column.
+    for ordering, values in [
+        ("id", ["abc"]), ("id", [1.5]), ("id", [True]), ("id", [10**20]),
+        ("price", ["NaN", 1]), ("price", [1, 1]), ("name", [7, 1]), ("name", ["x", "y"]),
+    ]:
+        payload = json.dumps({"o": ordering, "v": values}).encode()
+        cursor = base64.urlsafe_b64encode(payload).decode()
+        for url in ("/api/sweets/", "/api/async/sweets/"):
+            resp = client.get(f"{url}?ordering={ordering}&cursor={cursor}")
+            assert resp.status_code == 404, (url, ordering, values)
+            assert resp.json() == {"detail": "Invalid cursor."}
@@ -0,0 +1,52 @@
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from api.authentication import denylist, user_key
+from api.passwords import pool
+
+PASSWORD = "Str0ngPass!2025"
+
+
+@pytest.mark.django_db
+def test_login_upgrades_old_hashes_without_revoking_tokens():
+    user = User.objects.create(username="legacy", password=make_password(PASSWORD, hasher="pbkdf2_sha256"))
+    client = APIClient()
+
+    resp = client.post("/api/auth/login/", {"username": "legacy", "password": PASSWORD}, format='json')
+    assert resp.status_code == 200
+    user.refresh_from_db()
+    assert user.password.startswith("argon2$")
+    assert denylist().get(user_key(user.pk)) is None
+
+    # The new hash verifies and is left alone.
+    upgraded = user.password
+    assert client.post(
+        "/api/auth/login/", {"username": "legacy", "password": PASSWORD}, format='json'
+    ).status_code == 200
+    user.refresh_from_db()
+    assert user.password == upgraded
+    assert client.post(
+        "/api/auth/login/", {"username": "legacy", "password": "wrong"}, format='json'
+    ).status_code == 401
+
+
+@pytest.mark.django_db
+def test_logins_beyond_the_hashing_queue_get_503(settings):
+    User.objects.create_user("busy", password=PASSWORD)
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE = 1, 0
+    settings.PASSWORD_HASH_WAIT_MS = 10
+    pool.pid = None
+    try:
+        pool.start()
+        assert pool.slots.acquire(blocking=False)
+        resp = APIClient().post("/api/auth/login/", {"username": "busy", "password": PASSWORD}, format='json')
+        assert resp.status_code == 503
+        assert resp["Retry-After"] == "1"
+
+        pool.slots.release()
+        resp = APIClient().post("/api/auth/login/", {"username": "busy", "password": PASSWORD}, format='json')
+        assert resp.status_code == 200
+    finally:
+        pool.pid = None
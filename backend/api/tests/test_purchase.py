@@ -1,6 +1,8 @@
 import pytest
 from rest_framework.test import APIClient
 
+from api.models import Sweet
+
 @pytest.mark.django_db
 def test_purchase_decreases_quantity():
     client = APIClient()
@@ -24,15 +26,14 @@ def test_purchase_decreases_quantity():
     # purchase once
     resp = client.post(f"/api/sweets/{sweet_id}/purchase/")
     assert resp.status_code == 200
-    assert resp.json()['quantity'] == 2
+    assert Sweet.objects.get(pk=sweet_id).quantity == 2
 
     # purchase twice more
     client.post(f"/api/sweets/{sweet_id}/purchase/")
     client.post(f"/api/sweets/{sweet_id}/purchase/")
 
     # now quantity should be 0
-    final = client.get(f"/api/sweets/{sweet_id}/")
-    assert final.json()['quantity'] == 0
+    assert Sweet.objects.get(pk=sweet_id).quantity == 0
 
 @pytest.mark.django_db
 def test_purchase_out_of_stock():
@@ -58,3 +59,74 @@ def test_purchase_out_of_stock():
     resp = client.post(f"/api/sweets/{sweet_id}/purchase/")
     assert resp.status_code == 400
     assert resp.json()['detail'] == "Out of stock"
+
+@pytest.mark.django_db
+def test_purchase_quantity_n():
+    client = APIClient()
+
+    client.post("/api/auth/register/", {"username": "sam3", "email": "s3@x.com", "password": "Str0ngPass!2025", "password2": "Str0ngPass!2025"}, format='json')
+    login = client.post("/api/auth/login/", {"username": "sam3", "password": "Str0ngPass!2025"}, format='json')
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.json()['access']}")
+
+    sweet = client.post("/api/sweets/", {"name": "Gum", "category": "Candy", "price": "1.00", "quantity": 5}, format='json').json()
+
+    resp = client.post(f"/api/sweets/{sweet['id']}/purchase/", {"quantity": 3}, format='json')
+    assert resp.status_code == 200
+    assert resp.json()['price'] == "1.00"
+    assert 'quantity' not in resp.json()
+    assert Sweet.objects.get(pk=sweet['id']).quantity == 2
+
+    # not enough left for 3 more; nothing is taken
+    resp = client.post(f"/api/sweets/{sweet['id']}/purchase/", {"quantity": 3}, format='json')
+    assert resp.status_code == 400
+    assert resp.json()['detail'] == "Out of stock"
+
+    resp = client.post(f"/api/sweets/{sweet['id']}/purchase/", {"quantity": 0}, format='json')
+    assert resp.status_code == 400
+
+    resp = client.post("/api/sweets/999999/purchase/")
+    assert resp.status_code == 404
+
+    for body in ({"quantity": 10 ** 20}, {"quantity": 1.9}, {"quantity": True}, [1], "1"):
+        resp = client.post(f"/api/sweets/{sweet['id']}/purchase/", body, format='json')
+        assert resp.status_code == 400
+        assert resp.json()['detail'] == "Invalid quantity"
+    assert Sweet.objects.get(pk=sweet['id']).quantity == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_purchases_never_oversell():
+    import threading
+
+    from django.db import OperationalError
+    from api.models import Sweet
+
+    sweet = Sweet.objects.create(name="Hot Fudge", category="Fudge", price="3.00", quantity=100)
+    sold = []
+    lock = threading.Lock()
+
+    def buyer():
+        from django.db import connection as thread_connection
+        try:
+            for _ in range(25):
+                while True:
+                    try:
+                        ok = Sweet.objects.take_stock(sweet.pk, 1) is not None
+                        break
+                    except OperationalError:
+                        continue  # "database is locked" on SQLite; retry
+                if ok:
+                    with lock:
+                        sold.append(1)
+        finally:
+            thread_connection.close()
+
+    threads = [threading.Thread(target=buyer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    sweet.refresh_from_db()
+    assert len(sold) == 100
+    assert sweet.quantity == 0
@@ -0,0 +1,50 @@
+import pytest
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from api.models import Sweet
+from api.replicas import ReplicaRouter, replica_pin_middleware
+
+replicated = override_settings(DATABASE_REPLICAS=["replica_1"])
+
+
+@replicated
+@pytest.mark.django_db
+def test_catalogue_reads_go_to_replicas_and_writes_to_primary():
+    assert Sweet.objects.all().db == "replica_1"
+    assert Sweet.objects.select_for_update().db == "default"
+    assert User.objects.all().db == "default"
+    assert ReplicaRouter().allow_migrate("replica_1", "api") is False
+
+    # Raw UPDATE ... RETURNING and the checkout transaction must not be
+    # sent to the (here nonexistent) replica alias.
+    sweet = Sweet.objects.using("default").create(name="Toffee", category="Candy", price="1.50", quantity=5)
+    assert Sweet.objects.take_stock(sweet.id, 2).quantity == 3
+    assert Sweet.objects.take_stock_many({sweet.id: 1})[1] == []
+
+
+@replicated
+@pytest.mark.django_db
+def test_writer_reads_from_primary_for_a_while():
+    buyer = User.objects.create_user("buyer")
+    other = User.objects.create_user("other")
+    factory = RequestFactory()
+    seen = {}
+
+    def view(request):
+        seen[request.user.username] = Sweet.objects.all().db
+        return HttpResponse(status=200)
+
+    middleware = replica_pin_middleware(view)
+
+    def call(method, user):
+        request = getattr(factory, method)("/api/sweets/1/purchase/")
+        request.user = user
+        middleware(request)
+        return seen[user.username]
+
+    assert call("get", buyer) == "replica_1"
+    assert call("post", buyer) == "default"
+    assert call("get", buyer) == "default"
+    assert call("get", other) == "replica_1"
@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import reservations
+from api.models import Reservation, StockMovement, Sweet
+from conftest import login
+
+
+@pytest.mark.django_db
+def test_reserved_units_are_only_sold_to_their_holder():
+    holder, other = APIClient(), APIClient()
+    login(holder, "r1")
+    login(other, "r2")
+    sweet = Sweet.objects.create(name="Fudge", category="Candy", price="2.00", quantity=5)
+
+    resp = holder.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 3}, format='json')
+    assert resp.status_code == 201
+    hold = resp.json()
+    assert hold["sweet"] == sweet.id and hold["quantity"] == 3
+
+    assert other.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 3}, format='json').status_code == 400
+    assert other.post(f"/api/sweets/{sweet.id}/purchase/", {"quantity": 3}, format='json').status_code == 400
+    cart = {"items": [{"id": sweet.id, "quantity": 3}]}
+    assert other.post("/api/sweets/checkout/", cart, format='json').status_code == 400
+    assert other.post(f"/api/sweets/{sweet.id}/purchase/", {"quantity": 2}, format='json').status_code == 200
+
+    # 3 left, all of them held: not in stock for anyone else.
+    assert other.get("/api/sweets/?in_stock=true").json() == []
+    assert other.post(
+        f"/api/sweets/{sweet.id}/purchase/", {"reservation": hold["id"]}, format='json'
+    ).status_code == 400
+
+    assert holder.post(
+        f"/api/sweets/{sweet.id}/purchase/", {"reservation": hold["id"]}, format='json'
+    ).status_code == 200
+    sweet.refresh_from_db()
+    assert (sweet.quantity, sweet.reserved) == (0, 0)
+    assert not Reservation.objects.exists()
+    assert StockMovement.objects.filter(sweet=sweet, kind="sale").count() == 2
+
+    # Held stock can't be adjusted away either.
+    admin = APIClient()
+    login(admin, "r3", admin=True)
+    admin.post(f"/api/sweets/{sweet.id}/restock/", {"amount": 4}, format='json')
+    holder.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 3}, format='json')
+    assert admin.patch(f"/api/sweets/{sweet.id}/", {"quantity": 2}, format='json').status_code == 400
+    assert admin.post(f"/api/sweets/{sweet.id}/hot/", {"shards": 4}, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_lapsed_holds_are_released(settings):
+    client = APIClient()
+    login(client, "r4")
+    sweet = Sweet.objects.create(name="Toffee", category="Candy", price="1.00", quantity=4)
+
+    first = client.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 2}, format='json').json()
+    second = client.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 2}, format='json').json()
+    assert client.post(f"/api/sweets/{sweet.id}/release/", {"reservation": first["id"]}, format='json').status_code == 204
+    assert Sweet.objects.get(pk=sweet.pk).reserved == 2
+
+    later = timezone.now() + timedelta(seconds=settings.RESERVATION_TTL_SECONDS + 1)
+    assert reservations.expire(now=later, batch_size=1) == 1
+    assert Sweet.objects.get(pk=sweet.pk).reserved == 0
+    assert client.post(
+        f"/api/sweets/{sweet.id}/purchase/", {"reservation": second["id"]}, format='json'
+    ).status_code == 400
+
+    # A reserve that comes up short frees that sweet's lapsed holds first.
+    settings.RESERVATION_TTL_SECONDS = 0
+    client.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 4}, format='json')
+    settings.RESERVATION_TTL_SECONDS = 900
+    assert client.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 4}, format='json').status_code == 201
+    assert Reservation.objects.count() == 1
+    assert Sweet.objects.get(pk=sweet.pk).reserved == 4
+
+
+@pytest.mark.django_db
+def test_malformed_ids_are_client_errors():
+    client = APIClient()
+    login(client, "r5")
+    sweet = Sweet.objects.create(name="Nougat", category="Candy", price="1.00", quantity=4)
+
+    assert client.post("/api/sweets/abc/reserve/", {"quantity": 1}, format='json').status_code == 404
+    assert client.post(f"/api/sweets/{10**20}/reserve/", {"quantity": 1}, format='json').status_code == 404
+    for action in ("purchase", "release"):
+        for ref in ("abc", 0, 10**20, None):
+            resp = client.post(f"/api/sweets/{sweet.id}/{action}/", {"reservation": ref}, format='json')
+            assert resp.status_code == 400, (action, ref)
+    assert client.post("/api/sweets/abc/release/", {"reservation": 1}, format='json').status_code == 404
+    assert client.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 10**20}, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_purchase_fulfils_reservations():
+    holder, other = APIClient(), APIClient()
+    login(holder, "r6")
+    login(other, "r7")
+    sweet = Sweet.objects.create(name="Brittle", category="Candy", price="1.00", quantity=3)
+    url = f"/api/async/sweets/{sweet.id}/purchase/"
+
+    hold = holder.post(f"/api/sweets/{sweet.id}/reserve/", {"quantity": 3}, format='json').json()
+    assert other.post(url, {"reservation": hold["id"]}, format='json').status_code == 400
+    assert holder.post(url, {"reservation": "abc"}, format='json').status_code == 400
+
+    resp = holder.post(url, {"reservation": hold["id"]}, format='json', HTTP_IDEMPOTENCY_KEY="r6-1")
+    assert resp.status_code == 200
+    sweet.refresh_from_db()
+    assert (sweet.quantity, sweet.reserved) == (0, 0)
+    assert not Reservation.objects.exists()
+
+    replay = holder.post(url, {"reservation": hold["id"]}, format='json', HTTP_IDEMPOTENCY_KEY="r6-1")
+    assert replay.status_code == 200
+    assert replay["Idempotent-Replayed"] == "true"
@@ -43,3 +43,46 @@ def test_search_by_name_and_category_and_price_range():
     assert any(i['name']=="Choco Delight" for i in items3)
     assert not any(i['name']=="Choco Mini" for i in items3)
     assert not any(i['name']=="Luxury Bar" for i in items3)
+
+@pytest.mark.django_db
+def test_category_is_case_insensitive_and_in_stock_filter():
+    client = APIClient()
+
+    client.post("/api/auth/register/", {"username":"s2","email":"s2@x.com","password":"Str0ngPass!2025","password2":"Str0ngPass!2025"}, format='json')
+    login = client.post("/api/auth/login/", {"username":"s2","password":"Str0ngPass!2025"}, format='json')
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.json()['access']}")
+
+    client.post("/api/sweets/", {"name":"Fudge Bar","category":"Fudge","price":"3.00","quantity":4}, format='json')
+    client.post("/api/sweets/", {"name":"Fudge Bite","category":"Fudge","price":"1.00","quantity":0}, format='json')
+    client.post("/api/sweets/", {"name":"Not 100%","category":"fud_e","price":"1.00","quantity":1}, format='json')
+
+    r = client.get("/api/sweets/?category=FUDGE")
+    assert sorted(i['name'] for i in r.json()) == ["Fudge Bar", "Fudge Bite"]
+
+    r2 = client.get("/api/sweets/?category=fudge&in_stock=true")
+    assert [i['name'] for i in r2.json()] == ["Fudge Bar"]
+
+@pytest.mark.django_db
+def test_full_text_search_prefix_and_sync():
+    client = APIClient()
+
+    client.post("/api/auth/register/", {"username":"s3","email":"s3@x.com","password":"Str0ngPass!2025","password2":"Str0ngPass!2025"}, format='json')
+    login = client.post("/api/auth/login/", {"username":"s3","password":"Str0ngPass!2025"}, format='json')
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.json()['access']}")
+
+    a = client.post("/api/sweets/", {"name":"Choco Delight","category":"Chocolate","price":"50.00","quantity":10}, format='json').json()
+    client.post("/api/sweets/", {"name":"Sour Candy","category":"Candy","price":"10.00","quantity":8}, format='json')
+
+    # prefix match across name and category, words AND-ed
+    assert [i['name'] for i in client.get("/api/sweets/?search=choc").json()] == ["Choco Delight"]
+    assert client.get("/api/sweets/?search=sour choc").json() == []
+    # numeric words match the price
+    assert [i['name'] for i in client.get("/api/sweets/?search=candy 10").json()] == ["Sour Candy"]
+
+    # index follows updates and deletes
+    client.patch(f"/api/sweets/{a['id']}/", {"name":"Hazelnut Delight"}, format='json')
+    assert client.get("/api/sweets/?search=choco delight").json()[0]['name'] == "Hazelnut Delight"
+    assert client.get("/api/sweets/?search=hazel").json()[0]['id'] == a['id']
+
+    client.delete(f"/api/sweets/{a['id']}/")
+    assert client.get("/api/sweets/?search=hazel").json() == []
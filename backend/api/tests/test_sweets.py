@@ -24,7 +24,8 @@ def test_create_and_list_sweet():
     assert create.status_code == 201, f"Create failed: {create.status_code} {create.content}"
     body = create.json()
     assert body['name'] == "Choco Bar"
-    assert body['quantity'] == 5
+    # standard users never see stock levels, not even their own write's
+    assert 'quantity' not in body
 
     # list sweets and check presence
     list_resp = client.get("/api/sweets/")
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from api.admission import in_flight
+from api.models import Sweet
+from api.throttling import take
+from conftest import login
+
+
+def test_bucket_refills_at_its_rate():
+    now = time.time()
+    assert [take("throttle:test:k", 2, 0.5, now=now) for _ in range(3)] == [0, 0, 2.0]
+    assert take("throttle:test:k", 2, 0.5, now=now + 1) == 1.0
+    assert take("throttle:test:k", 2, 0.5, now=now + 2) == 0
+
+
+@pytest.mark.django_db
+def test_purchases_are_limited_per_user(settings):
+    settings.THROTTLE_BUCKETS = {**settings.THROTTLE_BUCKETS, "purchase-user": (2, 0.1)}
+    first, second = APIClient(), APIClient()
+    login(first, "th1")
+    login(second, "th2")
+    sweet = Sweet.objects.create(name="Fudge", category="Candy", price="2.00", quantity=10)
+
+    assert first.post(f"/api/sweets/{sweet.id}/purchase/").status_code == 200
+    assert first.post("/api/sweets/checkout/", {"items": [{"id": sweet.id, "quantity": 1}]}, format='json').status_code == 200
+    resp = first.post(f"/api/sweets/{sweet.id}/purchase/")
+    assert resp.status_code == 429
+    assert resp["Retry-After"] == "10"
+    assert first.post(f"/api/async/sweets/{sweet.id}/purchase/").status_code == 429
+
+    assert second.post(f"/api/sweets/{sweet.id}/purchase/").status_code == 200
+    assert Sweet.objects.get(pk=sweet.pk).quantity == 7
+
+
+@pytest.mark.django_db
+def test_keyed_retries_replay_with_an_empty_bucket(settings):
+    settings.THROTTLE_BUCKETS = {**settings.THROTTLE_BUCKETS, "purchase-user": (2, 0.01)}
+    client = APIClient()
+    login(client, "th3")
+    sweet = Sweet.objects.create(name="Nougat", category="Candy", price="2.00", quantity=10)
+    sync_url, async_url = f"/api/sweets/{sweet.id}/purchase/", f"/api/async/sweets/{sweet.id}/purchase/"
+
+    assert client.post(sync_url, HTTP_IDEMPOTENCY_KEY="k1").status_code == 200
+    assert client.post(async_url, HTTP_IDEMPOTENCY_KEY="k2").status_code == 200
+    assert client.post(sync_url).status_code == 429
+    assert client.post(sync_url, HTTP_IDEMPOTENCY_KEY="k3").status_code == 429
+
+    for url, key in ((sync_url, "k1"), (async_url, "k2")):
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.post(url, HTTP_IDEMPOTENCY_KEY=key)
+        assert resp.status_code == 200
+        assert resp["Idempotent-Replayed"] == "true"
+        # The throttles and the handler share one read of the key.
+        assert sum("api_idempotencykey" in q["sql"] for q in queries.captured_queries) == 1
+    assert Sweet.objects.get(pk=sweet.pk).quantity == 8
+
+
+@pytest.mark.django_db
+def test_logins_are_limited_per_username(settings):
+    settings.THROTTLE_BUCKETS = {**settings.THROTTLE_BUCKETS, "login-user": (2, 0.01)}
+    User.objects.create_user("target", password="Str0ngPass!2025")
+    User.objects.create_user("bystander", password="Str0ngPass!2025")
+    client = APIClient()
+
+    for _ in range(2):
+        assert client.post("/api/auth/login/", {"username": "target", "password": "guess"}, format='json').status_code == 401
+    assert client.post(
+        "/api/auth/login/", {"username": "Target", "password": "Str0ngPass!2025"}, format='json'
+    ).status_code == 429
+    assert client.post(
+        "/api/auth/login/", {"username": "bystander", "password": "Str0ngPass!2025"}, format='json'
+    ).status_code == 200
+
+
+@pytest.mark.django_db
+def test_admission_control_sheds_load(settings):
+    client = APIClient()
+    settings.ADMISSION_MAX_IN_FLIGHT = 1
+    in_flight.enter(0)
+    try:
+        resp = client.get("/api/sweets/")
+        assert resp.status_code == 429
+        assert resp["Retry-After"] == "1"
+        assert client.get("/api/metrics/").status_code == 200
+    finally:
+        in_flight.leave()
+    assert in_flight.count == 0
+
+    settings.ADMISSION_MAX_QUEUE_MS = 500
+    assert client.get("/api/sweets/", HTTP_X_REQUEST_START=f"t={time.time() - 2:.3f}").status_code == 429
+    assert client.get("/api/sweets/", HTTP_X_REQUEST_START=f"t={int(time.time() * 1000)}").status_code == 401
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import tokens
+from api.models import OutstandingRefreshToken
+
+
+def register(client, username):
+    resp = client.post("/api/auth/register/", {
+        "username": username,
+        "email": f"{username}@x.com",
+        "password": "Str0ngPass!2025",
+        "password2": "Str0ngPass!2025",
+    }, format='json')
+    assert resp.status_code == 201
+    return resp.json()
+
+
+def refresh(client, token):
+    return client.post("/api/auth/refresh/", {"refresh": token}, format='json')
+
+
+@pytest.mark.django_db
+def test_refresh_rotates_and_reuse_blacklists_the_user():
+    client = APIClient()
+    first = register(client, "t1")["refresh"]
+    User.objects.filter(username="t1").update(is_staff=True)
+
+    resp = refresh(client, first)
+    assert resp.status_code == 200
+    second = resp.json()
+    assert second["refresh"] != first
+    # Claims come from the user row as it is now.
+    assert AccessToken(second["access"])["is_staff"] is True
+
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {second['access']}")
+    assert client.get("/api/sweets/").status_code == 200
+    client.credentials()
+
+    # The first token was used: presenting it again ends the session.
+    assert refresh(client, first).status_code == 401
+    assert refresh(client, second["refresh"]).status_code == 401
+    assert refresh(client, "not-a-token").status_code == 401
+
+
+@pytest.mark.django_db
+def test_password_change_blacklists_and_prune_drops_expired_rows(settings):
+    client = APIClient()
+    token = register(client, "t2")["refresh"]
+    user = User.objects.get(username="t2")
+    user.set_password("An0therPass!2025")
+    user.save()
+    assert refresh(client, token).status_code == 401
+
+    token = client.post(
+        "/api/auth/login/", {"username": "t2", "password": "An0therPass!2025"}, format='json'
+    ).json()["refresh"]
+    assert refresh(client, token).status_code == 200
+
+    later = timezone.now() + settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"] + timedelta(seconds=1)
+    assert OutstandingRefreshToken.objects.count() == 3
+    assert tokens.prune(now=later, batch_size=2) == 3
+    assert not OutstandingRefreshToken.objects.exists()
@@ -0,0 +1,122 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from . import idempotency
+
+
+# ------------------------------------------------------------------
+# RATE LIMITS (token buckets)
+# Each client has a bucket per limit in settings.THROTTLE_BUCKETS:
+# `burst` tokens, refilled at `rate` tokens per second. A request
+# takes one token, or gets a 429 with Retry-After set to when the next
+# token is due.
+#
+#   purchase-user  purchase and checkout, per user
+#   purchase-ip    purchase and checkout, per client IP
+#   auth-ip        login, register and refresh, per client IP
+#   login-user     login, per username tried
+#
+# A bucket is one cache entry, (tokens, time of last update), in the
+# THROTTLE_CACHE_ALIAS cache: a get and a set per check, no database.
+# Use a shared backend (file or redis, see SWEETS_CACHE_BACKEND) when
+# running several workers, or each worker gets its own buckets. The
+# get and set are not atomic, so requests racing on one bucket may
+# get a token or two more than the burst; fine for a rate limit.
+#
+# A retry that will be replayed from its Idempotency-Key does no work
+# and takes no token (replays_free), so a client retrying a purchase it
+# already made is not turned away with a 429.
+#
+# The client IP comes from DRF's get_ident(): REMOTE_ADDR, or
+# X-Forwarded-For when REST_FRAMEWORK["NUM_PROXIES"] is set.
+# ------------------------------------------------------------------
+def store():
+    return caches[settings.THROTTLE_CACHE_ALIAS]
+
+
+def take(key, burst, rate, now=None):
+    """
+    Takes a token from bucket `key`. Returns 0 if there was one, or
+    else the seconds until there will be.
+    """
+    now = time.time() if now is None else now
+    tokens, updated = store().get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+
+    # An untouched bucket is full again after burst / rate seconds.
+    store().set(key, (tokens - 1, now), timeout=int(burst / rate) + 1)
+    return 0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    bucket = None
+    replays_free = False
+
+    def get_key(self, request, view):
+        """
+        Who the bucket belongs to, or None to skip the check.
+        """
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        limit = settings.THROTTLE_BUCKETS.get(self.bucket)
+        if not settings.THROTTLE_ENABLED or limit is None:
+            return True
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        if self.replays_free and idempotency.is_replay(request):
+            return True
+
+        wait = take(f"throttle:{self.bucket}:{key}", *limit)
+        if wait:
+            self.retry_after = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class PurchaseUserThrottle(TokenBucketThrottle):
+    bucket = "purchase-user"
+    replays_free = True
+
+    def get_key(self, request, view):
+        return request.user.pk if request.user.is_authenticated else None
+
+
+class PurchaseIPThrottle(TokenBucketThrottle):
+    bucket = "purchase-ip"
+    replays_free = True
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    bucket = "auth-ip"
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginUserThrottle(TokenBucketThrottle):
+    bucket = "login-user"
+
+    def get_key(self, request, view):
+        username = request.data.get("username") if hasattr(request.data, "get") else None
+        if not isinstance(username, str) or not username:
+            return None
+        # Cache keys must stay short and printable.
+        return hashlib.sha1(username.lower().encode()).hexdigest()
+
+
+PURCHASE_THROTTLES = [PurchaseUserThrottle, PurchaseIPThrottle]
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import OutstandingRefreshToken
+
+
+# ------------------------------------------------------------------
+# REFRESH TOKEN ROTATION
+# Login and register hand out a refresh token along with the access
+# token. POST /api/auth/refresh/ exchanges it for a new pair: a
+# signature check and three indexed statements, instead of a password
+# hash (see api/passwords.py) every time the access token expires.
+#
+# Every refresh token issued has a row in OutstandingRefreshToken,
+# keyed by its jti. Exchanging a token sets `rotated_at` with a
+# conditional UPDATE, so a token works once even when two requests
+# race with it; after that it is blacklisted. A rotated token that
+# comes back has leaked (or the client lost a response): every refresh
+# token of that user is blacklisted and they have to log in again.
+#
+# The new pair is built from the current user row, so role changes
+# show up at the next refresh. A password change or deactivation
+# blacklists the user's refresh tokens (see signals.py).
+#
+# Rows are needed until the token expires and are then deleted by
+# manage.py prune_refresh_tokens.
+# ------------------------------------------------------------------
+def for_user(user):
+    """
+    A new refresh token for `user`, recorded as outstanding. Its
+    access token carries the role claims StatelessJWTAuthentication
+    reads.
+    """
+    token = RefreshToken.for_user(user)
+
+    # 🔥 ADMIN FLAGS INSIDE TOKEN
+    token["is_superuser"] = user.is_superuser
+    token["is_staff"] = user.is_staff
+    token["username"] = user.username
+
+    OutstandingRefreshToken.objects.create(
+        jti=token[api_settings.JTI_CLAIM],
+        user_id=user.pk,
+        expires_at=datetime_from_epoch(token["exp"]),
+    )
+    return token
+
+
+def rotate(raw_token, now=None):
+    """
+    Blacklists a refresh token and returns its replacement. Raises
+    TokenError if the token is invalid, expired, unknown or already
+    used, or its user is gone or inactive.
+    """
+    old = RefreshToken(raw_token)
+    jti, user_id = old[api_settings.JTI_CLAIM], old[api_settings.USER_ID_CLAIM]
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        claimed = OutstandingRefreshToken.objects.filter(
+            jti=jti, rotated_at__isnull=True, expires_at__gt=now
+        ).update(rotated_at=now)
+        if claimed:
+            user = get_user_model()._default_manager.filter(
+                **{api_settings.USER_ID_FIELD: user_id}, is_active=True
+            ).first()
+            if user is None:
+                raise TokenError("User not found")
+            return for_user(user)
+
+    if OutstandingRefreshToken.objects.filter(jti=jti, rotated_at__isnull=False).exists():
+        blacklist_user(user_id, now)
+    raise TokenError("Token is blacklisted")
+
+
+def blacklist_user(user_id, now=None):
+    """
+    Blacklists every refresh token `user_id` holds.
+    """
+    OutstandingRefreshToken.objects.filter(user_id=user_id, rotated_at__isnull=True).update(
+        rotated_at=now or timezone.now()
+    )
+
+
+def prune(now=None, batch_size=1000):
+    """
+    Deletes the rows of expired tokens, `batch_size` per statement,
+    along the expires_at index. Returns how many were deleted.
+    """
+    expired = OutstandingRefreshToken.objects.filter(expires_at__lte=now or timezone.now()).order_by("expires_at")
+    deleted = 0
+    while batch := list(expired.values_list("pk", flat=True)[:batch_size]):
+        deleted += OutstandingRefreshToken.objects.filter(pk__in=batch).delete()[0]
+    return deleted
@@ -1,12 +1,22 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RegisterView, LoginView, SweetViewSet
+from .metrics import metrics_view
+from .async_views import SweetDetailView, SweetListView, SweetPurchaseView
+from .views import AnalyticsViewSet, RegisterView, LoginView, RefreshView, SweetViewSet
 
 router = DefaultRouter()
 router.register(r"sweets", SweetViewSet, basename="sweet")
+router.register(r"analytics", AnalyticsViewSet, basename="analytics")
 
 urlpatterns = [
     path("auth/register/", RegisterView.as_view(), name="register"),
     path("auth/login/", LoginView.as_view(), name="login"),
+    path("auth/refresh/", RefreshView.as_view(), name="token-refresh"),
+    # Prometheus scrape target, local addresses only (api/metrics.py)
+    path("metrics/", metrics_view, name="metrics"),
+    # Async (ASGI) versions of the kiosk hot paths, see api/async_views.py
+    path("async/sweets/", SweetListView.as_view(), name="async-sweet-list"),
+    path("async/sweets/<int:pk>/", SweetDetailView.as_view(), name="async-sweet-detail"),
+    path("async/sweets/<int:pk>/purchase/", SweetPurchaseView.as_view(), name="async-sweet-purchase"),
     path("", include(router.urls)),
 ]
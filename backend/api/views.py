@@ -1,16 +1,51 @@
+from datetime import timedelta
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions, viewsets, filters
+from rest_framework import exceptions, status, permissions, viewsets, filters
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.decorators import action
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 
 from django.contrib.auth import authenticate
+from django.http import StreamingHttpResponse
 from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Upper
+from django.utils import timezone
 
-from .models import Sweet
-from .serializers import RegisterSerializer, SweetSerializer
+from . import analytics
+from . import cache as sweet_cache
+from . import catalogue
+from . import conditional
+from . import hot
+from . import ledger
+from . import reservations
+from . import tokens
+from .idempotency import idempotent
+from .models import StockMovement, Sweet
+from .pagination import SweetKeysetPagination
+from .renderers import FastJSONRenderer
+from .search import SweetSearchFilter
+from .throttling import PURCHASE_THROTTLES, AuthIPThrottle, LoginUserThrottle
+from .serializers import (
+    HOT_QUANTITY_ERROR,
+    MAX_ID,
+    RESERVED_QUANTITY_ERROR,
+    AnalyticsParamsSerializer,
+    CheckoutSerializer,
+    QuantitySerializer,
+    RegisterSerializer,
+    ReservationRefSerializer,
+    ReservationSerializer,
+    RestockLineSerializer,
+    SweetIdSerializer,
+    SweetSerializer,
+    requested_fields,
+    sweet_rows,
+    sweet_serializer_class,
+)
 
 
 # ============================================================
@@ -18,15 +53,16 @@ from .serializers import RegisterSerializer, SweetSerializer
 # ============================================================
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AuthIPThrottle]
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens.for_user(user)
         return Response(
-            {"access": str(refresh.access_token)},
+            {"access": str(refresh.access_token), "refresh": str(refresh)},
             status=status.HTTP_201_CREATED
         )
 
@@ -37,21 +73,85 @@ class RegisterView(APIView):
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
-        token = super().get_token(user)
-
-        # 🔥 ADMIN FLAGS INSIDE TOKEN
-        token["is_superuser"] = user.is_superuser
-        token["is_staff"] = user.is_staff
-        token["username"] = user.username
-
-        return token
+        # Admin flags go inside the token; see tokens.for_user.
+        return tokens.for_user(user)
 
 
 class LoginView(TokenObtainPairView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AuthIPThrottle, LoginUserThrottle]
     serializer_class = MyTokenObtainPairSerializer
 
 
+# ============================================================
+# 🔄 REFRESH (rotation + blacklist, see api/tokens.py)
+# ============================================================
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = tokens.rotate(attrs["refresh"])
+        return {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+
+class RefreshView(TokenRefreshView):
+    throttle_classes = [AuthIPThrottle]
+    serializer_class = RotatingTokenRefreshSerializer
+
+
+# Largest batch accepted by the bulk admin endpoints.
+BULK_MAX_ROWS = 5000
+
+
+def filter_sweets(qs, params):
+    """
+    Applies the ?name= / ?category= / ?min_price= / ?max_price= /
+    ?in_stock= filters. Shared by SweetViewSet and the async views.
+    """
+    name = params.get("name")
+    category = params.get("category")
+    min_price = params.get("min_price")
+    max_price = params.get("max_price")
+    in_stock = params.get("in_stock")
+
+    if name:
+        qs = qs.filter(name__icontains=name)
+    if category:
+        # Same semantics as category__iexact, but phrased as
+        # UPPER(category) = UPPER(%s) so it matches the functional
+        # index on every backend (SQLite's LIKE cannot use it).
+        qs = qs.alias(category_ci=Upper("category")).filter(
+            category_ci=Upper(Value(category))
+        )
+    if min_price:
+        try:
+            qs = qs.filter(price__gte=float(min_price))
+        except ValueError:
+            pass
+    if max_price:
+        try:
+            qs = qs.filter(price__lte=float(max_price))
+        except ValueError:
+            pass
+    if in_stock and in_stock.lower() in ("1", "true", "yes"):
+        # Units held by reservations are not for sale.
+        qs = qs.filter(quantity__gt=F("reserved"))
+
+    return qs
+
+
+def sweet_pk(pk):
+    """
+    The {id} of a sweet URL as an int. Anything that can't be a sweet
+    id is a 404, like an id that doesn't exist.
+    """
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise exceptions.NotFound("Not found")
+    if not 0 < pk <= MAX_ID:
+        raise exceptions.NotFound("Not found")
+    return pk
+
+
 # ============================================================
 # 🍬 SWEETS VIEWSET
 # ============================================================
@@ -64,65 +164,323 @@ class SweetViewSet(viewsets.ModelViewSet):
     serializer_class = SweetSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    # 📄 KEYSET PAGINATION (opt-in via ?page_size= / ?cursor=)
+    pagination_class = SweetKeysetPagination
+
     # 🔍 SEARCH SUPPORT
-    filter_backends = [filters.SearchFilter]
+    # FTS5 on SQLite, tsvector on PostgreSQL; search_fields is only
+    # used by the LIKE fallback on other databases.
+    filter_backends = [SweetSearchFilter]
     search_fields = ["name", "category", "price"]
 
+    # 🚀 orjson-backed JSON when installed (api/renderers.py)
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
     def get_queryset(self):
-        qs = Sweet.objects.all()
+        queryset = filter_sweets(Sweet.objects.all(), self.request.query_params)
+        if self.action == "retrieve":
+            # Standard users' reads never fetch the quantity column.
+            queryset = queryset.only(*self.read_fields())
+        return queryset
 
-        name = self.request.query_params.get("name")
-        category = self.request.query_params.get("category")
-        min_price = self.request.query_params.get("min_price")
-        max_price = self.request.query_params.get("max_price")
+    def get_serializer_class(self):
+        # Reads are role-aware; writes always take the full serializer
+        # (their responses are role-aware again, see create()/update()).
+        if self.action in ("list", "retrieve", "purchase"):
+            return sweet_serializer_class(self.request)
+        return SweetSerializer
 
-        if name:
-            qs = qs.filter(name__icontains=name)
-        if category:
-            qs = qs.filter(category__iexact=category)
-        if min_price:
-            try:
-                qs = qs.filter(price__gte=float(min_price))
-            except ValueError:
-                pass
-        if max_price:
-            try:
-                qs = qs.filter(price__lte=float(max_price))
-            except ValueError:
-                pass
+    def read_fields(self):
+        """
+        ?fields= checked against what this user may see.
+        """
+        allowed = self.get_serializer_class().Meta.fields
+        return requested_fields(self.request.query_params, allowed)
 
-        return qs
+
+    # ========================================================
+    # ⚡ CACHED, CONDITIONAL READS
+    # A matching If-None-Match / If-Modified-Since gets a 304 straight
+    # from the cache version (lists) or updated_at (detail), see
+    # api/conditional.py. Otherwise the body comes from the response
+    # cache (api/cache.py) or is built and cached.
+    # ========================================================
+    def list(self, request, *args, **kwargs):
+        fields = self.read_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = conditional.list_validators(request)
+        return conditional.conditional_response(
+            request, validators,
+            lambda: sweet_cache.cached_response(
+                request, "list", lambda: self.list_rows(request, queryset, fields)
+            ),
+        )
+
+    def list_rows(self, request, queryset, fields):
+        # Read-only fast path: dicts from .values(), no model instances
+        # and no per-field serializer calls (see sweet_rows).
+        columns = fields
+        if self.paginator.is_requested(request):
+            columns = (*fields, *self.paginator.key_fields(request))
+        rows = queryset.values(*dict.fromkeys(columns))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(sweet_rows(page, fields))
+        return Response(sweet_rows(rows, fields))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get("pk")
+        validators = conditional.detail_validators(request, self.get_queryset(), pk)
+        return conditional.conditional_response(
+            request, validators,
+            lambda: sweet_cache.cached_response(
+                request, "retrieve",
+                lambda: super(SweetViewSet, self).retrieve(request, *args, **kwargs),
+                pk=pk,
+            ),
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == "retrieve":
+            kwargs["fields"] = self.read_fields()
+        return super().get_serializer(*args, **kwargs)
+
+    # POST /api/sweets/ also honours Idempotency-Key, like the
+    # mutating actions below (api/idempotency.py).
+    # Writes validate with the full SweetSerializer, but the response
+    # shows only what this user may read (no quantity for standard
+    # users).
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.data = sweet_serializer_class(request)(self.saved).data
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response.data = sweet_serializer_class(request)(self.saved).data
+        return response
+
+    # ========================================================
+    # 📒 STOCK LEDGER FOR PLAIN CREATE / UPDATE
+    # Setting `quantity` directly is an adjustment (api/ledger.py).
+    # ========================================================
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            sweet = self.saved = serializer.save()
+            ledger.record(ledger.adjustments({sweet.pk: sweet.quantity}, self.request.user.pk))
+
+    def perform_update(self, serializer):
+        before = serializer.instance.quantity
+        with transaction.atomic():
+            sweet = self.saved = serializer.save()
+            ledger.record(ledger.adjustments({sweet.pk: sweet.quantity - before}, self.request.user.pk))
+
+    # GET /api/sweets/cache-stats/ (admin)
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="cache-stats",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def cache_stats(self, request):
+        return Response(sweet_cache.stats(), status=status.HTTP_200_OK)
 
 
     # ========================================================
     # 🛒 PURCHASE (USER)
-    # POST /api/sweets/{id}/purchase/
+    # POST /api/sweets/{id}/purchase/   body: {"quantity": n} (default 1)
+    #                                   or {"reservation": id}
     # ========================================================
-    @action(detail=True, methods=["post"])
+    @action(detail=True, methods=["post"], throttle_classes=PURCHASE_THROTTLES)
+    @idempotent
     def purchase(self, request, pk=None):
-        try:
-            with transaction.atomic():
-                sweet = Sweet.objects.select_for_update().get(pk=pk)
+        pk = sweet_pk(pk)
+        if isinstance(request.data, dict) and "reservation" in request.data:
+            return self.purchase_reserved(request, pk)
+        body = QuantitySerializer(data=request.data)
+        if not body.is_valid():
+            return Response(
+                {"detail": "Invalid quantity"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        quantity = body.validated_data["quantity"]
 
-                if sweet.quantity <= 0:
-                    return Response(
-                        {"detail": "Out of stock"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+        sweet = Sweet.objects.take_stock(pk, quantity, actor_id=request.user.pk)
 
-                sweet.quantity -= 1
-                sweet.save()
+        if sweet is None:
+            # Only the failure path pays for a second query.
+            if not Sweet.objects.filter(pk=pk).exists():
+                return Response(
+                    {"detail": "Not found"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(
+                {"detail": "Out of stock"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            self.get_serializer(sweet).data,
+            status=status.HTTP_200_OK
+        )
+
+    def purchase_reserved(self, request, pk):
+        ref = ReservationRefSerializer(data=request.data)
+        ref.is_valid(raise_exception=True)
+        sweet = reservations.fulfil(ref.validated_data["reservation"], pk, request.user.pk)
+        if sweet is None:
+            return Response(
+                {"detail": "Reservation not found or expired"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            self.get_serializer(sweet).data,
+            status=status.HTTP_200_OK
+        )
 
+
+    # ========================================================
+    # ⏳ RESERVE / RELEASE (USER)
+    # POST /api/sweets/{id}/reserve/  {"quantity": n}  -> hold for
+    #      RESERVATION_TTL_SECONDS, bought with purchase {"reservation": id}
+    # POST /api/sweets/{id}/release/  {"reservation": id}
+    # See api/reservations.py.
+    # ========================================================
+    @action(detail=True, methods=["post"])
+    @idempotent
+    def reserve(self, request, pk=None):
+        pk = sweet_pk(pk)
+        body = QuantitySerializer(data=request.data)
+        if not body.is_valid():
+            return Response(
+                {"detail": "Invalid quantity"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        reservation = reservations.reserve(pk, request.user.pk, body.validated_data["quantity"])
+
+        if reservation is None:
+            if not Sweet.objects.filter(pk=pk).exists():
                 return Response(
-                    SweetSerializer(sweet).data,
-                    status=status.HTTP_200_OK
+                    {"detail": "Not found"},
+                    status=status.HTTP_404_NOT_FOUND
                 )
+            return Response(
+                {"detail": "Out of stock"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            ReservationSerializer(reservation).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=["post"])
+    @idempotent
+    def release(self, request, pk=None):
+        pk = sweet_pk(pk)
+        ref = ReservationRefSerializer(data=request.data)
+        ref.is_valid(raise_exception=True)
+        if not reservations.cancel(ref.validated_data["reservation"], pk, request.user.pk):
+            return Response(
+                {"detail": "Reservation not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+    # ========================================================
+    # 🔥 HOT-SKU MODE (ADMIN ONLY)
+    # POST /api/sweets/{id}/hot/  {"shards": 8}   (0 switches it off)
+    # Splits the stock over shard rows for flash sales (api/hot.py).
+    # ========================================================
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="hot",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def hot_mode(self, request, pk=None):
+        pk = sweet_pk(pk)
+        try:
+            if not isinstance(request.data, dict):
+                raise TypeError
+            shards = int(request.data.get("shards", 0))
+            if not 0 <= shards <= hot.MAX_SHARDS:
+                raise ValueError
+        except (ValueError, TypeError):
+            return Response(
+                {"detail": f"shards must be between 0 and {hot.MAX_SHARDS}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
+        try:
+            sweet = hot.switch(pk, shards)
         except Sweet.DoesNotExist:
             return Response(
                 {"detail": "Not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except hot.SwitchRefused as exc:
+            return Response(
+                {"detail": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {"id": sweet.pk, "shards": sweet.shards, "quantity": sweet.quantity},
+            status=status.HTTP_200_OK
+        )
+
+
+    # ========================================================
+    # 🧺 CHECKOUT (USER)
+    # POST /api/sweets/checkout/
+    # body: {"items": [{"id": 1, "quantity": 2}, ...]}
+    # Either every line is taken from stock or none is.
+    # ========================================================
+    @action(detail=False, methods=["post"], throttle_classes=PURCHASE_THROTTLES)
+    @idempotent
+    def checkout(self, request):
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        amounts = serializer.get_amounts()
+
+        sweets, short = Sweet.objects.take_stock_many(amounts, actor_id=request.user.pk)
+
+        if short:
+            return Response(
+                {
+                    "detail": "Out of stock",
+                    "items": [
+                        {
+                            "id": pk,
+                            "quantity": amounts[pk],
+                            "status": "not_found" if pk not in sweets else (
+                                "out_of_stock" if pk in short else "ok"
+                            ),
+                        }
+                        for pk in amounts
+                    ],
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = [
+            {
+                "id": pk,
+                "quantity": amounts[pk],
+                "price": str(sweets[pk].price),
+                "status": "ok",
+            }
+            for pk in amounts
+        ]
+        total = sum(sweets[pk].price * amounts[pk] for pk in amounts)
+        return Response(
+            {"items": items, "total": str(total)},
+            status=status.HTTP_200_OK
+        )
 
 
     # ========================================================
@@ -135,6 +493,7 @@ class SweetViewSet(viewsets.ModelViewSet):
         url_path="restock",
         permission_classes=[permissions.IsAdminUser],
     )
+    @idempotent
     def restock(self, request, pk=None):
         try:
             amount = int(request.data.get("amount", 0))
@@ -145,6 +504,10 @@ class SweetViewSet(viewsets.ModelViewSet):
                 sweet = Sweet.objects.select_for_update().get(pk=pk)
                 sweet.quantity += amount
                 sweet.save()
+                hot.add_stock({sweet.pk: amount})
+                StockMovement.objects.create(
+                    sweet=sweet, kind=StockMovement.RESTOCK, delta=amount, actor_id=request.user.pk
+                )
 
                 return Response(
                     SweetSerializer(sweet).data,
@@ -161,3 +524,281 @@ class SweetViewSet(viewsets.ModelViewSet):
                 {"detail": "Not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+    # ========================================================
+    # 📚 BULK CREATE / UPDATE (ADMIN ONLY)
+    # POST  /api/sweets/bulk/  {"items": [{name, category, price, quantity}, ...]}
+    # PATCH /api/sweets/bulk/  {"items": [{id, <fields to change>}, ...]}
+    # Bad rows are reported per index and the rest are written, unless
+    # "strict": true is sent, in which case nothing is written.
+    # ========================================================
+    @action(
+        detail=False,
+        methods=["post", "patch"],
+        url_path="bulk",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    @idempotent
+    def bulk(self, request):
+        rows, strict, error = self.get_bulk_rows(request)
+        if error:
+            return error
+
+        if request.method == "PATCH":
+            return self.bulk_update_rows(rows, strict)
+        return self.bulk_create_rows(rows, strict)
+
+    def bulk_create_rows(self, rows, strict):
+        serializer = SweetSerializer(many=True)
+        valid, errors = serializer.validate_rows(rows)
+
+        if errors and strict:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = []
+        if valid:
+            with transaction.atomic():
+                created = serializer.create([attrs for _, attrs in valid])
+                ledger.record(ledger.adjustments(
+                    {sweet.pk: sweet.quantity for sweet in created}, self.request.user.pk
+                ))
+        return Response(
+            {
+                "created": len(created),
+                "items": SweetSerializer(created, many=True).data,
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
+
+    def bulk_update_rows(self, rows, strict):
+        serializer = SweetSerializer(many=True, partial=True)
+        valid, errors = serializer.validate_rows(rows)
+
+        # `id` is read-only on SweetSerializer, so take it from the raw row.
+        ids = {}
+        for index, attrs in valid:
+            ref = SweetIdSerializer(data=rows[index])
+            if ref.is_valid():
+                ids[index] = ref.validated_data["id"]
+            else:
+                errors.append({"index": index, "errors": {"id": ["A valid id is required."]}})
+
+        sweets = Sweet.objects.in_bulk(set(ids.values()))
+        quantities = {index: attrs["quantity"] for index, attrs in valid if "quantity" in attrs}
+        for index, pk in list(ids.items()):
+            if pk not in sweets:
+                errors.append({"index": index, "errors": {"id": ["Not found."]}})
+            elif sweets[pk].shards and "quantity" in rows[index]:
+                errors.append({"index": index, "errors": {"quantity": [HOT_QUANTITY_ERROR]}})
+                del ids[index]
+            elif quantities.get(index, sweets[pk].reserved) < sweets[pk].reserved:
+                errors.append({"index": index, "errors": {"quantity": [RESERVED_QUANTITY_ERROR]}})
+                del ids[index]
+
+        errors.sort(key=lambda e: e["index"])
+        if errors and strict:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        pairs = [
+            (sweets[ids[index]], attrs)
+            for index, attrs in valid
+            if index in ids and ids[index] in sweets
+        ]
+        before = {pk: sweet.quantity for pk, sweet in sweets.items()}
+        with transaction.atomic():
+            updated = serializer.update([s for s, _ in pairs], [a for _, a in pairs])
+            ledger.record(ledger.adjustments(
+                {sweet.pk: sweet.quantity - before[sweet.pk] for sweet in set(updated)},
+                self.request.user.pk,
+            ))
+        return Response(
+            {
+                "updated": len(updated),
+                "items": SweetSerializer(updated, many=True).data,
+                "errors": errors,
+            },
+            status=status.HTTP_200_OK if updated else status.HTTP_400_BAD_REQUEST
+        )
+
+
+    # ========================================================
+    # 📦 BULK RESTOCK (ADMIN ONLY)
+    # POST /api/sweets/bulk-restock/  {"items": [{"id": 1, "amount": 50}, ...]}
+    # Every amount is added in one UPDATE ... CASE statement.
+    # ========================================================
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk-restock",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    @idempotent
+    def bulk_restock(self, request):
+        rows, strict, error = self.get_bulk_rows(request)
+        if error:
+            return error
+
+        amounts, errors = {}, []
+        for index, row in enumerate(rows):
+            line = RestockLineSerializer(data=row)
+            if line.is_valid():
+                pk = line.validated_data["id"]
+                amounts.setdefault(pk, []).append((index, line.validated_data["amount"]))
+            else:
+                errors.append({"index": index, "errors": line.errors})
+
+        existing = set(Sweet.objects.filter(id__in=amounts).values_list("id", flat=True))
+        for pk in set(amounts) - existing:
+            for index, _ in amounts.pop(pk):
+                errors.append({"index": index, "errors": {"id": ["Not found."]}})
+
+        errors.sort(key=lambda e: e["index"])
+        if errors and strict:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        totals = {pk: sum(amount for _, amount in lines) for pk, lines in amounts.items()}
+        if totals:
+            with transaction.atomic():
+                Sweet.objects.filter(id__in=totals).update(
+                    quantity=F("quantity") + Case(
+                        *[When(id=pk, then=Value(total)) for pk, total in totals.items()],
+                        output_field=IntegerField(),
+                    )
+                )
+                hot.add_stock(totals)
+                ledger.record([
+                    StockMovement(sweet_id=pk, kind=StockMovement.RESTOCK, delta=total, actor_id=request.user.pk)
+                    for pk, total in totals.items()
+                ])
+
+        return Response(
+            {
+                "restocked": [{"id": pk, "amount": total} for pk, total in totals.items()],
+                "errors": errors,
+            },
+            status=status.HTTP_200_OK if totals else status.HTTP_400_BAD_REQUEST
+        )
+
+    # ========================================================
+    # 📤 EXPORT / 📥 IMPORT (ADMIN ONLY)
+    # GET  /api/sweets/export/?type=csv|ndjson
+    # POST /api/sweets/import/?type=csv|ndjson   (raw file as body)
+    # Both stream in chunks; `type` is used because DRF reserves
+    # `format` for content negotiation.
+    # ========================================================
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def export(self, request):
+        file_format = request.query_params.get("type", "csv")
+        if file_format not in catalogue.FORMATS:
+            return Response(
+                {"detail": "type must be csv or ndjson"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(
+            catalogue.export(file_format),
+            content_type=catalogue.CONTENT_TYPES[file_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="sweets.{file_format}"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def import_catalogue(self, request):
+        file_format = request.query_params.get("type", "csv")
+        if file_format not in catalogue.FORMATS:
+            return Response(
+                {"detail": "type must be csv or ndjson"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Read the raw body line by line instead of request.data, so the
+        # upload is never held in memory as a whole.
+        stream = request.stream
+        if stream is None:
+            return Response(
+                {"detail": "Empty upload"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        summary = catalogue.import_records(
+            catalogue.read_records(catalogue.decode_lines(stream), file_format),
+            actor_id=request.user.pk,
+        )
+        return Response(summary, status=status.HTTP_200_OK)
+
+    def get_bulk_rows(self, request):
+        """
+        Returns (rows, strict, error_response) for the bulk endpoints.
+        """
+        data = request.data if isinstance(request.data, dict) else {}
+        rows = data.get("items")
+        strict = str(data.get("strict", "")).lower() in ("1", "true", "yes")
+
+        if not isinstance(rows, list) or not rows:
+            return None, strict, Response(
+                {"detail": "Expected a non-empty list in 'items'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > BULK_MAX_ROWS:
+            return None, strict, Response(
+                {"detail": f"At most {BULK_MAX_ROWS} items per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return rows, strict, None
+
+
+# ============================================================
+# 📊 SALES ANALYTICS (ADMIN ONLY)
+# GET /api/analytics/best-sellers/?days=30&limit=10
+# GET /api/analytics/categories/?days=30
+# GET /api/analytics/hourly/?hours=24[&sweet=<id>][&category=]
+# Read from the hourly / daily rollups (api/analytics.py), which
+# `manage.py rollup_sales` keeps up to date.
+# ============================================================
+class AnalyticsViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_params(self, request):
+        params = AnalyticsParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    def days_ago(self, days):
+        # `days` buckets, counting today.
+        return timezone.now() - timedelta(days=days - 1)
+
+    @action(detail=False, methods=["get"], url_path="best-sellers")
+    def best_sellers(self, request):
+        params = self.get_params(request)
+        return Response(
+            analytics.best_sellers(self.days_ago(params["days"]), params["limit"]),
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=["get"])
+    def categories(self, request):
+        params = self.get_params(request)
+        return Response(
+            analytics.revenue_by_category(self.days_ago(params["days"])),
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=["get"])
+    def hourly(self, request):
+        params = self.get_params(request)
+        since = timezone.now() - timedelta(hours=params["hours"] - 1)
+        return Response(
+            analytics.hourly_sales(since, params.get("sweet"), params.get("category")),
+            status=status.HTTP_200_OK
+        )
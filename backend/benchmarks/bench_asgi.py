@@ -0,0 +1,212 @@
+"""
+Load test: the sync DRF endpoints under gunicorn (WSGI) versus the
+async endpoints under uvicorn (ASGI), same worker count, over real
+sockets. Each client holds one keep-alive connection and sends its
+requests back to back; `--slow` extra clients trickle their request
+headers in over `--slow-seconds`, like kiosks on a bad network.
+
+    python -m benchmarks.bench_asgi --workers 2 --clients 200 --slow 4
+
+With sync workers every slow client pins a worker for as long as it
+dawdles, so the other clients queue behind it. Under uvicorn a slow
+client is just an idle socket.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from benchmarks.common import migrate, seed_sweets, setup_django
+
+SERVERS = {
+    "wsgi": {
+        "prefix": "/api/sweets",
+        "command": ["gunicorn", "sweetshop.wsgi:application", "--workers", "{workers}",
+                    "--bind", "127.0.0.1:{port}", "--log-level", "warning"],
+    },
+    "asgi": {
+        "prefix": "/api/async/sweets",
+        "command": ["uvicorn", "sweetshop.asgi:application", "--workers", "{workers}",
+                    "--host", "127.0.0.1", "--port", "{port}",
+                    "--log-level", "warning", "--no-access-log"],
+    },
+}
+
+SCENARIOS = {
+    "list": ("GET", "/?page_size=20&category=candy"),
+    "retrieve": ("GET", "/1/"),
+    "purchase": ("POST", "/1/purchase/"),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running(server, workers, db_path):
+    port = free_port()
+    command = [part.format(workers=workers, port=port) for part in SERVERS[server]["command"]]
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "benchmarks.server_settings", "BENCH_DB_PATH": db_path}
+    process = subprocess.Popen(command, env=env)
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline or process.poll() is not None:
+                    raise RuntimeError(f"{server} server did not start")
+                time.sleep(0.2)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+# ------------------------------------------------------------------
+# Minimal HTTP/1.1 keep-alive client (Content-Length and chunked)
+# ------------------------------------------------------------------
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip().lower()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection") == "close"
+
+
+def build_request(method, path, token):
+    return (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: 127.0.0.1\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        f"Content-Length: 0\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode()
+
+
+async def client(port, request, count, latencies, errors):
+    reader = writer = None
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            status, closed = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            errors.append("connection")
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status >= 500:
+            errors.append(status)
+        if closed:
+            # gunicorn's sync workers do not keep connections alive.
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def slow_client(port, request, seconds):
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        step = seconds / len(request)
+        for byte in request:
+            writer.write(bytes([byte]))
+            await writer.drain()
+            await asyncio.sleep(step)
+        await read_response(reader)
+        writer.close()
+    except (OSError, asyncio.IncompleteReadError):
+        pass
+
+
+async def load(port, request, args):
+    latencies, errors = [], []
+    slow = [asyncio.create_task(slow_client(port, request, args.slow_seconds)) for _ in range(args.slow)]
+    # Let the slow clients grab their connections first.
+    await asyncio.sleep(0.2 if slow else 0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(port, request, args.requests, latencies, errors) for _ in range(args.clients)
+    ])
+    elapsed = time.perf_counter() - start
+    for task in slow:
+        task.cancel()
+    return latencies, errors, elapsed
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=200, help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=20, help="requests per connection")
+    parser.add_argument("--slow", type=int, default=0, help="extra clients that trickle their request")
+    parser.add_argument("--slow-seconds", type=float, default=5.0)
+    parser.add_argument("--scenario", choices=SCENARIOS, nargs="+", default=list(SCENARIOS))
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        migrate()
+        seed_sweets(args.rows)
+
+        from django.contrib.auth.models import User
+
+        from api.models import Sweet
+        from api.views import MyTokenObtainPairSerializer
+
+        user = User.objects.create_user("bench", password="Str0ngPass!2025")
+        token = str(MyTokenObtainPairSerializer.get_token(user).access_token)
+        Sweet.objects.filter(pk=1).update(quantity=10**9)
+
+        print(f"{'server':<6} {'scenario':<9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for server in SERVERS:
+            with running(server, args.workers, db_path) as port:
+                for name in args.scenario:
+                    method, path = SCENARIOS[name]
+                    request = build_request(method, SERVERS[server]["prefix"] + path, token)
+                    latencies, errors, elapsed = asyncio.run(load(port, request, args))
+                    print(
+                        f"{server:<6} {name:<9} {len(latencies) / elapsed:8.0f} "
+                        f"{percentile(latencies, 50) * 1000:8.1f} "
+                        f"{percentile(latencies, 99) * 1000:8.1f} {len(errors):7d}"
+                    )
+                    sys.stdout.flush()
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
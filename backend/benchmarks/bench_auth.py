@@ -0,0 +1,67 @@
+"""
+Requests/sec for a paginated list and a purchase, authenticated with
+the stock JWTAuthentication versus StatelessJWTAuthentication. Runs
+in-process through DRF's test client, so the numbers are server-side
+cost only (no network).
+
+    python -m benchmarks.bench_auth --requests 2000
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import migrate, seed_sweets, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        migrate()
+        seed_sweets(1000)
+
+        from django.contrib.auth.models import User
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+
+        from api.authentication import StatelessJWTAuthentication
+        from api.models import Sweet
+        from api.views import LoginView, SweetViewSet
+
+        User.objects.create_user("bench", password="Str0ngPass!2025")
+        client = APIClient()
+        token = client.post(
+            "/api/auth/login/", {"username": "bench", "password": "Str0ngPass!2025"}, format="json"
+        ).json()["access"]
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        Sweet.objects.filter(pk=1).update(quantity=10**9)
+
+        scenarios = [
+            ("list", lambda: client.get("/api/sweets/?page_size=20&category=candy")),
+            ("purchase", lambda: client.post("/api/sweets/1/purchase/")),
+        ]
+        print(f"{'auth':<12} {'request':<10} {'req/s':>8} {'auth queries/req':>17}")
+        for label, auth_class in [("db", JWTAuthentication), ("stateless", StatelessJWTAuthentication)]:
+            SweetViewSet.authentication_classes = [auth_class]
+            for name, call in scenarios:
+                assert call().status_code == 200
+                with CaptureQueriesContext(connection) as ctx:
+                    call()
+                auth_queries = sum("auth_user" in q["sql"] for q in ctx.captured_queries)
+
+                start = time.perf_counter()
+                for _ in range(args.requests):
+                    call()
+                rate = args.requests / (time.perf_counter() - start)
+                print(f"{label:<12} {name:<10} {rate:8.0f} {auth_queries:17d}")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
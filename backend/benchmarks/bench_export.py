@@ -0,0 +1,69 @@
+"""
+Measures peak Python memory of the streaming export and import at
+different table sizes. The peak should stay flat as rows grow.
+
+    python -m benchmarks.bench_export --rows 10000 100000
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+from benchmarks.common import migrate, seed_sweets, setup_django
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        migrate()
+
+        from api import catalogue
+        from api.models import Sweet
+
+        print(f"{'rows':>8} {'format':>7} {'export s':>9} {'peak MB':>8} {'import s':>9} {'peak MB':>8}")
+        for rows in args.rows:
+            for file_format in catalogue.FORMATS:
+                Sweet.objects.all().delete()
+                seed_sweets(rows)
+
+                def run_export():
+                    size = 0
+                    for chunk in catalogue.export(file_format):
+                        size += len(chunk)
+                    return size
+
+                _, export_s, export_mb = measure(run_export)
+
+                # Re-import what we export, streamed through a generator of lines.
+                def run_import():
+                    lines = (
+                        line
+                        for chunk in catalogue.export(file_format)
+                        for line in chunk.splitlines(keepends=True)
+                    )
+                    return catalogue.import_records(catalogue.read_records(lines, file_format))
+
+                summary, import_s, import_mb = measure(run_import)
+                assert summary["updated"] == rows, summary
+
+                print(f"{rows:8d} {file_format:>7} {export_s:9.2f} {export_mb:8.1f} {import_s:9.2f} {import_mb:8.1f}")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Purchases/sec on one sweet from many concurrent buyers, in normal
+mode versus hot mode (api/hot.py) with a growing number of shards.
+Each buyer is a thread with its own database connection calling
+Sweet.objects.take_stock(), the body of the purchase endpoint.
+
+Needs PostgreSQL (SQLite lets one writer in at a time whatever the
+row layout); it creates and drops a `test_<DB_NAME>` database:
+
+    DB_ENGINE=postgres DB_HOST=localhost DB_USER=me \\
+        python -m benchmarks.bench_hot --buyers 32 --shards 0 1 4 16
+"""
+import argparse
+import os
+import threading
+import time
+
+import django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=32, help="concurrent threads")
+    parser.add_argument("--purchases", type=int, default=100, help="purchases per buyer")
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 1, 4, 16], help="0 = normal mode")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sweetshop.settings")
+    django.setup()
+    from django.db import connection, connections
+
+    if connection.vendor != "postgresql":
+        parser.error("run with DB_ENGINE=postgres (see --help)")
+    test_db = connection.creation.create_test_db(verbosity=0)
+    try:
+        from api import hot
+        from api.models import Sweet
+
+        print(f"{'shards':>6} {'purchases/s':>12} {'sold':>7} {'left':>7}")
+        for shards in args.shards:
+            stock = args.buyers * args.purchases
+            sweet = Sweet.objects.create(name=f"Flash {shards}", category="Candy", price="1.00", quantity=stock)
+            if shards:
+                hot.switch(sweet.pk, shards)
+
+            sold = []
+            start_line = threading.Barrier(args.buyers + 1)
+
+            def buyer():
+                mine = 0
+                start_line.wait()
+                for _ in range(args.purchases):
+                    mine += Sweet.objects.take_stock(sweet.pk, 1) is not None
+                sold.append(mine)
+                connections.close_all()
+
+            threads = [threading.Thread(target=buyer) for _ in range(args.buyers)]
+            for thread in threads:
+                thread.start()
+            start_line.wait()
+            start = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            if shards:
+                hot.reconcile()
+            left = Sweet.objects.get(pk=sweet.pk).quantity
+            print(f"{shards:>6} {sum(sold) / elapsed:12.0f} {sum(sold):7d} {left:7d}")
+    finally:
+        connection.creation.destroy_test_db(test_db, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Shows the query plans and timings of the `SweetViewSet` filters
+without and with the search indexes (Sweet.Meta.indexes, first added
+in migration 0002).
+
+    python -m benchmarks.bench_indexes --rows 100000
+
+The indexes are dropped and re-created on the fully migrated schema:
+the filters use columns added after 0002 (?in_stock compares
+`quantity` with `reserved`), so migrating back to 0001 can't run them.
+"""
+import argparse
+import os
+
+from benchmarks.common import migrate, seed_sweets, setup_django, timed, viewset_queryset
+
+QUERIES = [
+    ("category", {"category": "toffee"}),
+    ("category + price range", {"category": "Toffee", "min_price": "10", "max_price": "20"}),
+    ("price range", {"min_price": "100", "max_price": "101"}),
+    ("in stock by price", {"in_stock": "true", "min_price": "250"}),
+]
+
+
+def run(label):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    print(f"\n== {label} ==")
+    for name, params in QUERIES:
+        qs = viewset_queryset(params).order_by("price")
+        plan = qs.explain().replace("\n", " | ")
+        ms = timed(lambda: list(qs.values_list("id", flat=True)[:200]))
+        print(f"{name:<24} {ms:8.2f} ms  {plan}")
+
+
+def set_indexes(present):
+    from django.db import connection
+
+    from api.models import Sweet
+
+    with connection.schema_editor() as editor:
+        for index in Sweet._meta.indexes:
+            if present:
+                editor.add_index(Sweet, index)
+            else:
+                editor.remove_index(Sweet, index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        migrate()
+        seed_sweets(args.rows)
+
+        set_indexes(False)
+        run(f"{args.rows} sweets, no indexes")
+        set_indexes(True)
+        run(f"{args.rows} sweets, with indexes")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Logins/sec per core with Django's stock PBKDF2 hasher versus the
+tuned hashers of api/passwords.py, then a login storm with and
+without the hashing cap, measured by what it does to purchases. The
+cap does not make a login cheaper or free its thread; it only limits
+how many hash at once.
+
+Runs in-process through DRF's test client on one thread, so the first
+table is logins/sec for one core (no network).
+
+    python -m benchmarks.bench_passwords --logins 20 --storm-threads 8
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+from benchmarks.common import migrate, seed_sweets, setup_django
+
+PASSWORD = "Str0ngPass!2025"
+HASHERS = [
+    ("pbkdf2 (django)", "django.contrib.auth.hashers.PBKDF2PasswordHasher"),
+    ("pbkdf2", "api.passwords.PBKDF2PasswordHasher"),
+    ("scrypt", "api.passwords.ScryptPasswordHasher"),
+    ("argon2", "api.passwords.Argon2PasswordHasher"),
+]
+
+
+def login(client, username):
+    resp = client.post("/api/auth/login/", {"username": username, "password": PASSWORD}, format="json")
+    assert resp.status_code == 200, resp.content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--storm-threads", type=int, default=8)
+    parser.add_argument("--storm-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        migrate()
+        seed_sweets(100)
+
+        from django.conf import settings
+        from django.contrib.auth.models import User
+        from django.db import connection
+        from django.test.utils import override_settings
+        from rest_framework.test import APIClient
+
+        from api.models import Sweet
+        from api.passwords import pool
+
+        # Every login under the storm is over PERF_SLOW_REQUEST_MS.
+        logging.getLogger("api.perf").disabled = True
+        client = APIClient()
+        print(f"{'hasher':<16} {'logins/s':>9} {'ms/login':>9} {'registers/s':>12}")
+        for label, path in HASHERS:
+            others = [p for p in settings.PASSWORD_HASHERS if p != path]
+            with override_settings(PASSWORD_HASHERS=[path, *others]):
+                username = f"bench-{label.split()[0]}-{len(label)}"
+                User.objects.create_user(username, password=PASSWORD)
+                login(client, username)
+
+                start = time.perf_counter()
+                for _ in range(args.logins):
+                    login(client, username)
+                elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for i in range(args.logins):
+                    client.post("/api/auth/register/", {
+                        "username": f"{username}-{i}", "email": f"{username}-{i}@x.com",
+                        "password": PASSWORD, "password2": PASSWORD,
+                    }, format="json")
+                registers = args.logins / (time.perf_counter() - start)
+            print(f"{label:<16} {args.logins / elapsed:9.1f} {elapsed / args.logins * 1000:9.1f} {registers:12.1f}")
+
+        # Login storm: threads log in non-stop while this thread buys.
+        User.objects.create_user("buyer", password=PASSWORD)
+        User.objects.create_user("storm", password=PASSWORD)
+        buyer = APIClient()
+        buyer.credentials(HTTP_AUTHORIZATION="Bearer " + buyer.post(
+            "/api/auth/login/", {"username": "buyer", "password": PASSWORD}, format="json"
+        ).json()["access"])
+        Sweet.objects.filter(pk=1).update(quantity=10**9)
+
+        print(f"\n{args.storm_threads} threads logging in, 1 buying, {args.storm_seconds:.0f}s")
+        print(f"{'hash workers':<13} {'logins/s':>9} {'purchases/s':>12} {'503s':>6}")
+        for workers in (0, 1):
+            settings.PASSWORD_HASH_WORKERS = workers
+            pool.pid = None
+            stop = threading.Event()
+            counts = {"ok": 0, "busy": 0}
+            lock = threading.Lock()
+
+            def storm():
+                storm_client = APIClient()
+                while not stop.is_set():
+                    code = storm_client.post(
+                        "/api/auth/login/", {"username": "storm", "password": PASSWORD}, format="json"
+                    ).status_code
+                    with lock:
+                        counts["ok" if code == 200 else "busy"] += 1
+                connection.close()
+
+            threads = [threading.Thread(target=storm) for _ in range(args.storm_threads)]
+            for thread in threads:
+                thread.start()
+            purchases, start = 0, time.perf_counter()
+            while time.perf_counter() - start < args.storm_seconds:
+                assert buyer.post("/api/sweets/1/purchase/").status_code == 200
+                purchases += 1
+            elapsed = time.perf_counter() - start
+            stop.set()
+            for thread in threads:
+                thread.join()
+            print(f"{workers or 'inline':<13} {counts['ok'] / elapsed:9.1f} {purchases / elapsed:12.1f} {counts['busy']:6d}")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
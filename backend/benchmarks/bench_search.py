@@ -0,0 +1,55 @@
+"""
+Compares `?search=` latency of the old LIKE-based SearchFilter with the
+full-text SweetSearchFilter as the catalogue grows. LIKE always scans
+the whole table; FTS cost follows the number of matches instead.
+
+    python -m benchmarks.bench_search --rows 10000 100000
+"""
+import argparse
+import os
+
+from benchmarks.common import migrate, seed_sweets, setup_django, timed
+
+TERMS = ["choco", "royal mint", "fudge 12.50", "zzz"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        migrate()
+
+        from rest_framework import filters
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+
+        from api.models import Sweet
+        from api.search import SweetSearchFilter
+        from api.views import SweetViewSet
+
+        def search(backend, term):
+            request = Request(APIRequestFactory().get("/api/sweets/", {"search": term}))
+            qs = backend.filter_queryset(request, Sweet.objects.all(), SweetViewSet)
+            return list(qs.values_list("id", flat=True))
+
+        seeded = 0
+        for rows in sorted(args.rows):
+            seed_sweets(rows - seeded, seed=rows)
+            seeded = rows
+
+            print(f"\n== {rows} sweets ==")
+            print(f"{'term':<14} {'matches':>8} {'LIKE ms':>10} {'FTS ms':>10}")
+            for term in TERMS:
+                matches = len(search(SweetSearchFilter(), term))
+                like = timed(lambda: search(filters.SearchFilter(), term), repeat=5)
+                fts = timed(lambda: search(SweetSearchFilter(), term), repeat=5)
+                print(f"{term:<14} {matches:8d} {like:10.2f} {fts:10.2f}")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Rows/sec for turning the catalogue into a JSON body: SweetSerializer
+over model instances with DRF's JSONRenderer (before) versus dicts from
+`.values()` through `sweet_rows` with FastJSONRenderer (after), for
+all fields and for a `?fields=` subset.
+
+    python -m benchmarks.bench_serialize --rows 50000
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import migrate, seed_sweets, setup_django
+
+
+def rate(rows, fn, repeat):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return rows * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        migrate()
+        seed_sweets(args.rows)
+
+        from rest_framework.renderers import JSONRenderer
+
+        from api import renderers
+        from api.models import Sweet
+        from api.renderers import FastJSONRenderer
+        from api.serializers import SWEET_FIELDS, SweetSerializer, sweet_rows
+
+        queryset = Sweet.objects.order_by("id")
+        subset = ("id", "name", "price")
+
+        def before(fields):
+            return lambda: JSONRenderer().render(
+                SweetSerializer(queryset.all(), many=True, fields=fields).data
+            )
+
+        def after(fields):
+            return lambda: FastJSONRenderer().render(
+                sweet_rows(queryset.values(*fields), fields)
+            )
+
+        if renderers.orjson is None:
+            print("orjson is not installed; FastJSONRenderer falls back to JSONRenderer")
+        print(f"{'path':<28} {'fields':<7} {'rows/s':>10}")
+        for label, fields in [("all", SWEET_FIELDS), ("subset", subset)]:
+            slow = rate(args.rows, before(fields), args.repeat)
+            fast = rate(args.rows, after(fields), args.repeat)
+            print(f"{'serializer + JSONRenderer':<28} {label:<7} {slow:10.0f}")
+            print(f"{'values + FastJSONRenderer':<28} {label:<7} {fast:10.0f}  ({fast / slow:.1f}x)")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run every benchmark from the `backend/` directory, e.g.
+
+    python -m benchmarks.bench_indexes --rows 100000
+
+Each script works on its own throwaway SQLite file so it never touches
+`db.sqlite3`.
+
+`python -m benchmarks.suite` runs the standard set (filters, search,
+serializers and a mixed load test) and writes a JSON report that can
+be compared between commits.
+"""
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+
+import django
+
+CATEGORIES = [
+    "Chocolate", "Candy", "Toffee", "Fudge", "Gummies",
+    "Lollipop", "Marshmallow", "Licorice", "Nougat", "Brittle",
+]
+WORDS = [
+    "Choco", "Sour", "Milk", "Mint", "Berry", "Honey", "Caramel",
+    "Crunch", "Delight", "Royal", "Mini", "Luxury", "Classic", "Fizzy",
+]
+
+
+def setup_django(db_path=None):
+    """
+    Configures Django against a scratch database and returns its path.
+    Must be called before importing anything from `api`.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sweetshop.settings")
+    from django.conf import settings
+
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix="sweetshop-bench-", suffix=".sqlite3")
+        os.close(fd)
+    settings.DATABASES["default"]["NAME"] = db_path
+    # DEBUG keeps every executed query in memory; benchmarks run long.
+    settings.DEBUG = False
+    # Benchmarks hammer one user from one IP; don't rate-limit them.
+    settings.THROTTLE_ENABLED = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver", "127.0.0.1", "localhost"]
+    django.setup()
+    return db_path
+
+
+def migrate(app_label=None, target=None):
+    from django.core.management import call_command
+
+    args = [a for a in (app_label, target) if a]
+    call_command("migrate", *args, verbosity=0)
+
+
+def seed_sweets(rows, batch_size=5000, seed=0):
+    """Bulk-inserts `rows` pseudo-random sweets (about 10% out of stock)."""
+    from api.models import Sweet
+
+    rng = random.Random(seed)
+    batch = []
+    for i in range(rows):
+        batch.append(Sweet(
+            name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            category=rng.choice(CATEGORIES),
+            price=Decimal(rng.randint(100, 50000)) / 100,
+            quantity=0 if rng.random() < 0.1 else rng.randint(1, 500),
+        ))
+        if len(batch) >= batch_size:
+            Sweet.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Sweet.objects.bulk_create(batch)
+
+
+def timed(fn, repeat=20):
+    """Runs `fn` `repeat` times and returns the mean wall time in ms."""
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def viewset_queryset(params, action="list"):
+    """Builds the queryset `SweetViewSet` would use for `?params`."""
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.views import SweetViewSet
+
+    request = Request(APIRequestFactory().get("/api/sweets/", params))
+    view = SweetViewSet(request=request, format_kwarg=None, action=action)
+    return view.get_queryset()
@@ -0,0 +1,14 @@
+"""
+Settings for servers started by the load benchmarks: the project
+settings pointed at the benchmark's scratch database.
+"""
+import os
+
+from sweetshop.settings import *  # noqa: F401,F403
+from sweetshop.settings import DATABASES
+
+DATABASES["default"]["NAME"] = os.environ["BENCH_DB_PATH"]
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+# Load tests hammer one user and one IP; measure the server, not the limits.
+THROTTLE_ENABLED = False
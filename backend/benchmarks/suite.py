@@ -0,0 +1,410 @@
+"""
+Benchmark suite with a machine-readable report, for comparing commits.
+
+    python -m benchmarks.suite run --size 100k --out before.json
+    git checkout my-branch
+    python -m benchmarks.suite run --size 100k --out after.json
+    python -m benchmarks.suite compare before.json after.json
+
+`run` does three things:
+
+  dataset  seeds 1k / 100k / 1m pseudo-random sweets (fixed seed, so
+           every run sees the same catalogue) and times the insert.
+           Pass --db to keep the database and reuse it next time;
+           seeding 1m rows takes minutes.
+  micro    in-process timings of SweetViewSet's queryset for each
+           filter (category, price range, in_stock, name, search,
+           keyset page) and of SweetSerializer versus the sweet_rows
+           fast path on one page of rows.
+  load     starts gunicorn (or uvicorn with --server asgi) on the same
+           database and runs --users virtual users for --duration
+           seconds over keep-alive connections. Each user picks, by
+           weight, browse (a category page), search, purchase of one
+           hot SKU, or an admin restock of it.
+
+Every benchmark reports p50 / p99 / mean latency in ms and operations
+per second; the report also records the commit, the environment and
+the dataset. `compare` prints the change per benchmark and exits with
+status 1 when a p50, p99 or throughput regressed by more than
+--threshold percent.
+
+Uses the project's database settings: SQLite by default (a scratch
+file, or --db PATH), PostgreSQL with DB_ENGINE=postgres and --db set
+to an existing, empty database name.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.bench_asgi import SERVERS, percentile, read_response, running
+from benchmarks.common import CATEGORIES, WORDS, migrate, seed_sweets, setup_django
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+PAGE = 20
+HOT_STOCK = 10**9
+
+# Load scenario: (name, weight). Weights are relative.
+TASKS = [("browse", 60), ("search", 25), ("purchase", 12), ("restock", 3)]
+
+MICRO_FILTERS = {
+    "filter.all": {"page_size": PAGE},
+    "filter.category": {"category": "candy", "page_size": PAGE},
+    "filter.price_range": {"min_price": "10", "max_price": "20", "page_size": PAGE},
+    "filter.category_price": {"category": "fudge", "min_price": "10", "max_price": "50", "page_size": PAGE},
+    "filter.in_stock": {"in_stock": "true", "ordering": "price", "page_size": PAGE},
+    "filter.name": {"name": "royal", "page_size": PAGE},
+    "search": {"search": "mint", "page_size": PAGE},
+}
+
+
+# ------------------------------------------------------------------
+# Statistics
+# ------------------------------------------------------------------
+def summarize(latencies, elapsed, errors=None):
+    """Seconds per operation -> the report entry."""
+    stats = {
+        "n": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "ops_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+    if errors is not None:
+        stats["errors"] = errors
+    return stats
+
+
+def sample(fn, seconds, min_runs=20):
+    """Times `fn` repeatedly for about `seconds` (at least `min_runs`)."""
+    fn()  # warm-up
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < min_runs or time.perf_counter() - start < seconds:
+        began = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - began)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+# ------------------------------------------------------------------
+# Dataset
+# ------------------------------------------------------------------
+def prepare_dataset(rows, seed):
+    """
+    Migrates and seeds an empty database, or checks a reused one.
+    Returns the dataset entry of the report.
+    """
+    migrate()
+    from django.contrib.auth.models import User
+
+    from api.models import Sweet
+
+    existing = Sweet.objects.count()
+    seed_seconds = None
+    if not existing:
+        start = time.perf_counter()
+        seed_sweets(rows, seed=seed)
+        seed_seconds = round(time.perf_counter() - start, 2)
+    elif existing != rows:
+        raise SystemExit(f"--db holds {existing} sweets, not {rows}; use another database")
+
+    # The hot SKU of the load scenario never runs out.
+    hot = Sweet.objects.order_by("pk").values_list("pk", flat=True).first()
+    Sweet.objects.filter(pk=hot).update(quantity=HOT_STOCK)
+    for username, staff in (("bench", False), ("bench-admin", True)):
+        if not User.objects.filter(username=username).exists():
+            User.objects.create_user(username, password="Str0ngPass!2025", is_staff=staff)
+
+    return {
+        "rows": rows,
+        "seed": seed,
+        "seed_seconds": seed_seconds,
+        "rows_per_s": round(rows / seed_seconds) if seed_seconds else None,
+        "hot_sku": hot,
+    }
+
+
+# ------------------------------------------------------------------
+# Micro-benchmarks
+# ------------------------------------------------------------------
+def viewset(params, admin=False):
+    """SweetViewSet set up for GET /api/sweets/?params, as the bench user."""
+    from django.contrib.auth.models import User
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.views import SweetViewSet
+
+    request = Request(APIRequestFactory().get("/api/sweets/", params))
+    request.user = User.objects.get(username="bench-admin" if admin else "bench")
+    view = SweetViewSet(request=request, format_kwarg=None, action="list", kwargs={})
+    return view, request
+
+
+def list_page(params):
+    """
+    A function running the list endpoint's query for `?params`: the
+    filters and search of SweetViewSet, then one keyset page of the
+    `.values()` rows the fast path renders.
+    """
+    view, request = viewset(params)
+    fields = view.read_fields()
+
+    def page():
+        queryset = view.filter_queryset(view.get_queryset())
+        rows = queryset.values(*fields, *view.paginator.key_fields(request))
+        return view.paginator.paginate_queryset(rows, request, view=view)
+    return page
+
+
+def deep_cursor():
+    """The ?cursor= of the page that starts 90% into the catalogue."""
+    from api.models import Sweet
+
+    view, request = viewset({"page_size": PAGE})
+    paginator = view.paginator
+    paginator.setup(request)
+    fields = paginator.orderings[paginator.ordering.lstrip("-")]
+    row = Sweet.objects.order_by(*fields).values(*fields)[Sweet.objects.count() * 9 // 10]
+    return paginator.encode_cursor([paginator.get_value(row, field) for field in fields])
+
+
+def run_micro(seconds):
+    from api.models import Sweet
+    from api.serializers import SWEET_FIELDS, SweetSerializer, sweet_rows
+
+    results = {}
+    for name, params in MICRO_FILTERS.items():
+        results[f"micro.{name}"] = sample(list_page(params), seconds)
+    results["micro.keyset_deep_page"] = sample(
+        list_page({"page_size": PAGE, "cursor": deep_cursor()}), seconds
+    )
+
+    instances = list(Sweet.objects.order_by("pk")[:PAGE])
+    rows = list(Sweet.objects.order_by("pk").values(*SWEET_FIELDS)[:PAGE])
+    results["micro.serializer.SweetSerializer"] = sample(
+        lambda: SweetSerializer(instances, many=True).data, seconds
+    )
+    results["micro.serializer.sweet_rows"] = sample(lambda: sweet_rows(rows, SWEET_FIELDS), seconds)
+    return results
+
+
+# ------------------------------------------------------------------
+# Load scenario
+# ------------------------------------------------------------------
+def build_request(method, path, token, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    return (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: 127.0.0.1\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode() + payload
+
+
+def task_request(name, rng, hot, tokens):
+    if name == "browse":
+        return build_request("GET", f"/api/sweets/?page_size={PAGE}&category={rng.choice(CATEGORIES)}", tokens["user"])
+    if name == "search":
+        return build_request("GET", f"/api/sweets/?page_size={PAGE}&search={rng.choice(WORDS).lower()}", tokens["user"])
+    if name == "purchase":
+        return build_request("POST", f"/api/sweets/{hot}/purchase/", tokens["user"], {"quantity": 1})
+    return build_request("POST", f"/api/sweets/{hot}/restock/", tokens["admin"], {"amount": 10})
+
+
+async def virtual_user(port, number, deadline, hot, tokens, samples, errors):
+    rng = random.Random(number)
+    names, weights = zip(*TASKS)
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        request = task_request(name, rng, hot, tokens)
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            status, closed = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            errors[name] += 1
+            writer = None
+            continue
+        samples[name].append(time.perf_counter() - start)
+        if status >= 400:
+            errors[name] += 1
+        if closed:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, users, duration, hot, tokens):
+    samples = {name: [] for name, _ in TASKS}
+    errors = {name: 0 for name, _ in TASKS}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[
+        virtual_user(port, number, deadline, hot, tokens, samples, errors) for number in range(users)
+    ])
+    return samples, errors, time.perf_counter() - start
+
+
+def run_load(db_name, dataset, args):
+    from django.contrib.auth.models import User
+
+    from api.views import MyTokenObtainPairSerializer
+
+    tokens = {
+        role: str(MyTokenObtainPairSerializer.get_token(User.objects.get(username=username)).access_token)
+        for role, username in (("user", "bench"), ("admin", "bench-admin"))
+    }
+    with running(args.server, args.workers, db_name) as port:
+        # One request per task first, so imports and connections are warm.
+        asyncio.run(load(port, 1, 0.5, dataset["hot_sku"], tokens))
+        samples, errors, elapsed = asyncio.run(load(port, args.users, args.duration, dataset["hot_sku"], tokens))
+
+    results = {
+        f"load.{name}": summarize(samples[name], elapsed, errors[name]) for name, _ in TASKS
+    }
+    everything = [latency for latencies in samples.values() for latency in latencies]
+    results["load.all"] = summarize(everything, elapsed, sum(errors.values()))
+    return results
+
+
+# ------------------------------------------------------------------
+# Report
+# ------------------------------------------------------------------
+def git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args):
+    import django
+    from django.db import connection
+
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "server": args.server if "load" in args.only else None,
+        "workers": args.workers if "load" in args.only else None,
+        "users": args.users if "load" in args.only else None,
+    }
+
+
+def print_results(results):
+    print(f"{'benchmark':<38} {'n':>7} {'p50 ms':>9} {'p99 ms':>9} {'ops/s':>10} {'errors':>7}")
+    for name, stats in results.items():
+        print(
+            f"{name:<38} {stats['n']:7d} {stats['p50_ms']:9.2f} {stats['p99_ms']:9.2f} "
+            f"{stats['ops_per_s']:10.1f} {stats.get('errors', ''):>7}"
+        )
+
+
+def run(args):
+    scratch = args.db is None
+    db_name = setup_django(args.db)
+    try:
+        dataset = prepare_dataset(SIZES[args.size], args.seed)
+        print(f"dataset: {dataset['rows']} sweets" + (
+            f", seeded in {dataset['seed_seconds']} s" if dataset["seed_seconds"] else " (reused)"
+        ))
+        results = {}
+        if "micro" in args.only:
+            results.update(run_micro(args.micro_seconds))
+        if "load" in args.only:
+            results.update(run_load(db_name, dataset, args))
+
+        report = {
+            "schema": 1,
+            "commit": git("rev-parse", "HEAD"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "environment": environment(args),
+            "dataset": dataset,
+            "results": results,
+        }
+    finally:
+        if scratch:
+            os.remove(db_name)
+
+    print_results(results)
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(report, out, indent=2)
+        print(f"report written to {args.out}")
+
+
+def compare(args):
+    with open(args.before) as before_file, open(args.after) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    for report in (before, after):
+        print(f"{report['commit'] or '?'}{' (dirty)' if report['dirty'] else ''}: "
+              f"{report['dataset']['rows']} sweets, {report['environment']['database']}")
+
+    if before["dataset"]["rows"] != after["dataset"]["rows"] or before["environment"] != after["environment"]:
+        print("warning: the reports differ in dataset or environment; changes are not like for like")
+
+    regressions = []
+    print(f"{'benchmark':<38} {'p50 ms':>18} {'p99 ms':>18} {'ops/s':>20}")
+    for name, new in after["results"].items():
+        old = before["results"].get(name)
+        if old is None:
+            continue
+        cells = []
+        for metric, worse_if_higher in (("p50_ms", True), ("p99_ms", True), ("ops_per_s", False)):
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            if (change if worse_if_higher else -change) > args.threshold:
+                regressions.append(f"{name} {metric}")
+            cells.append(f"{new[metric]:9.2f} {change:+7.1f}%")
+        print(f"{name:<38} {cells[0]:>18} {cells[1]:>18} {cells[2]:>20}")
+
+    if regressions:
+        print(f"\nregressed by more than {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write a report")
+    run_parser.add_argument("--size", choices=SIZES, default="1k")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--db", help="SQLite file or PostgreSQL database to keep and reuse")
+    run_parser.add_argument("--only", nargs="+", choices=["micro", "load"], default=["micro", "load"])
+    run_parser.add_argument("--micro-seconds", type=float, default=1.0, help="time per micro-benchmark")
+    run_parser.add_argument("--server", choices=SERVERS, default="wsgi")
+    run_parser.add_argument("--workers", type=int, default=2)
+    run_parser.add_argument("--users", type=int, default=32, help="concurrent virtual users")
+    run_parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    run_parser.add_argument("--out", help="write the JSON report here")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two reports")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
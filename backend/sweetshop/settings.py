@@ -10,10 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/#values
 """
 
+import os
 from pathlib import Path
 # ADDED datetime import here because it is often needed for token lifetimes
 from datetime import timedelta
 
+from .database import database_config, replica_configs
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,8 +52,14 @@ INSTALLED_APPS = [
 # =================================================================
 # REST FRAMEWORK & PARSER FIX (CRITICAL)
 # =================================================================
+# JWT_STATELESS_AUTH=1 trusts the role claims inside the token instead
+# of loading the User row on every request (see api/authentication.py).
+JWT_STATELESS_AUTH = os.environ.get("JWT_STATELESS_AUTH", "0") == "1"
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'api.authentication.StatelessJWTAuthentication'
+        if JWT_STATELESS_AUTH else
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     # CRITICAL FIX: Explicitly tell DRF to accept JSON input from the frontend.
@@ -65,12 +74,15 @@ REST_FRAMEWORK = {
 
 
 MIDDLEWARE = [
+    'api.metrics.perf_middleware',   # first, so it times the whole stack
+    'api.admission.admission_middleware',   # sheds load before any other work
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',     # <-- MUST be here
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.replicas.replica_pin_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -93,17 +105,24 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'sweetshop.wsgi.application'
+# uvicorn entry point; serves the async kiosk endpoints (api/async_views.py).
+ASGI_APPLICATION = 'sweetshop.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Chosen by environment variables: tuned SQLite by default, or
+# PostgreSQL with persistent / pooled connections (DB_ENGINE=postgres).
+# See sweetshop/database.py for every variable.
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(os.environ, BASE_DIR),
 }
+# Catalogue reads go to replicas when DB_REPLICAS is set (api/replicas.py).
+DATABASES.update(replica_configs(os.environ, DATABASES['default']))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
 
 
 # Password validation
@@ -167,4 +186,139 @@ SIMPLE_JWT = {
     # You should also ensure the token lifetimes are defined, like this:
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-}
\ No newline at end of file
+}
+
+
+# =================================================================
+# CACHING (sweet list / retrieve responses, see api/cache.py)
+# SWEETS_CACHE_BACKEND picks the store:
+#   locmem (default) - per-process memory; with several workers a
+#                      write only invalidates its own worker, others
+#                      catch up after SWEETS_CACHE_TTL
+#   file             - shared between processes on one machine
+#   redis            - SWEETS_CACHE_LOCATION, e.g. redis://127.0.0.1:6379/1
+#
+# The same cache holds the catalogue version, replica pins, revoked
+# JWTs and throttle buckets, all of which are wrong when each worker
+# keeps its own. WEB_CONCURRENCY is the worker count (gunicorn and
+# uvicorn both read it); above 1 the system check (api/checks.py)
+# refuses locmem.
+# =================================================================
+SWEETS_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "sweets",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("SWEETS_CACHE_LOCATION", str(BASE_DIR / ".cache" / "sweets")),
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("SWEETS_CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+    },
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "sweets": SWEETS_CACHE_BACKENDS[os.environ.get("SWEETS_CACHE_BACKEND", "locmem")],
+}
+
+SWEETS_CACHE_ALIAS = "sweets"
+# Revoked JWTs live here; use a shared backend when running several workers.
+JWT_DENYLIST_CACHE_ALIAS = "sweets"
+SWEETS_CACHE_TTL = int(os.environ.get("SWEETS_CACHE_TTL", 300))
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+
+# =================================================================
+# STOCK RESERVATIONS (cart holds, see api/reservations.py)
+# How long POST /api/sweets/{id}/reserve/ holds stock for. Lapsed
+# holds are released by `manage.py expire_reservations`.
+# =================================================================
+RESERVATION_TTL_SECONDS = int(os.environ.get("RESERVATION_TTL_SECONDS", 900))
+
+
+# =================================================================
+# IDEMPOTENCY KEYS (see api/idempotency.py)
+# How long the response to a request sent with an Idempotency-Key
+# header is replayed to retries. `manage.py prune_idempotency_keys`
+# deletes the expired ones.
+# =================================================================
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_SECONDS", 24 * 60 * 60))
+
+
+# =================================================================
+# REQUEST METRICS (see api/metrics.py)
+# Served in Prometheus format at /api/metrics/ to these addresses only.
+# Requests over these budgets are flagged and logged on "api.perf".
+# =================================================================
+METRICS_ALLOWED_IPS = os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+PERF_SLOW_REQUEST_MS = int(os.environ.get("PERF_SLOW_REQUEST_MS", 500))
+PERF_MAX_QUERIES = int(os.environ.get("PERF_MAX_QUERIES", 20))
+# The same statement run this many times in one request is an N+1.
+PERF_N_PLUS_ONE = int(os.environ.get("PERF_N_PLUS_ONE", 5))
+
+
+# =================================================================
+# PASSWORD HASHING (see api/passwords.py)
+# PASSWORD_HASHER picks how new hashes are made: argon2, scrypt or
+# pbkdf2. Hashes made by the others still verify and are upgraded on
+# the user's next login, as are hashes made with other parameters.
+# =================================================================
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "argon2")
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_KIB = int(os.environ.get("PASSWORD_ARGON2_MEMORY_KIB", 19 * 1024))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get("PASSWORD_ARGON2_PARALLELISM", 1))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get("PASSWORD_SCRYPT_WORK_FACTOR", 2 ** 14))
+
+PASSWORD_HASHER_CLASSES = {
+    "argon2": "api.passwords.Argon2PasswordHasher",
+    "scrypt": "api.passwords.ScryptPasswordHasher",
+    "pbkdf2": "api.passwords.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CLASSES[PASSWORD_HASHER],
+    *(path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER),
+    "api.passwords.PBKDF2SHA1PasswordHasher",
+]
+AUTHENTICATION_BACKENDS = ["api.passwords.PasswordBackend"]
+
+# At most PASSWORD_HASH_WORKERS hashes run at once per process, with
+# PASSWORD_HASH_QUEUE more requests waiting; after PASSWORD_HASH_WAIT_MS
+# without a place, a request gets a 503. This caps hashing CPU; it does
+# not free the request's worker, which waits for its hash.
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", 16))
+PASSWORD_HASH_WAIT_MS = int(os.environ.get("PASSWORD_HASH_WAIT_MS", 2000))
+
+
+# =================================================================
+# RATE LIMITS AND ADMISSION CONTROL
+# (see api/throttling.py and api/admission.py)
+# Buckets are "burst/tokens per second", e.g. THROTTLE_PURCHASE_USER=20/5.
+# They live in THROTTLE_CACHE_ALIAS, which must be shared between
+# workers (SWEETS_CACHE_BACKEND=file or redis) to limit across them.
+# =================================================================
+THROTTLE_ENABLED = os.environ.get("THROTTLE_ENABLED", "1") == "1"
+THROTTLE_CACHE_ALIAS = "sweets"
+
+
+def throttle_bucket(name, default):
+    burst, rate = os.environ.get(name, default).split("/")
+    return int(burst), float(rate)
+
+
+THROTTLE_BUCKETS = {
+    "purchase-user": throttle_bucket("THROTTLE_PURCHASE_USER", "20/5"),
+    "purchase-ip": throttle_bucket("THROTTLE_PURCHASE_IP", "60/20"),
+    "auth-ip": throttle_bucket("THROTTLE_AUTH_IP", "20/1"),
+    "login-user": throttle_bucket("THROTTLE_LOGIN_USER", "10/0.2"),
+}
+
+# Per process; 0 turns a check off.
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", 64))
+ADMISSION_MAX_QUEUE_MS = int(os.environ.get("ADMISSION_MAX_QUEUE_MS", 0))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.environ.get("ADMISSION_RETRY_AFTER_SECONDS", 1))
@@ -45,6 +45,7 @@ export default function App() {
 
     const handleLogout = () => {
         localStorage.removeItem("token");
+        localStorage.removeItem("refresh");
         localStorage.removeItem("isAdmin"); 
         setLoggedIn(false);
         setIsAdmin(false);
@@ -7,6 +7,60 @@ function getToken() {
     return localStorage.getItem("token");
 }
 
+// Stores the access/refresh pair returned by login, register and refresh.
+function storeTokens(json) {
+    if (json.access) {
+        localStorage.setItem("token", json.access);
+    }
+    if (json.refresh) {
+        localStorage.setItem("refresh", json.refresh);
+    }
+}
+
+// REFRESH - trades the stored refresh token for a new pair (the old one
+// stops working). Much cheaper for the backend than logging in again.
+// Returns false when there is no usable refresh token.
+let refreshing = null;
+export async function refreshTokens() {
+    const refresh = localStorage.getItem("refresh");
+    if (!refresh) return false;
+
+    // Concurrent 401s share one refresh: a refresh token works only once.
+    if (!refreshing) {
+        refreshing = fetch(`${API_BASE}/auth/refresh/`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ refresh }),
+        })
+            .then(async (res) => {
+                if (!res.ok) {
+                    localStorage.removeItem("refresh");
+                    return false;
+                }
+                storeTokens(await res.json());
+                return true;
+            })
+            .catch(() => false)
+            .finally(() => { refreshing = null; });
+    }
+    return refreshing;
+}
+
+// fetch() with the current access token; on a 401 it refreshes the
+// tokens once and retries.
+async function authFetch(url, options = {}) {
+    const send = () => fetch(url, {
+        ...options,
+        headers: { ...options.headers, "Authorization": `Bearer ${getToken()}` },
+    });
+
+    const res = await send();
+    if (res.status === 401 && await refreshTokens()) {
+        return send();
+    }
+    return res;
+}
+
 /**
  * Parses a non-ok response body. Tries to get JSON, but falls back to text.
  * Throws a standardized Error object.
@@ -56,10 +110,8 @@ export async function loginUser({ username, password }) {
     
     const json = await res.json();
 
-    // Store token on successful login
-    if (json.access) {
-        localStorage.setItem("token", json.access);
-    }
+    // Store tokens on successful login
+    storeTokens(json);
 
     return json;
 }
@@ -91,7 +143,35 @@ export async function registerUser({ username, email, password, password2 }) {
 export async function getSweets() {
     const token = getToken();
 
-    const res = await fetch(`${API_BASE}/sweets/`, {
+    const res = await authFetch(`${API_BASE}/sweets/`, {
+        method: "GET",
+        headers: {
+            "Content-Type": "application/json",
+            "Authorization": `Bearer ${token}`,
+        },
+    });
+
+    if (!res.ok) {
+        await handleApiError(res, "Failed to fetch sweets.");
+    }
+
+    return await res.json();
+}
+
+// GET SWEETS PAGE (keyset pagination)
+// Pass the `next` URL from the previous page to continue; `withCount`
+// asks the backend for the total (costs a COUNT(*) on the first page).
+export async function getSweetsPage({ next = null, pageSize = 50, ordering = "id", withCount = false } = {}) {
+    const token = getToken();
+
+    let url = next;
+    if (!url) {
+        const params = new URLSearchParams({ page_size: pageSize, ordering });
+        if (withCount) params.set("count", "true");
+        url = `${API_BASE}/sweets/?${params.toString()}`;
+    }
+
+    const res = await authFetch(url, {
         method: "GET",
         headers: {
             "Content-Type": "application/json",
@@ -114,7 +194,7 @@ export async function createSweet(sweetData) {
         throw new Error("Authentication token missing. Please log in.");
     }
 
-    const res = await fetch(`${API_BASE}/sweets/`, {
+    const res = await authFetch(`${API_BASE}/sweets/`, {
         method: "POST",
         headers: {
             "Content-Type": "application/json",
@@ -138,7 +218,7 @@ export async function updateSweet(id, sweetData) {
         throw new Error("Authentication token missing. Please log in.");
     }
 
-    const res = await fetch(`${API_BASE}/sweets/${id}/`, {
+    const res = await authFetch(`${API_BASE}/sweets/${id}/`, {
         method: "PUT",
         headers: {
             "Content-Type": "application/json",
@@ -162,7 +242,7 @@ export async function deleteSweet(id) {
         throw new Error("Authentication token missing. Please log in.");
     }
 
-    const res = await fetch(`${API_BASE}/sweets/${id}/`, {
+    const res = await authFetch(`${API_BASE}/sweets/${id}/`, {
         method: "DELETE",
         headers: {
             "Authorization": `Bearer ${token}`,
@@ -185,7 +265,7 @@ export async function searchSweets(query) {
     // CORRECT: Uses the base endpoint and standard DRF 'search' parameter.
     const url = `${API_BASE}/sweets/?search=${encodeURIComponent(query)}`;
 
-    const res = await fetch(url, {
+    const res = await authFetch(url, {
         method: "GET",
         headers: {
             "Content-Type": "application/json",
@@ -204,18 +284,25 @@ export async function searchSweets(query) {
 // INVENTORY MANAGEMENT
 // ===================================
 
-// PURCHASE SWEET (Decrement by 1)
-export async function purchaseSweet(id) {
+// PURCHASE SWEET (Decrement by quantity, default 1)
+export async function purchaseSweet(id, quantity = 1) {
     const token = getToken();
     if (!token) throw new Error("Authentication token missing.");
 
-    const res = await fetch(`${API_BASE}/sweets/${id}/purchase/`, {
+    const options = {
         method: "POST",
         headers: {
             "Authorization": `Bearer ${token}`,
             // FINAL FIX: Removed Content-Type and body to prevent 400 Bad Request on empty payload.
         },
-    });
+    };
+    // Only send a body when buying more than one; the backend defaults to 1.
+    if (quantity !== 1) {
+        options.headers["Content-Type"] = "application/json";
+        options.body = JSON.stringify({ quantity });
+    }
+
+    const res = await authFetch(`${API_BASE}/sweets/${id}/purchase/`, options);
 
     if (!res.ok) {
         await handleApiError(res, "Purchase failed. Sweet may be out of stock or ID is invalid.");
@@ -229,7 +316,7 @@ export async function restockSweet(id, amount) {
     const token = getToken();
     if (!token) throw new Error("Authentication token missing.");
 
-    const res = await fetch(`${API_BASE}/sweets/${id}/restock/`, {
+    const res = await authFetch(`${API_BASE}/sweets/${id}/restock/`, {
         method: "POST",
         headers: {
             "Content-Type": "application/json",